@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""Startup budget check for main.py.
+
+Imports `main` in a fresh interpreter under `-X importtime`, several times,
+and reports the median cumulative import time plus the heaviest modules of
+the median run. Exits non-zero if the median exceeds the budget or if any
+lazily loaded subsystem or heavy dependency got imported at startup.
+
+    python benchmarks/import_time.py [--budget-ms 150] [--runs 5] [--top 10]
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Must only load when a menu/subcommand needs them
+LAZY_MODULES = (
+    'aiohttp', 'requests', 'bs4', 'aiodns',
+    'dark_dragon.network', 'dark_dragon.cidr', 'dark_dragon.recon', 'dark_dragon.apk', 'dark_dragon.dns',
+)
+
+
+def measure():
+    """One fresh-interpreter import of main; returns `{module: (self_us, cumulative_us)}`."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import main'],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise SystemExit(f"import main failed:\n{result.stderr}")
+    modules = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        modules[fields[2].strip()] = (int(fields[0]), int(fields[1]))
+    return modules
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget-ms', type=float, default=150.0,
+                        help="maximum median cumulative import time of main (default 150)")
+    parser.add_argument('--runs', type=int, default=5, help="fresh interpreters to sample (default 5)")
+    parser.add_argument('--top', type=int, default=10, help="heaviest modules to list (default 10)")
+    args = parser.parse_args()
+
+    runs = sorted((measure() for _ in range(args.runs)), key=lambda m: m['main'][1])
+    median = runs[len(runs) // 2]
+    total_ms = statistics.median(m['main'][1] for m in runs) / 1000
+
+    print(f"main: {total_ms:.1f} ms median cumulative import time over {args.runs} runs "
+          f"(budget {args.budget_ms:.0f} ms)")
+    print(f"Heaviest modules (self time, median run):")
+    for name, (self_us, cumulative_us) in sorted(median.items(), key=lambda i: -i[1][0])[:args.top]:
+        print(f"  {self_us / 1000:8.1f} ms  {cumulative_us / 1000:8.1f} ms cumulative  {name}")
+
+    failed = False
+    eager = sorted(set(LAZY_MODULES) & set().union(*runs))
+    if eager:
+        print(f"FAIL: imported at startup but should load lazily: {', '.join(eager)}")
+        failed = True
+    if total_ms > args.budget_ms:
+        print(f"FAIL: over budget by {total_ms - args.budget_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""Scanner throughput on loopback, with no internet involved.
+
+Starts stand-in services on `--hosts` addresses of 127.0.0.0/8 (Linux
+routes the whole block to `lo`): an HTTP server, a TLS endpoint with a
+throwaway self-signed certificate serving the same HTTP, a proxy answering
+CONNECT, and a UDP DNS responder on port 53, all replying after
+`--latency-ms` (plus up to `--jitter-ms`). Then it runs each scanner
+against every address in a fresh interpreter: `CIDRScanner`,
+`AsyncNetworkScanner` in each of its five modes, and `DNSScanner`.
+It reports targets/s, p50/p99 probe latency, peak RSS and CPU time for
+each run.
+
+    python benchmarks/loopback.py [--hosts 1000] [--latency-ms 0] [--concurrency 200]
+                                  [--scanners cidr,sni,ssl,proxy,http,https,dns]
+                                  [--json results.json] [--compare baseline.json --tolerance 0.2]
+
+With `--compare`, exits non-zero if a scanner's throughput fell, or its p99
+latency or peak RSS grew, by more than `--tolerance` against the saved run.
+The DNS responder needs to bind port 53 (root or CAP_NET_BIND_SERVICE);
+without it the DNS run is skipped. The TLS endpoints need the `openssl`
+command for their certificate. SNI probes verify certificates, so they count
+no hits against the self-signed one; the handshakes still happen and are timed.
+"""
+import os
+import sys
+import json
+import time
+import random
+import struct
+import socket
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PORTS = {'http': 18080, 'tls': 18443, 'proxy': 13128}
+# Scanner runs: name -> (scanner, AsyncNetworkScanner mode, service)
+RUNS = {
+    'cidr': ('cidr', None, 'http'),
+    'sni': ('network', '1', 'tls'),
+    'ssl': ('network', '2', 'tls'),
+    'proxy': ('network', '3', 'proxy'),
+    'http': ('network', '4', 'http'),
+    'https': ('network', '5', 'tls'),
+    'dns': ('dns', None, 'dns'),
+}
+
+
+def loopback_hosts(count, base='127.77.0.0'):
+    """`count` addresses from `base` up, skipping .0 and .255 last octets."""
+    start = int.from_bytes(socket.inet_aton(base), 'big')
+    hosts = []
+    value = start
+    while len(hosts) < count:
+        value += 1
+        if value & 0xFF not in (0, 255):
+            hosts.append(socket.inet_ntoa(value.to_bytes(4, 'big')))
+    return hosts
+
+
+def raise_fd_limit():
+    try:
+        import resource
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    except (ImportError, ValueError, OSError):
+        pass
+
+
+def self_signed_cert(directory):
+    """`(certfile, keyfile)` made with the openssl command, or None without it."""
+    cert, key = os.path.join(directory, 'cert.pem'), os.path.join(directory, 'key.pem')
+    try:
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=loopback.test', '-keyout', key, '-out', cert],
+                       check=True, capture_output=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return cert, key
+
+
+# --- Stand-in services --------------------------------------------------------------------------------
+
+class Services:
+    """The stand-in services for one share of the addresses, on one event loop."""
+
+    def __init__(self, hosts, latency, jitter, certs):
+        self.hosts = hosts
+        self.latency = latency
+        self.jitter = jitter
+        self.certs = certs
+
+    def delay(self):
+        return self.latency + random.random() * self.jitter
+
+    async def read_head(self, reader):
+        try:
+            return await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), 10)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, asyncio.TimeoutError, ConnectionError):
+            return None
+
+    async def handle_http(self, reader, writer):
+        try:
+            if await self.read_head(reader) is not None:
+                await asyncio.sleep(self.delay())
+                writer.write(b"HTTP/1.1 200 OK\r\nServer: loopback-bench\r\nContent-Length: 2\r\n"
+                             b"Connection: close\r\n\r\nok")
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def handle_tls(self, reader, writer):
+        # The handshake is done by now; SNI/SSL probes close here, HTTPS ones send a request
+        await self.handle_http(reader, writer)
+
+    async def handle_proxy(self, reader, writer):
+        try:
+            head = await self.read_head(reader)
+            if head is not None:
+                await asyncio.sleep(self.delay())
+                # Answers CONNECT without tunnelling anything: the proxy probe only reads the status line
+                status = b"200 Connection established" if head.startswith(b'CONNECT ') else b"405 Method Not Allowed"
+                writer.write(b"HTTP/1.1 " + status + b"\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, OSError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, with_dns):
+        import ssl
+        servers = [
+            await asyncio.start_server(self.handle_http, self.hosts, PORTS['http'], backlog=4096),
+            await asyncio.start_server(self.handle_proxy, self.hosts, PORTS['proxy'], backlog=4096),
+        ]
+        if self.certs:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(*self.certs)
+            servers.append(await asyncio.start_server(self.handle_tls, self.hosts, PORTS['tls'], ssl=context,
+                                                      backlog=4096))
+        if with_dns:
+            loop = asyncio.get_running_loop()
+            for host in self.hosts:
+                await loop.create_datagram_endpoint(lambda: DnsResponder(self), local_addr=(host, 53))
+        return servers
+
+
+class DnsResponder(asyncio.DatagramProtocol):
+    """Answers every query with one A record, 127.0.0.1."""
+
+    def __init__(self, services):
+        self.services = services
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        end = data.find(b'\x00', 12) + 5
+        if end < 17:
+            return
+        question = data[12:end]
+        answer = b'\xc0\x0c' + struct.pack('!HHIH', 1, 1, 60, 4) + socket.inet_aton('127.0.0.1')
+        reply = data[:2] + struct.pack('!HHHHH', 0x8180, 1, 1, 0, 0) + question + answer
+        delay = self.services.delay()
+        if delay:
+            asyncio.get_running_loop().call_later(delay, self.transport.sendto, reply, addr)
+        else:
+            self.transport.sendto(reply, addr)
+
+
+def serve(hosts, latency, jitter, certs, with_dns, ready):
+    """Service process: binds its share of the addresses, reports on `ready`, then serves until killed."""
+    raise_fd_limit()
+
+    async def main():
+        try:
+            await Services(hosts, latency, jitter, certs).start(with_dns)
+        except OSError as e:
+            ready.put(f"{e.__class__.__name__}: {e}")
+            return
+        ready.put(None)
+        await asyncio.Event().wait()
+
+    asyncio.run(main())
+
+
+def start_services(hosts, latency, jitter, certs, with_dns, processes):
+    """Service processes splitting `hosts` between them; raises OSError if any could not bind."""
+    context = multiprocessing.get_context('spawn')
+    ready = context.Queue()
+    workers = []
+    for i in range(processes):
+        share = hosts[i::processes]
+        if share:
+            worker = context.Process(target=serve, args=(share, latency, jitter, certs, with_dns, ready), daemon=True)
+            worker.start()
+            workers.append(worker)
+    errors = [ready.get(timeout=60) for _ in workers]
+    if any(errors):
+        stop_services(workers)
+        raise OSError(next(e for e in errors if e))
+    return workers
+
+
+def stop_services(workers):
+    for worker in workers:
+        worker.terminate()
+    for worker in workers:
+        worker.join()
+
+
+def dns_available(host):
+    """True if this process may bind UDP port 53 on loopback."""
+    probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        probe.bind((host, 53))
+        return True
+    except OSError:
+        return False
+    finally:
+        probe.close()
+
+
+# --- Scanner runs -------------------------------------------------------------------------------------
+
+def run_scanner(name, hosts, concurrency, workdir, results, quiet):
+    """Scanner process: one scan of `hosts`, measured from inside; puts a stats dict on `results`."""
+    if quiet:
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, 1)
+        os.dup2(devnull, 2)
+    raise_fd_limit()
+    sys.path.insert(0, ROOT)
+    import resource
+    from dark_dragon.limiter import AdaptiveLimiter
+
+    # Every scanner reports each probe's duration to its limiter; keep all of them
+    samples = []
+    observe = AdaptiveLimiter.observe
+
+    def record(self, latency):
+        samples.append(latency)
+        observe(self, latency)
+
+    AdaptiveLimiter.observe = record
+
+    kind, mode, service = RUNS[name]
+    output = os.path.join(workdir, f"{name}.out")
+    if kind == 'cidr':
+        from dark_dragon.cidr import CIDRScanner
+        scanner = CIDRScanner(PORTS['http'], concurrency, output)
+    elif kind == 'network':
+        from dark_dragon.network import AsyncNetworkScanner
+        scanner = AsyncNetworkScanner(mode, PORTS[service], concurrency, output)
+    else:
+        from dark_dragon.dns import DNSScanner
+        scanner = DNSScanner(concurrency, output)
+
+    before = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    asyncio.run(scanner.start_scan(list(hosts)))
+    elapsed = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    samples.sort()
+
+    def percentile(p):
+        return samples[min(len(samples) - 1, int(len(samples) * p))] * 1000 if samples else None
+
+    cpu = (after.ru_utime - before.ru_utime) + (after.ru_stime - before.ru_stime)
+    results.put({
+        'scanner': name, 'targets': len(hosts), 'hits': scanner.dashboard.hits, 'seconds': round(elapsed, 3),
+        'targets_per_sec': round(len(hosts) / elapsed, 1),
+        'p50_ms': percentile(0.50), 'p99_ms': percentile(0.99),
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        'peak_rss_mb': round(after.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1),
+        'cpu_seconds': round(cpu, 2), 'cpu_percent': round(100 * cpu / elapsed, 1),
+    })
+
+
+def measure(name, hosts, concurrency, workdir, quiet=True):
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    worker = context.Process(target=run_scanner, args=(name, hosts, concurrency, workdir, results, quiet))
+    worker.start()
+    worker.join()
+    if worker.exitcode != 0:
+        return {'scanner': name, 'error': f"exit code {worker.exitcode}"}
+    return results.get()
+
+
+def regressions(results, baseline, tolerance):
+    """Lines describing every metric that got worse than `baseline` by more than `tolerance`."""
+    previous = {r['scanner']: r for r in baseline if 'error' not in r}
+    found = []
+    for result in results:
+        old = previous.get(result['scanner'])
+        if not old or 'error' in result:
+            continue
+        if result['targets_per_sec'] < old['targets_per_sec'] * (1 - tolerance):
+            found.append(f"{result['scanner']}: {result['targets_per_sec']:.0f} targets/s, "
+                         f"was {old['targets_per_sec']:.0f}")
+        for key, label in (('p99_ms', 'p99'), ('peak_rss_mb', 'peak RSS')):
+            if result[key] and old[key] and result[key] > old[key] * (1 + tolerance):
+                found.append(f"{result['scanner']}: {label} {result[key]:.1f}, was {old[key]:.1f}")
+    return found
+
+
+def print_table(results):
+    print(f"{'scanner':<8} {'targets':>8} {'hits':>7} {'targets/s':>10} {'p50 ms':>8} {'p99 ms':>8} "
+          f"{'peak RSS':>9} {'CPU s':>7} {'CPU %':>6}")
+    for r in results:
+        if 'error' in r:
+            print(f"{r['scanner']:<8} {r['error']}")
+            continue
+        p50 = f"{r['p50_ms']:.1f}" if r['p50_ms'] is not None else '-'
+        p99 = f"{r['p99_ms']:.1f}" if r['p99_ms'] is not None else '-'
+        print(f"{r['scanner']:<8} {r['targets']:>8} {r['hits']:>7} {r['targets_per_sec']:>10.0f} {p50:>8} "
+              f"{p99:>8} {r['peak_rss_mb']:>7.1f}MB {r['cpu_seconds']:>7.2f} {r['cpu_percent']:>6.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--hosts', type=int, default=1000, help="loopback addresses to scan (default 1000)")
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="service reply delay (default 0)")
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help="extra random delay, up to (default 0)")
+    parser.add_argument('--concurrency', type=int, default=200, help="scanner concurrency (default 200)")
+    parser.add_argument('--scanners', default=','.join(RUNS),
+                        help=f"comma separated runs (default {','.join(RUNS)})")
+    parser.add_argument('--service-procs', type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="processes serving the stand-in services (default half the CPUs)")
+    parser.add_argument('--json', help="also save the results to this file")
+    parser.add_argument('--compare', help="results file of an earlier run to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="relative change counted as a regression (default 0.2)")
+    parser.add_argument('--verbose', action='store_true', help="show the scanners' own output")
+    args = parser.parse_args()
+
+    names = [name.strip() for name in args.scanners.split(',') if name.strip()]
+    unknown = [name for name in names if name not in RUNS]
+    if unknown:
+        parser.error(f"unknown scanner(s): {', '.join(unknown)}")
+
+    raise_fd_limit()
+    hosts = loopback_hosts(args.hosts)
+    with tempfile.TemporaryDirectory(prefix='loopback-bench-') as workdir:
+        certs = self_signed_cert(workdir)
+        if not certs:
+            print("openssl not found: skipping the TLS runs (sni, ssl, https)")
+            names = [name for name in names if RUNS[name][2] != 'tls']
+        with_dns = 'dns' in names and dns_available(hosts[0])
+        if 'dns' in names and not with_dns:
+            print("cannot bind UDP port 53 (needs root or CAP_NET_BIND_SERVICE): skipping the DNS run")
+            names.remove('dns')
+
+        print(f"{len(hosts)} hosts ({hosts[0]} - {hosts[-1]}), latency {args.latency_ms:g} ms "
+              f"+ up to {args.jitter_ms:g} ms, concurrency {args.concurrency}, "
+              f"{args.service_procs} service processes")
+        services = start_services(hosts, args.latency_ms / 1000, args.jitter_ms / 1000, certs, with_dns,
+                                  args.service_procs)
+        try:
+            results = []
+            for name in names:
+                results.append(measure(name, hosts, args.concurrency, workdir, quiet=not args.verbose))
+        finally:
+            stop_services(services)
+
+    print_table(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'hosts': args.hosts, 'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms,
+                       'concurrency': args.concurrency, 'results': results}, f, indent=2)
+    failed = any('error' in r for r in results)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        settings = ('hosts', 'latency_ms', 'jitter_ms', 'concurrency')
+        if any(baseline.get(key) != getattr(args, key) for key in settings):
+            print(f"note: {args.compare} was run with different settings; the numbers may not compare")
+        found = regressions(results, baseline['results'], args.tolerance)
+        for line in found:
+            print(f"FAIL: {line}")
+        failed = failed or bool(found)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,14 +1,52 @@
+import io
 import os
 import re
+import json
+import codecs
+import hashlib
 import zipfile
 import shutil
 import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 from rich.console import Console
 from .utils import ScannerUtils
+from .apkstrings import ApkStrings
+from .matcher import KeywordMatcher
+from .apkcache import MemberCache
 
 console = Console(force_terminal=True, color_system="256")
+
+# Regex to match URLs: http or https, followed by non-whitespace/quote characters
+PATTERN_URL = re.compile(r'https?://[^\s"\'<>]+')
+# Simplified: match alphanum/dash dot alphanum/dash, length 2+
+PATTERN_DOMAIN = re.compile(r'(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}')
+KEYWORDS = ['cdn', 'api', 'host', 'endpoint', 'payment', 'pay', 'billing', 'checkout', '.alicdn', '.mobily']
+PAYMENT_KEYWORDS = ['pay', 'payment', 'checkout', 'billing']
+CDN_KEYWORDS = ['alicdn', 'akamai', 'cloudflare', 'fastly', 'amazon', 'edgekey', 'cdn']
+# Built-in keyword sets; a JSON file of {label: [keywords]} can override any of them
+DEFAULT_KEYWORD_SETS = {'keyword': KEYWORDS, 'payment': PAYMENT_KEYWORDS, 'cdn': CDN_KEYWORDS}
+# Bump when member scanning changes in a way that invalidates cached findings
+CACHE_VERSION = 1
+
 class ApkAnalyzer:
+    # Zip members are read in chunks of this size
+    CHUNK_SIZE = 1 << 20
+    # Context carried across chunk boundaries; matches longer than this may be split
+    CHUNK_OVERLAP = 4096
+    # DEX/ARSC/binary XML members up to this size are parsed in memory for their string tables
+    STRUCTURED_MAX_SIZE = 256 << 20
+    # Batch jobs group uncached members of one APK up to this many uncompressed bytes
+    BATCH_JOB_BYTES = 64 << 20
+    # Single-pass matcher for every keyword set
+    matcher = KeywordMatcher(DEFAULT_KEYWORD_SETS)
+
+    @staticmethod
+    def load_keywords(path):
+        """Replaces the keyword sets with those in a JSON file (labels: keyword, payment, cdn)."""
+        ApkAnalyzer.matcher = KeywordMatcher.load(path, DEFAULT_KEYWORD_SETS)
+
     @staticmethod
     def unzip_apk(apk_path, extract_to):
         if not os.path.exists(apk_path):
@@ -41,48 +79,248 @@ class ApkAnalyzer:
 
     @staticmethod
     def extract_domains_urls(texts):
-        # Regex to match URLs: http or https, followed by non-whitespace/quote characters
-        pattern_url = re.compile(r'https?://[^\s"\'<>]+')
-        # Updated regex to support more TLDs and fix partial matches (e.g. .co.uk)
-        # Simplified: match alphanum/dash dot alphanum/dash, length 2+
-        pattern_domain = re.compile(r'(?:[a-zA-Z0-9-]+\.)+[a-zA-Z]{2,}')
         urls = set()
         domains = set()
         for text in texts:
-            for url in pattern_url.findall(text):
+            for url in PATTERN_URL.findall(text):
                 urls.add(url.strip())
-            for dom in pattern_domain.findall(text):
+            for dom in PATTERN_DOMAIN.findall(text):
                 domains.add(dom.strip())
         return (urls, domains)
 
     @staticmethod
     def extract_keywords(texts):
-        keywords = ['cdn', 'api', 'host', 'endpoint', 'payment', 'pay', 'billing', 'checkout', '.alicdn', '.mobily']
         found = set()
         for text in texts:
-            text_lower = text.lower()
-            for kw in keywords:
-                if kw in text_lower:
-                    found.add(kw)
+            found |= ApkAnalyzer.matcher.matches(text)['keyword']
         return found
 
+    @staticmethod
+    def new_findings():
+        return {'urls': set(), 'domains': set(), 'keywords': set()}
+
+    @staticmethod
+    def scan_window(text, start, limit, findings):
+        """Runs every extractor over `text` in one go.
+
+        Only matches starting in `[start, limit)` are kept: text before `start`
+        is context already covered by the previous window, text from `limit`
+        on is re-scanned by the next one.
+        """
+        for m in PATTERN_URL.finditer(text):
+            if start <= m.start() < limit:
+                findings['urls'].add(m.group().strip())
+        for m in PATTERN_DOMAIN.finditer(text):
+            if start <= m.start() < limit:
+                findings['domains'].add(m.group().strip())
+        findings['keywords'] |= ApkAnalyzer.matcher.matches(text, start, limit)['keyword']
+
+    @staticmethod
+    def scan_stream(stream, findings, chunk_size=None, overlap=None):
+        """Scans a binary stream in bounded chunks, handling matches that straddle chunk boundaries."""
+        chunk_size = chunk_size or ApkAnalyzer.CHUNK_SIZE
+        overlap = overlap or ApkAnalyzer.CHUNK_OVERLAP
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        carry = ''
+        start = 0
+        chunk = stream.read(chunk_size)
+        while chunk:
+            # Read ahead so the last window knows it is the last one
+            following = stream.read(chunk_size)
+            window = carry + decoder.decode(chunk, final=not following)
+            limit = len(window) - overlap if following else len(window)
+            if limit > start:
+                ApkAnalyzer.scan_window(window, start, limit, findings)
+                keep_from = max(limit - overlap, 0)
+                carry, start = window[keep_from:], limit - keep_from
+            else:
+                carry = window
+            chunk = following
+
+    @staticmethod
+    def scan_structured(data, findings, chunk_size=None):
+        """Scans only the string constants of a DEX/ARSC/binary XML member.
+
+        Plain-text members (or tables that fail to parse) are scanned as text.
+        """
+        strings = ApkStrings.extract(data)
+        if strings is None:
+            ApkAnalyzer.scan_stream(io.BytesIO(data), findings, chunk_size)
+            return
+        # One string per line: no pattern matches across a newline, so nothing joins two strings
+        text = '\n'.join(strings)
+        ApkAnalyzer.scan_window(text, 0, len(text), findings)
+
+    @staticmethod
+    def merge_findings(findings, other):
+        for name, values in other.items():
+            findings[name] |= values
+
+    @staticmethod
+    def is_structured(info):
+        return ApkStrings.is_structured(info.filename) and info.file_size <= ApkAnalyzer.STRUCTURED_MAX_SIZE
+
+    @staticmethod
+    def member_key(info):
+        """Cache key of a zip member: CRC-32, size and how it gets scanned."""
+        mode = 'structured' if ApkAnalyzer.is_structured(info) else 'text'
+        return f"{info.CRC:08x}:{info.file_size}:{mode}"
+
+    @staticmethod
+    def scan_member(zf, info, chunk_size=None):
+        """Findings of a single zip member."""
+        findings = ApkAnalyzer.new_findings()
+        with zf.open(info) as member:
+            if ApkAnalyzer.is_structured(info):
+                ApkAnalyzer.scan_structured(member.read(), findings, chunk_size)
+            else:
+                ApkAnalyzer.scan_stream(member, findings, chunk_size)
+        return findings
+
+    @staticmethod
+    def analyze_apk(apk_path, chunk_size=None):
+        """Streams every zip member straight from the APK; nothing is written to disk.
+
+        DEX files, resources.arsc and binary XML contribute only the strings in
+        their string tables; every other member is scanned as text.
+        """
+        findings = ApkAnalyzer.new_findings()
+        with zipfile.ZipFile(apk_path, 'r') as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                try:
+                    ApkAnalyzer.merge_findings(findings, ApkAnalyzer.scan_member(zf, info, chunk_size))
+                except Exception as e:
+                    console.print(f"[yellow][!] Skipping {info.filename}: {e}[/]")
+        return findings
+
+    @staticmethod
+    def signature():
+        """Identifies the extraction rules, so cached findings made under other rules are ignored."""
+        rules = {
+            'version': CACHE_VERSION,
+            'url': PATTERN_URL.pattern,
+            'domain': PATTERN_DOMAIN.pattern,
+            'keywords': ApkAnalyzer.matcher.keyword_sets,
+            'structured_max': ApkAnalyzer.STRUCTURED_MAX_SIZE,
+        }
+        return hashlib.sha1(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+    @staticmethod
+    def collect_apks(path):
+        """APK paths from a folder (searched recursively), a single APK, or a text file listing one per line."""
+        if os.path.isdir(path):
+            found = []
+            for root, dirs, files in os.walk(path):
+                found.extend(os.path.join(root, f) for f in files if f.lower().endswith('.apk'))
+            return sorted(found)
+        if zipfile.is_zipfile(path):
+            return [path]
+        with open(path, 'r') as f:
+            return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+    @staticmethod
+    def _init_worker(keyword_sets):
+        ApkAnalyzer.matcher = KeywordMatcher(keyword_sets)
+
+    @staticmethod
+    def _scan_members(apk_path, names):
+        """Process-pool job: returns `(name, key, findings, error)` for each named member of one APK."""
+        results = []
+        with zipfile.ZipFile(apk_path, 'r') as zf:
+            for name in names:
+                info = zf.getinfo(name)
+                key = ApkAnalyzer.member_key(info)
+                try:
+                    results.append((name, key, ApkAnalyzer.scan_member(zf, info), None))
+                except Exception as e:
+                    results.append((name, key, None, str(e)))
+        return results
+
+    @staticmethod
+    def analyze_batch(apk_paths, workers=None, cache_path='apk_cache.sqlite'):
+        """Analyzes many APKs across a process pool; returns `{apk_path: findings}`.
+
+        Members are looked up in the cache by CRC-32 and size first, and a
+        member shared by several APKs in the batch is scanned only once, so
+        only what changed between releases is read again.
+        """
+        cache = MemberCache(cache_path, ApkAnalyzer.signature())
+        member_findings = {}
+        apk_members = {}
+        scheduled = set()
+        jobs = []
+        for path in apk_paths:
+            try:
+                with zipfile.ZipFile(path, 'r') as zf:
+                    infos = [info for info in zf.infolist() if not info.is_dir()]
+            except (OSError, zipfile.BadZipFile) as e:
+                console.print(f"[yellow][!] Skipping {path}: {e}[/]")
+                continue
+            keys = []
+            names, size = [], 0
+            for info in infos:
+                key = ApkAnalyzer.member_key(info)
+                keys.append(key)
+                if key in member_findings or key in scheduled:
+                    continue
+                cached = cache.get(key)
+                if cached is not None:
+                    member_findings[key] = cached
+                    continue
+                scheduled.add(key)
+                names.append(info.filename)
+                size += info.file_size
+                if size >= ApkAnalyzer.BATCH_JOB_BYTES:
+                    jobs.append((path, names))
+                    names, size = [], 0
+            if names:
+                jobs.append((path, names))
+            apk_members[path] = keys
+
+        scanned = 0
+        if jobs:
+            ctx = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=ApkAnalyzer._init_worker,
+                                     initargs=(ApkAnalyzer.matcher.keyword_sets,)) as pool:
+                futures = {pool.submit(ApkAnalyzer._scan_members, path, names): path for path, names in jobs}
+                for future in as_completed(futures):
+                    path = futures[future]
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        console.print(f"[yellow][!] Skipping {path}: {e}[/]")
+                        continue
+                    fresh = []
+                    for name, key, findings, error in results:
+                        if error is not None:
+                            console.print(f"[yellow][!] Skipping {path}:{name}: {error}[/]")
+                            continue
+                        member_findings[key] = findings
+                        fresh.append((key, findings))
+                    cache.put_many(fresh)
+                    scanned += len(fresh)
+        console.print(f"[cyan]{len(apk_members)} APKs, {sum(map(len, apk_members.values()))} members: "
+                      f"{scanned} scanned, {cache.hits} from cache[/]")
+        cache.close()
+
+        results = {}
+        for path, keys in apk_members.items():
+            findings = ApkAnalyzer.new_findings()
+            for key in keys:
+                if key in member_findings:
+                    ApkAnalyzer.merge_findings(findings, member_findings[key])
+            results[path] = findings
+        return results
+
     @staticmethod
     def extract_payment_urls(urls):
-        payment_keys = ['pay', 'payment', 'checkout', 'billing']
-        payments = set()
-        for url in urls:
-            for key in payment_keys:
-                if key in url.lower():
-                    payments.add(url)
-        return payments
+        return {url for url in urls if 'payment' in ApkAnalyzer.matcher.labels(url)}
 
     @staticmethod
     def check_cdn(domain):
-        cdn_keywords = ['alicdn', 'akamai', 'cloudflare', 'fastly', 'amazon', 'edgekey', 'cdn']
-        for kw in cdn_keywords:
-            if kw in domain.lower():
-                return True
-        return False
+        return 'cdn' in ApkAnalyzer.matcher.labels(domain)
 
     @staticmethod
     def save_results(folder, urls, domains, keywords, cdn_domains, payments):
@@ -99,6 +337,36 @@ class ApkAnalyzer:
         write_list('cdn_domains.txt', cdn_domains)
         write_list('payment_urls.txt', payments)
 
+    @staticmethod
+    def report(findings):
+        """Findings plus the payment URLs and CDN domains classified from them."""
+        return {
+            'urls': findings['urls'],
+            'domains': findings['domains'],
+            'keywords': findings['keywords'],
+            'cdn_domains': {d for d in findings['domains'] if ApkAnalyzer.check_cdn(d)},
+            'payment_urls': ApkAnalyzer.extract_payment_urls(findings['urls']),
+        }
+
+    @staticmethod
+    def save_findings(folder, findings):
+        """Writes every result list of one APK to `folder`."""
+        r = ApkAnalyzer.report(findings)
+        ApkAnalyzer.save_results(folder, r['urls'], r['domains'], r['keywords'], r['cdn_domains'], r['payment_urls'])
+
+    @staticmethod
+    def save_batch(result_folder, results):
+        """Saves `{apk_path: findings}` to one folder per APK; APKs with the same file name get numbered folders."""
+        used = set()
+        for path, findings in results.items():
+            name = os.path.splitext(os.path.basename(path))[0]
+            folder, n = name, 1
+            while folder in used:
+                n += 1
+                folder = f"{name}_{n}"
+            used.add(folder)
+            ApkAnalyzer.save_findings(os.path.join(result_folder, folder), findings)
+
     @staticmethod
     def run():
         ScannerUtils.print_banner()
@@ -108,33 +376,45 @@ class ApkAnalyzer:
     🔥 SCANNING APK FILE FOR SECRET DOMAINS 🔥
     [/]""")
         
-        apk_path = console.input(f"[cyan]🔍 Enter APK file path: [/]").strip()
+        apk_path = console.input(f"[cyan]🔍 Enter APK file path (or a folder / list file for batch mode): [/]").strip()
         result_folder = console.input(f"[cyan]💾 Enter folder name to save results: [/]").strip()
+        keywords_file = console.input(f"[cyan]🔑 Keyword sets JSON file (blank for built-in lists): [/]").strip()
 
-        console.print(f"[magenta][*] Extracting APK file ...[/]")
-        if not ApkAnalyzer.unzip_apk(apk_path, result_folder + '_extracted'):
+        if not os.path.exists(apk_path):
+            console.print(f"[red][!] Error: APK file '{apk_path}' not found![/]")
             return
 
-        console.print(f"[magenta][*] Reading all files ...[/]")
-        texts = ApkAnalyzer.read_all_files(result_folder + '_extracted')
-
-        console.print(f"[magenta][*] Extracting URLs and domains ...[/]")
-        urls, domains = ApkAnalyzer.extract_domains_urls(texts)
+        if keywords_file:
+            try:
+                ApkAnalyzer.load_keywords(keywords_file)
+            except (OSError, ValueError) as e:
+                console.print(f"[red][!] Error loading keyword sets: {e}[/]")
+                return
 
-        console.print(f"[magenta][*] Searching for important keywords ...[/]")
-        keywords = ApkAnalyzer.extract_keywords(texts)
+        is_apk = apk_path.lower().endswith('.apk')
+        if os.path.isdir(apk_path) or not is_apk and not zipfile.is_zipfile(apk_path):
+            ApkAnalyzer.run_batch(apk_path, result_folder)
+            console.input('Press Enter to return to main menu...')
+            return
+        if not zipfile.is_zipfile(apk_path):
+            # A damaged .apk, not a list of paths
+            console.print(f"[red][!] Error: '{apk_path}' is not a valid APK (not a zip archive)[/]")
+            return
 
-        console.print(f"[magenta][*] Extracting payment gateway URLs ...[/]")
-        payments = ApkAnalyzer.extract_payment_urls(urls)
+        extract = console.input(f"[cyan]📦 Also extract the APK to disk? (y/N): [/]").strip().lower() == 'y'
+        if extract:
+            console.print(f"[magenta][*] Extracting APK file ...[/]")
+            ApkAnalyzer.unzip_apk(apk_path, result_folder + '_extracted')
 
-        console.print(f"[magenta][*] Analyzing domains and checking for CDN ...[/]")
-        cdn_domains = set()
-        for d in domains:
-            if ApkAnalyzer.check_cdn(d):
-                cdn_domains.add(d)
+        console.print(f"[magenta][*] Streaming APK members: URLs, domains and keywords ...[/]")
+        try:
+            findings = ApkAnalyzer.analyze_apk(apk_path)
+        except zipfile.BadZipFile as e:
+            console.print(f"[red][!] Error reading APK: {e}[/]")
+            return
 
-        console.print(f"[green][✔] Saving results ...[/]")
-        ApkAnalyzer.save_results(result_folder, urls, domains, keywords, cdn_domains, payments)
+        console.print(f"[green][✔] Classifying payment URLs and CDN domains, saving results ...[/]")
+        ApkAnalyzer.save_findings(result_folder, findings)
 
         console.print(f"""[yellow]
 [✔] Scan complete! Results saved in folder: {result_folder}
@@ -146,3 +426,27 @@ Check files:
  - payment_urls.txt
 [/]""")
         console.input('Press Enter to return to main menu...')
+
+    @staticmethod
+    def run_batch(source, result_folder):
+        """Batch mode: one result folder per APK under `result_folder`."""
+        try:
+            apk_paths = ApkAnalyzer.collect_apks(source)
+        except (OSError, UnicodeDecodeError) as e:
+            console.print(f"[red][!] Error reading APK list: {e}[/]")
+            return
+        if not apk_paths:
+            console.print(f"[red][!] No APK files found in '{source}'[/]")
+            return
+        try:
+            workers = int(console.input(f"[cyan]⚙️ Worker processes (default {os.cpu_count()}): [/]").strip() or os.cpu_count())
+        except ValueError:
+            workers = os.cpu_count()
+        cache_path = console.input(f"[cyan]🗃️ Member cache file (default apk_cache.sqlite): [/]").strip() or 'apk_cache.sqlite'
+
+        console.print(f"[magenta][*] Analyzing {len(apk_paths)} APKs with {workers} workers ...[/]")
+        results = ApkAnalyzer.analyze_batch(apk_paths, workers, cache_path)
+        ApkAnalyzer.save_batch(result_folder, results)
+        for path, findings in results.items():
+            console.print(f"[green][+] {path}: {len(findings['urls'])} URLs, {len(findings['domains'])} domains[/]")
+        console.print(f"[yellow][✔] Batch complete! Results saved in folder: {result_folder}[/]")
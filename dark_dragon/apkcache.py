@@ -0,0 +1,47 @@
+import json
+import sqlite3
+
+
+class MemberCache:
+    """SQLite cache of per-member APK findings.
+
+    Rows are keyed by the analyzer `signature` (patterns and keyword sets, so
+    changing either invalidates old rows) and by a member key built from the
+    zip entry's CRC-32 and size, so an unchanged DEX file or native library
+    is scanned once no matter how many APK versions contain it. Only the
+    batch parent process touches the database.
+    """
+
+    def __init__(self, path, signature):
+        self.path = path
+        self.signature = signature
+        self.hits = 0
+        self.misses = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS members ("
+            "signature TEXT NOT NULL, key TEXT NOT NULL, findings TEXT NOT NULL, "
+            "PRIMARY KEY (signature, key))"
+        )
+
+    def get(self, key):
+        row = self._db.execute(
+            "SELECT findings FROM members WHERE signature = ? AND key = ?", (self.signature, key)
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return {name: set(values) for name, values in json.loads(row[0]).items()}
+
+    def put_many(self, items):
+        """Stores `(key, findings)` pairs in one transaction."""
+        with self._db:
+            self._db.executemany(
+                "INSERT OR REPLACE INTO members (signature, key, findings) VALUES (?, ?, ?)",
+                [(self.signature, key, json.dumps({name: sorted(values) for name, values in findings.items()}))
+                 for key, findings in items],
+            )
+
+    def close(self):
+        self._db.close()
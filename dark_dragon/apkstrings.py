@@ -0,0 +1,116 @@
+import struct
+
+# Android resource chunk types (ResChunk_header.type)
+RES_STRING_POOL_TYPE = 0x0001
+RES_TABLE_TYPE = 0x0002
+RES_XML_TYPE = 0x0003
+RES_TABLE_PACKAGE_TYPE = 0x0200
+# Chunks whose children are more chunks
+CONTAINER_TYPES = (RES_TABLE_TYPE, RES_XML_TYPE, RES_TABLE_PACKAGE_TYPE)
+UTF8_FLAG = 1 << 8
+
+
+class ApkStrings:
+    """Reads string constants straight out of DEX and Android binary resource files.
+
+    DEX files keep every string in the string ID table; resources.arsc and
+    binary XML (AndroidManifest.xml, layouts) keep theirs in string pools,
+    often as UTF-16. Parsing these tables yields only real strings instead
+    of decoding the whole file as UTF-8 noise.
+    """
+
+    @staticmethod
+    def is_structured(filename):
+        """Whether a zip member may hold DEX or binary resource data worth parsing."""
+        name = filename.lower()
+        return name.endswith(('.dex', '.arsc', '.xml'))
+
+    @staticmethod
+    def _uleb128(data, pos):
+        result = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result, pos
+            shift += 7
+
+    @staticmethod
+    def dex_strings(data):
+        """Strings from the DEX string ID table (MUTF-8, decoded leniently)."""
+        count, table = struct.unpack_from('<II', data, 0x38)
+        offsets = struct.unpack_from(f'<{count}I', data, table)
+        strings = []
+        for off in offsets:
+            _, start = ApkStrings._uleb128(data, off)
+            end = data.index(b'\x00', start)
+            strings.append(data[start:end].decode('utf-8', errors='ignore'))
+        return strings
+
+    @staticmethod
+    def _pool_length(data, pos, utf8):
+        """Decodes a string-pool length prefix; returns `(length, next_pos)`."""
+        if utf8:
+            length = data[pos]
+            if length & 0x80:
+                return ((length & 0x7F) << 8) | data[pos + 1], pos + 2
+            return length, pos + 1
+        length, = struct.unpack_from('<H', data, pos)
+        if length & 0x8000:
+            low, = struct.unpack_from('<H', data, pos + 2)
+            return ((length & 0x7FFF) << 16) | low, pos + 4
+        return length, pos + 2
+
+    @staticmethod
+    def string_pool(data, chunk):
+        """Strings from the ResStringPool chunk starting at offset `chunk`."""
+        header_size, = struct.unpack_from('<H', data, chunk + 2)
+        count, _, flags, strings_start = struct.unpack_from('<IIII', data, chunk + 8)
+        offsets = struct.unpack_from(f'<{count}I', data, chunk + header_size)
+        utf8 = bool(flags & UTF8_FLAG)
+        base = chunk + strings_start
+        strings = []
+        for off in offsets:
+            pos = base + off
+            if utf8:
+                # UTF-8 pools store the UTF-16 length first, then the byte length
+                _, pos = ApkStrings._pool_length(data, pos, True)
+                length, pos = ApkStrings._pool_length(data, pos, True)
+                strings.append(data[pos:pos + length].decode('utf-8', errors='ignore'))
+            else:
+                length, pos = ApkStrings._pool_length(data, pos, False)
+                strings.append(data[pos:pos + 2 * length].decode('utf-16-le', errors='ignore'))
+        return strings
+
+    @staticmethod
+    def chunk_strings(data, start=0, end=None):
+        """Walks resource chunks (resources.arsc, binary XML) and collects every string pool."""
+        end = len(data) if end is None else end
+        strings = []
+        pos = start
+        while pos + 8 <= end:
+            chunk_type, header_size, size = struct.unpack_from('<HHI', data, pos)
+            if size < 8 or header_size < 8 or pos + size > end:
+                break
+            if chunk_type == RES_STRING_POOL_TYPE:
+                strings.extend(ApkStrings.string_pool(data, pos))
+            elif chunk_type in CONTAINER_TYPES:
+                strings.extend(ApkStrings.chunk_strings(data, pos + header_size, pos + size))
+            pos += size
+        return strings
+
+    @staticmethod
+    def extract(data):
+        """Returns the string constants of a DEX/ARSC/binary XML blob, or None if it is neither."""
+        try:
+            if data[:4] == b'dex\n':
+                return ApkStrings.dex_strings(data)
+            if len(data) >= 8:
+                chunk_type, = struct.unpack_from('<H', data, 0)
+                if chunk_type in (RES_TABLE_TYPE, RES_XML_TYPE):
+                    return ApkStrings.chunk_strings(data)
+        except (struct.error, IndexError, ValueError):
+            # Truncated or malformed tables: let the caller fall back to a text scan
+            return None
+        return None
@@ -0,0 +1,118 @@
+import os
+import json
+import time
+import asyncio
+import random
+from collections import OrderedDict
+from .utils import console
+
+
+class ScanCheckpoint:
+    """Tracks how far a scan got through its target stream and persists it.
+
+    Every target handed to the queue gets a serial number. The cursor is the
+    stream position of the oldest target that has not finished yet, whether
+    it is still waiting in the queue or being probed, so everything before it
+    is done and nothing in flight is lost on resume. Targets finished out of
+    order past the cursor are probed again after a resume.
+    """
+
+    def __init__(self, path, params, interval=10.0):
+        self.path = path
+        self.params = params
+        self.interval = interval
+        self.cursor = 0
+        self.completed = 0
+        self.seed = None
+        self._pending = OrderedDict()
+        self._next_serial = 0
+        self._next_position = 0
+
+    @staticmethod
+    def path_for(output_file):
+        # No checkpoint next to stdout ('-')
+        return f"{output_file}.ckpt" if output_file and output_file != '-' else None
+
+    @classmethod
+    def for_scan(cls, output_file, params, resume=False):
+        """Creates the checkpoint for a scan writing to `output_file`, restoring it if `resume`."""
+        checkpoint = cls(cls.path_for(output_file), params)
+        if resume:
+            if checkpoint.load():
+                console.print(f"[cyan]↻ Resuming after {checkpoint.completed} completed targets[/cyan]")
+            else:
+                console.print("[yellow][!] No matching checkpoint found, starting from scratch[/yellow]")
+        if checkpoint.seed is None:
+            checkpoint.seed = random.randrange(1 << 32)
+        return checkpoint
+
+    def load(self):
+        """Restores cursor, completed count and seed; True if a matching checkpoint was found."""
+        if not self.path:
+            return False
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return False
+        if state.get('params') != self.params:
+            return False
+        self.cursor = state['cursor']
+        self.completed = state['completed']
+        self.seed = state.get('seed')
+        self._next_position = self.cursor
+        return True
+
+    def dispatch(self, position):
+        """Registers a target at stream `position` and returns its serial."""
+        serial = self._next_serial
+        self._next_serial += 1
+        self._pending[serial] = position
+        self._next_position = position + 1
+        return serial
+
+    def complete(self, serial):
+        self._pending.pop(serial, None)
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    def snapshot(self):
+        """Returns `(cursor, completed)`: every target before the cursor has finished."""
+        if self._pending:
+            serial, position = next(iter(self._pending.items()))
+            return (position, self.completed + serial)
+        return (self._next_position, self.completed + self._next_serial)
+
+    def save(self):
+        if not self.path:
+            return
+        cursor, completed = self.snapshot()
+        state = {
+            'params': self.params,
+            'cursor': cursor,
+            'completed': completed,
+            'seed': self.seed,
+            'updated': time.time(),
+        }
+        tmp = f"{self.path}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    async def autosave(self, before_save=None):
+        """Background task: saves the checkpoint every `interval` seconds.
+
+        `before_save` runs first (e.g. a result sink flush), so the cursor is
+        never persisted ahead of the results it covers.
+        """
+        while True:
+            await asyncio.sleep(self.interval)
+            if before_save:
+                before_save()
+            self.save()
@@ -1,20 +1,42 @@
 import asyncio
-import aiohttp
 import time
+import aiohttp
 from .utils import console, TargetUtils
+from .checkpoint import ScanCheckpoint
+from .sink import ResultSink
+from .dashboard import ScanDashboard
+from .limiter import AdaptiveLimiter
+from .prefilter import ConnectPrefilter
 
 class CIDRScanner:
-    def __init__(self, port, concurrency, output_file):
+    def __init__(self, port, concurrency, output_file, randomize=False, resume=False, output_format='plain',
+                 verbose=False, adaptive=False, max_concurrency=None, prefilter=False, connect_timeout=0.5,
+                 prefilter_concurrency=2000):
         self.port = port
+        # Starting limit; with `adaptive` the limiter moves it up to `max_concurrency`
         self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.max_concurrency = max_concurrency
+        self.limiter = None
+        # Optional TCP connect stage in front of the probes
+        self.prefilter = prefilter
+        self.connect_timeout = connect_timeout
+        self.prefilter_concurrency = prefilter_concurrency
         self.output_file = output_file
+        self.sink = ResultSink(output_file, ['ip', 'status', 'server', 'cf_ray'], output_format,
+                               template="{ip}\t{status}\t{server}\tCF-RAY: {cf_ray}")
+        self.randomize = randomize
+        self.dashboard = ScanDashboard(f"CIDR scan on port {port}", verbose=verbose)
+        self.resume = resume
+        self.checkpoint = None
         self.total = 0
         self.progress = 0
         self.start_time = time.time()
         self.cdn_keywords = ['cloudflare', 'cloudfront', 'akamai', 'google', 'fastly', 'openresty', 'tengine', 'varnish', 'google frontend', 'googlefrontend']
 
     async def check_ip(self, session, ip):
-        url = f"https://{ip}" if self.port == 443 else f"http://{ip}:{self.port}"
+        host = TargetUtils.url_host(ip)
+        url = f"https://{host}" if self.port == 443 else f"http://{host}:{self.port}"
         status = 0
         server = 'no-response'
         cf_ray = '-'
@@ -24,62 +46,123 @@ class CIDRScanner:
                 status = r.status
                 server = r.headers.get('server', 'unknown').lower()
                 cf_ray = r.headers.get('cf-ray', '-')
-        except:
-            pass
+        except Exception as e:
+            self.dashboard.error(e)
 
         # Update progress
         self.progress += 1
 
         # Logic from original script: Ignore 302/307
         if status in (302, 307):
-            console.print(f"[yellow][{self.progress}/{self.total}] {ip:<15} | {status:<3} | {server:<20} | CF-RAY: {cf_ray} [IGNORED][/yellow]")
+            self.dashboard.record()
+            if self.dashboard.verbose:
+                self.dashboard.log(f"[yellow][{self.progress}/{self.total}] {ip:<15} | {status:<3} | {server:<20} | CF-RAY: {cf_ray} [IGNORED][/yellow]")
             return
 
         is_cdn = any(cdn in server for cdn in self.cdn_keywords)
         valid_codes = [200, 201, 202, 204, 206, 300, 301, 303, 304, 400, 401, 403, 404, 405, 408, 429, 500, 502, 503, 504]
 
-        if status in valid_codes:
-            result_line = f"{ip}\t{status}\t{server}\tCF-RAY: {cf_ray}\n"
-            with open(self.output_file, 'a') as f:
-                f.write(result_line)
+        hit = status in valid_codes
+        if hit:
+            self.sink.emit({'ip': ip, 'status': status, 'server': server, 'cf_ray': cf_ray})
+        self.dashboard.record(hit)
 
-        # Output to screen
-        color_tag = "[green]" if is_cdn else ("[cyan]" if status != 0 else "[red]")
-        console.print(f"{color_tag}[{self.progress}/{self.total}] {ip:<15} | {status:<3} | {server:<20} | CF-RAY: {cf_ray}[/{color_tag[1:]}")
+        # Output to screen (opt-in, sampled)
+        if self.dashboard.verbose:
+            color_tag = "[green]" if is_cdn else ("[cyan]" if status != 0 else "[red]")
+            self.dashboard.log(f"{color_tag}[{self.progress}/{self.total}] {ip:<15} | {status:<3} | {server:<20} | CF-RAY: {cf_ray}[/{color_tag[1:]}")
+
+    def skip(self, serial, ip, exc):
+        """Pre-filter callback for a closed port: counted like an HTTP probe that got no response."""
+        self.progress += 1
+        self.dashboard.error(exc)
+        self.dashboard.record()
+        if self.dashboard.verbose:
+            self.dashboard.log(f"[red][{self.progress}/{self.total}] {ip:<15} | closed ({exc.__class__.__name__})[/red]")
+        self.checkpoint.complete(serial)
 
     async def worker(self, session, queue):
         while True:
-            ip = await queue.get()
+            serial, ip, _ = await queue.get()
+            await self.limiter.acquire()
+            started = time.monotonic()
             try:
                 await self.check_ip(session, ip)
             finally:
+                self.limiter.observe(time.monotonic() - started)
+                self.limiter.release()
+                self.checkpoint.complete(serial)
                 queue.task_done()
 
-    async def start_scan(self, ranges_input):
+    async def start_scan(self, ranges_input, shard=None):
         console.print(f"[yellow]→ Preparing scan with limit {self.concurrency} on port {self.port}...[/yellow]")
 
-        self.total = TargetUtils.count_targets(ranges_input)
-        queue = asyncio.Queue(maxsize=self.concurrency * 2)
-
-        # Create a single session for all requests
-        connector = aiohttp.TCPConnector(ssl=False, limit=self.concurrency)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            # Start workers
-            workers = [asyncio.create_task(self.worker(session, queue)) for _ in range(self.concurrency)]
-
-            # Feed the queue
-            for ip in TargetUtils.generate_targets(ranges_input):
-                await queue.put(ip)
-
-            # Wait for queue to be empty
-            await queue.join()
-
-            # Cancel workers
-            for w in workers:
-                w.cancel()
+        # Parse the input once; counting and generating both read the manifest
+        targets = TargetUtils.load_manifest(ranges_input)
+        self.total = TargetUtils.count_targets(targets, shard)
+        self.limiter = AdaptiveLimiter(self.concurrency, self.max_concurrency, adaptive=self.adaptive, hold=3.0,
+                                       counters=lambda: (self.dashboard.done, self.dashboard.errors['timeout']))
+        queue = asyncio.Queue(maxsize=self.limiter.maximum * 2)
+        stage1 = None
+        if self.prefilter:
+            stage1 = ConnectPrefilter(self.port, self.skip, self.connect_timeout, self.prefilter_concurrency)
+
+        params = {'scanner': 'cidr', 'port': self.port, 'targets': targets.fingerprint(),
+                  'shard': list(shard) if shard else None, 'randomize': self.randomize}
+        # Streamed targets cannot be replayed, so there is nothing to checkpoint
+        checkpoint_file = None if TargetUtils.is_stream(targets) else self.output_file
+        self.checkpoint = ScanCheckpoint.for_scan(checkpoint_file, params, self.resume)
+        self.progress = self.checkpoint.completed
+        await self.sink.start()
+        autosave = asyncio.create_task(self.checkpoint.autosave(self.sink.flush))
+        self.dashboard.total = self.total
+        self.dashboard.in_flight = lambda: self.checkpoint.in_flight
+        self.dashboard.limiter = self.limiter
+        self.dashboard.start(self.progress)
+        self.limiter.start()
+
+        finished = False
+        try:
+            # Create a single session for all requests
+            connector = aiohttp.TCPConnector(ssl=False, limit=self.limiter.maximum)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                # Start workers; the limiter decides how many probe at once
+                workers = [asyncio.create_task(self.worker(session, queue)) for _ in range(self.limiter.maximum)]
+
+                # With the pre-filter, targets go through a connect stage first and only open ports reach `queue`
+                inbox = queue
+                if stage1:
+                    inbox = asyncio.Queue(maxsize=stage1.concurrency * 2)
+                    workers += stage1.start(inbox, queue, reserved=self.limiter.maximum)
+
+                # Feed the queue, skipping everything before the checkpoint cursor
+                async for position, ip in TargetUtils.agenerate_indexed(targets, shard, self.randomize,
+                                                                       self.checkpoint.seed, self.checkpoint.cursor):
+                    await inbox.put((self.checkpoint.dispatch(position), ip, None))
+
+                # Wait for both stages to drain
+                await inbox.join()
+                await queue.join()
+
+                # Cancel workers
+                for w in workers:
+                    w.cancel()
+            finished = True
+        finally:
+            self.limiter.stop()
+            self.dashboard.stop()
+            autosave.cancel()
+            await self.sink.close()
+            if finished:
+                self.checkpoint.clear()
+            else:
+                self.checkpoint.save()
 
         duration = int(time.time() - self.start_time)
-        console.print(f"\n[magenta][✓] Scan finished in {duration}s. Total IPs: {self.total}[/magenta]")
+        console.print(f"[cyan]{self.dashboard.summary()}[/cyan]")
+        if stage1:
+            console.print(f"[cyan]{stage1.summary()}[/cyan]")
+        console.print(f"\n[magenta][✓] Scan finished in {duration}s. Total IPs: {self.total or self.progress}[/magenta]")
 
     def run(self, ranges_input):
         """Entry point to run async scan from sync context"""
@@ -0,0 +1,342 @@
+import os
+import sys
+import argparse
+from .utils import console, TargetStream
+
+# Subcommand mode names -> AsyncNetworkScanner mode keys
+SNI_MODES = {'sni': '1', 'ssl': '2', 'proxy': '3', 'http': '4', 'https': '5'}
+
+
+def build_parser():
+    """Top-level parser: global options, plus one subcommand per scanner.
+
+    Without a subcommand the interactive menu runs. Subcommands read targets
+    from their arguments, a target file or stdin, and write results to stdout
+    (or `-o FILE`) while the console output goes to stderr.
+    """
+    parser = argparse.ArgumentParser(description="Network Security Analysis Tool")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="worker processes for CIDR/SNI scans (default 1)")
+    parser.add_argument('--resume', action='store_true',
+                        help="continue interrupted scans from their checkpoint")
+    commands = parser.add_subparsers(dest='command', metavar='command')
+
+    sni = commands.add_parser('sni', help="SNI / SSL / proxy / HTTP(S) probe")
+    add_scan_options(sni, concurrency=50)
+    add_probe_options(sni)
+    add_prefilter_options(sni)
+    sni.add_argument('--resolve', action='store_true',
+                     help="resolve domain targets in bulk first (aiodns, TTL cache); nonexistent names are not probed")
+    add_resolve_options(sni)
+    sni.set_defaults(handler=run_sni)
+
+    cidr = commands.add_parser('cidr', help="HTTP(S) sweep of IP ranges")
+    add_scan_options(cidr, concurrency=100)
+    cidr.add_argument('-p', '--port', type=int, required=True, help="port (443 probes HTTPS)")
+    add_prefilter_options(cidr)
+    cidr.set_defaults(handler=run_cidr)
+
+    dns = commands.add_parser('dns', help="open DNS resolver sweep")
+    add_scan_options(dns, concurrency=1000)
+    dns.add_argument('--timeout', type=float, default=3.0, help="seconds per query (default 3)")
+    dns.set_defaults(handler=run_dns)
+
+    recon = commands.add_parser('recon', help="passive subdomain enumeration")
+    recon.add_argument('domains', nargs='*', help="domains; none or '-' reads them from stdin")
+    add_source_options(recon)
+    recon.add_argument('-c', '--concurrency', type=int, default=10,
+                       help="domains each source works on at once, within its own rate limit (default 10)")
+    add_output_options(recon)
+    recon.set_defaults(handler=run_recon)
+
+    pipeline = commands.add_parser('recon-probe', help="subdomain recon, resolving and probing names as they arrive")
+    pipeline.add_argument('domains', nargs='*', help="domains; none or '-' reads them from stdin")
+    add_source_options(pipeline)
+    pipeline.add_argument('--save-subdomains', metavar='FILE', help="also write every name found to FILE")
+    add_probe_options(pipeline)
+    add_concurrency_options(pipeline, concurrency=50)
+    add_resolve_options(pipeline)
+    add_output_options(pipeline)
+    pipeline.add_argument('-v', '--verbose', action='store_true', help="print individual results to stderr")
+    pipeline.set_defaults(handler=run_recon_probe)
+
+    apk = commands.add_parser('apk', help="URL / domain / keyword extraction from APKs")
+    apk.add_argument('paths', nargs='*', help="APKs, folders or list files; none or '-' reads paths from stdin")
+    apk.add_argument('--keywords', help="JSON file of keyword sets ({label: [keywords]})")
+    apk.add_argument('--cache', default='apk_cache.sqlite', help="member cache for batches (default apk_cache.sqlite)")
+    apk.add_argument('--save-dir', help="also write the result lists to one folder per APK here")
+    apk.add_argument('--workers', type=int, default=argparse.SUPPRESS,
+                     help="batch worker processes (default: CPU count)")
+    add_output_options(apk)
+    apk.set_defaults(handler=run_apk)
+    return parser
+
+
+def mode_list(value):
+    modes = [m.strip().lower() for m in value.split(',') if m.strip()]
+    unknown = [m for m in modes if m not in SNI_MODES]
+    if unknown or not modes:
+        raise argparse.ArgumentTypeError(f"unknown mode {', '.join(unknown) or value!r}; choose from {', '.join(SNI_MODES)}")
+    return modes
+
+
+def port_list(value):
+    try:
+        ports = [int(p) for p in value.split(',') if p.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid port list: {value!r}")
+    if not ports or not all(0 < p < 65536 for p in ports):
+        raise argparse.ArgumentTypeError(f"invalid port list: {value!r}")
+    return ports
+
+
+def add_output_options(parser):
+    parser.add_argument('-o', '--output', default='-', help="results file, '-' for stdout (default)")
+    parser.add_argument('-f', '--format', choices=('plain', 'tsv', 'jsonl', 'csv'),
+                        help="result format (default: jsonl on stdout, plain in files)")
+
+
+def add_probe_options(parser):
+    parser.add_argument('-m', '--mode', type=mode_list, default=['sni'],
+                        help=f"probe types, comma separated for a matrix scan ({', '.join(SNI_MODES)}; default sni)")
+    parser.add_argument('-p', '--port', type=port_list, default=[443],
+                        help="ports, comma separated for a matrix scan (default 443)")
+    parser.add_argument('--handshake-only', action='store_true',
+                        help="sni/ssl: stop after the TLS handshake and report its latency")
+
+
+def add_resolve_options(parser):
+    parser.add_argument('--resolve-concurrency', type=int, default=1000,
+                        help="DNS lookups in flight (default 1000)")
+    parser.add_argument('--nameservers', type=lambda v: [n.strip() for n in v.split(',') if n.strip()],
+                        help="comma separated DNS servers for the bulk resolver (default: system configuration)")
+
+
+def add_source_options(parser):
+    parser.add_argument('--vt-key', default='', help="VirusTotal API key")
+    parser.add_argument('--cache', default='recon_cache.sqlite',
+                        help="source response cache (default recon_cache.sqlite)")
+    parser.add_argument('--no-cache', action='store_true', help="always fetch from the sources")
+    parser.add_argument('--source-url', action='append', default=[], metavar='NAME=URL',
+                        help="override a source endpoint ({domain} is filled in), e.g. crtsh=http://127.0.0.1:8000/{domain}")
+
+
+def apply_source_urls(parser, args):
+    from .recon import SubdomainRecon
+    for override in args.source_url:
+        name, _, url = override.partition('=')
+        if name not in SubdomainRecon.SOURCE_URLS or not url:
+            parser.error(f"--source-url expects NAME=URL with NAME in {', '.join(SubdomainRecon.SOURCE_URLS)}")
+        SubdomainRecon.SOURCE_URLS[name] = url
+
+
+def add_prefilter_options(parser):
+    parser.add_argument('--prefilter', action='store_true',
+                        help="TCP connect stage first; only open ports get the full probe")
+    parser.add_argument('--connect-timeout', type=float, default=0.5,
+                        help="pre-filter connect timeout in seconds (default 0.5)")
+    parser.add_argument('--prefilter-concurrency', type=int, default=2000,
+                        help="connects in flight in the pre-filter (default 2000, capped by free file descriptors)")
+
+
+def prefilter_kwargs(args):
+    return dict(prefilter=args.prefilter, connect_timeout=args.connect_timeout,
+                prefilter_concurrency=args.prefilter_concurrency)
+
+
+def add_concurrency_options(parser, concurrency):
+    parser.add_argument('-c', '--concurrency', type=int, default=concurrency,
+                        help=f"probes in flight (default {concurrency}); the starting point with --adaptive")
+    parser.add_argument('-a', '--adaptive', action='store_true',
+                        help="adjust probes in flight to timeouts, latency, loop lag and free file descriptors")
+    parser.add_argument('--max-concurrency', type=int,
+                        help="ceiling for --adaptive (default 8x --concurrency)")
+
+
+def add_scan_options(parser, concurrency):
+    parser.add_argument('targets', nargs='*',
+                        help="IPs, CIDRs, domains or a target file; none or '-' streams them from stdin")
+    add_concurrency_options(parser, concurrency)
+    add_output_options(parser)
+    parser.add_argument('-r', '--randomize', action='store_true', help="randomized target order")
+    parser.add_argument('-v', '--verbose', action='store_true', help="print individual results to stderr")
+    # Also accepted before the subcommand
+    parser.add_argument('--workers', type=int, default=argparse.SUPPRESS, help="worker processes (default 1)")
+    parser.add_argument('--resume', action='store_true', default=argparse.SUPPRESS,
+                        help="continue from the checkpoint of an interrupted scan")
+
+
+def output_format(args):
+    return args.format or ('jsonl' if args.output == '-' else 'plain')
+
+
+def scan_targets(parser, args):
+    """Resolves scan targets and rejects option combinations a stream or stdout cannot honour."""
+    items = args.targets
+    if not items or items == ['-']:
+        targets = TargetStream(sys.stdin)
+        for flag, value in (('--randomize', args.randomize), ('--resume', args.resume),
+                            ('--workers', (args.workers or 1) > 1)):
+            if value:
+                parser.error(f"{flag} needs targets from arguments or a file, not stdin")
+    elif len(items) == 1 and os.path.isfile(items[0]):
+        targets = items[0]
+    else:
+        targets = [t for item in items for t in item.split(',') if t.strip()]
+    if (args.workers or 1) > 1 and args.output == '-':
+        parser.error("--workers merges part files at the end; give an output file with -o")
+    return targets
+
+
+def resolve_kwargs(args):
+    return dict(resolve=args.resolve, resolve_concurrency=args.resolve_concurrency, nameservers=args.nameservers)
+
+
+def run_sni(parser, args):
+    from .network import AsyncNetworkScanner
+    targets = scan_targets(parser, args)
+    mode = [SNI_MODES[m] for m in args.mode]
+    handshake_only = args.handshake_only and bool({'sni', 'ssl'} & set(args.mode))
+    if (args.workers or 1) > 1:
+        from .shard import ShardedScan
+        kwargs = dict(mode=mode, port=args.port, concurrency=args.concurrency, output_file=args.output,
+                      randomize=args.randomize, resume=args.resume, output_format=output_format(args),
+                      handshake_only=handshake_only, adaptive=args.adaptive, max_concurrency=args.max_concurrency,
+                      **prefilter_kwargs(args), **resolve_kwargs(args))
+        ShardedScan(AsyncNetworkScanner, kwargs, args.workers).run(targets)
+    else:
+        scanner = AsyncNetworkScanner(mode, args.port, args.concurrency, args.output, args.randomize, args.resume,
+                                      output_format(args), args.verbose, handshake_only, args.adaptive,
+                                      args.max_concurrency, **prefilter_kwargs(args), **resolve_kwargs(args))
+        scanner.run_bulk(targets)
+
+
+def run_cidr(parser, args):
+    from .cidr import CIDRScanner
+    targets = scan_targets(parser, args)
+    if (args.workers or 1) > 1:
+        from .shard import ShardedScan
+        kwargs = dict(port=args.port, concurrency=args.concurrency, output_file=args.output,
+                      randomize=args.randomize, resume=args.resume, output_format=output_format(args),
+                      adaptive=args.adaptive, max_concurrency=args.max_concurrency, **prefilter_kwargs(args))
+        ShardedScan(CIDRScanner, kwargs, args.workers).run(targets)
+    else:
+        scanner = CIDRScanner(args.port, args.concurrency, args.output, args.randomize, args.resume,
+                              output_format(args), args.verbose, args.adaptive, args.max_concurrency,
+                              **prefilter_kwargs(args))
+        scanner.run(targets)
+
+
+def run_dns(parser, args):
+    from .dns import DNSScanner
+    targets = scan_targets(parser, args)
+    if (args.workers or 1) > 1:
+        parser.error("the DNS scanner runs in a single process; drop --workers")
+    scanner = DNSScanner(args.concurrency, args.output, timeout=args.timeout, randomize=args.randomize,
+                         resume=args.resume, output_format=output_format(args), verbose=args.verbose,
+                         adaptive=args.adaptive, max_concurrency=args.max_concurrency)
+    scanner.run(targets)
+
+
+def run_recon(parser, args):
+    import time
+    import asyncio
+    from .recon import SubdomainRecon
+    from .sink import ResultSink
+
+    apply_source_urls(parser, args)
+    domains = args.domains if args.domains and args.domains != ['-'] else TargetStream(sys.stdin)
+
+    async def recon():
+        sink = ResultSink(args.output, ['domain', 'subdomain'], output_format(args), template="{subdomain}")
+        await sink.start()
+        started = time.monotonic()
+        try:
+            # One session, cache and set of source throttles for every domain
+            async with SubdomainRecon.client(None if args.no_cache else args.cache) as client:
+                # Each name goes out as soon as a source has it; the domain's store drops repeats
+                emit = lambda domain, sub: sink.emit({'domain': domain, 'subdomain': sub})
+                async for domain, subs in SubdomainRecon.batch(domains, args.vt_key, client, args.concurrency,
+                                                               on_name=emit):
+                    sink.flush()
+                    console.print(f"[green]{domain}: {len(subs)} subdomains[/green]")
+            for line in SubdomainRecon.source_report(client, time.monotonic() - started):
+                console.print(f"[cyan]{line}[/cyan]")
+            console.print(f"[cyan]{client.summary()}[/cyan]")
+        finally:
+            await sink.close()
+
+    asyncio.run(recon())
+
+
+def run_recon_probe(parser, args):
+    import asyncio
+    from .recon import SubdomainRecon
+    from .network import AsyncNetworkScanner
+
+    apply_source_urls(parser, args)
+    # Piped domains are enumerated (and their names probed) as they arrive
+    domains = args.domains if args.domains and args.domains != ['-'] else TargetStream(sys.stdin)
+    handshake_only = args.handshake_only and bool({'sni', 'ssl'} & set(args.mode))
+    scanner = AsyncNetworkScanner([SNI_MODES[m] for m in args.mode], args.port, args.concurrency, args.output,
+                                  output_format=output_format(args), verbose=args.verbose,
+                                  handshake_only=handshake_only, adaptive=args.adaptive,
+                                  max_concurrency=args.max_concurrency, resolve=True,
+                                  resolve_concurrency=args.resolve_concurrency, nameservers=args.nameservers)
+
+    async def pipeline():
+        async with SubdomainRecon.client(None if args.no_cache else args.cache) as client:
+            count = await SubdomainRecon.probe_subdomains(domains, scanner, args.vt_key, client,
+                                                          args.save_subdomains)
+        console.print(f"[cyan]{client.summary()}; {count} unique names probed[/cyan]")
+
+    asyncio.run(pipeline())
+
+
+def run_apk(parser, args):
+    import csv
+    import json
+    from .apk import ApkAnalyzer, console as apk_console
+    apk_console.stderr = True
+
+    if args.keywords:
+        try:
+            ApkAnalyzer.load_keywords(args.keywords)
+        except (OSError, ValueError) as e:
+            parser.error(f"cannot load keyword sets: {e}")
+
+    sources = args.paths if args.paths and args.paths != ['-'] else TargetStream(sys.stdin)
+    apk_paths = []
+    for source in sources:
+        if not os.path.exists(source):
+            parser.error(f"no such file or folder: {source}")
+        apk_paths.extend(ApkAnalyzer.collect_apks(source))
+
+    if len(apk_paths) == 1:
+        results = {apk_paths[0]: ApkAnalyzer.analyze_apk(apk_paths[0])}
+    else:
+        results = ApkAnalyzer.analyze_batch(apk_paths, args.workers, args.cache)
+    if args.save_dir:
+        ApkAnalyzer.save_batch(args.save_dir, results)
+
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        # jsonl: one object per APK; other formats: one `apk, kind, value` row per finding
+        rows = csv.writer(out, delimiter=',' if args.format == 'csv' else '\t', lineterminator='\n')
+        for path, findings in results.items():
+            report = ApkAnalyzer.report(findings)
+            if args.format in (None, 'jsonl'):
+                out.write(json.dumps({'apk': path, **{k: sorted(v) for k, v in report.items()}}) + '\n')
+            else:
+                rows.writerows((path, kind, value) for kind, values in report.items() for value in sorted(values))
+            out.flush()
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+def run_command(parser, args):
+    """Runs a subcommand with the console on stderr, keeping stdout for results."""
+    console.stderr = True
+    args.handler(parser, args)
+    return 0
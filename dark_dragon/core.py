@@ -1,16 +1,14 @@
-import sys
-import asyncio
 import os
 from .utils import ScannerUtils, console
-from .network import NetworkScanner, AsyncNetworkScanner
-from .cidr import CIDRScanner
-from .recon import SubdomainRecon
-from .apk import ApkAnalyzer
-from .dns import DNSScanner
+
+# Subsystems (and aiohttp, requests, bs4 behind them) are imported by the menu
+# that needs them, so startup only pays for the banner and the menu.
 
 class DarkDragonCore:
-    def __init__(self):
+    def __init__(self, workers=1, resume=False):
         self.running = True
+        self.workers = workers
+        self.resume = resume
 
     def main_menu(self):
         while self.running:
@@ -41,6 +39,45 @@ class DarkDragonCore:
             else:
                 console.input("[red]Invalid choice. Press Enter...[/red]")
 
+    def ask_workers(self):
+        # Concurrency applies per worker process
+        try:
+            return int(console.input(f"Worker processes (default {self.workers}): ").strip() or self.workers)
+        except:
+            return self.workers
+
+    def ask_randomize(self):
+        return console.input("Randomize target order? (y/N): ").strip().lower() == 'y'
+
+    def ask_adaptive(self):
+        # The typed concurrency becomes the starting point of the AIMD controller
+        return console.input("Adapt concurrency to timeouts/latency? (y/N): ").strip().lower() == 'y'
+
+    def ask_prefilter(self):
+        # Dead addresses then cost one short connect instead of a full probe
+        return console.input("TCP connect pre-filter for sparse ranges? (y/N): ").strip().lower() == 'y'
+
+    def ask_verbose(self):
+        # Per-target lines are sampled; the live dashboard always shows totals
+        return console.input("Print individual results? (y/N): ").strip().lower() == 'y'
+
+    def ask_format(self):
+        from .sink import ResultSink
+        fmt = console.input("Output format (plain/tsv/jsonl/csv, default plain): ").strip().lower() or 'plain'
+        return fmt if fmt in ResultSink.FORMATS else 'plain'
+
+    def ask_resume(self, output_file, workers=1):
+        from .shard import ShardedScan
+        from .checkpoint import ScanCheckpoint
+        if self.resume:
+            return True
+        if workers > 1:
+            output_file = ShardedScan.part_path(output_file, 0)
+        path = ScanCheckpoint.path_for(output_file)
+        if path and os.path.exists(path):
+            return console.input("Checkpoint found, resume previous scan? (Y/n): ").strip().lower() != 'n'
+        return False
+
     def sni_menu(self):
         ScannerUtils.clear_screen()
         console.print("[cyan]--- SNI / SSL / Proxy Scanner (Bulk/Async) ---[/cyan]")
@@ -48,30 +85,57 @@ class DarkDragonCore:
         # Smart input: Single, File, or CIDR
         targets_input = console.input("Target Domain/IP/File/CIDR: ").strip()
 
+        from .network import AsyncNetworkScanner
+        # Several ports and/or modes (comma separated) make a matrix scan over every combination
         try:
-            port = int(console.input("Port (443): ").strip() or "443")
-        except:
-            port = 443
+            port = AsyncNetworkScanner.parse_ports(console.input("Port(s) (443, or e.g. 443,8443): ").strip() or "443")
+        except ValueError:
+            port = [443]
 
         console.print(f"\n[1] Scan SNI\n[2] Scan SSL\n[3] Scan Proxy\n[4] Scan HTTP\n[5] Scan HTTPS\n")
-        mode = console.input("Select Mode: ").strip()
-        if mode not in ['1', '2', '3', '4', '5']:
+        try:
+            mode = AsyncNetworkScanner.parse_modes(console.input("Select Mode(s) (e.g. 1 or 1,2,5): ").strip())
+        except ValueError:
             console.print("[red]Invalid mode[/red]")
             console.input("Press Enter...")
             return
 
+        # Handshake-only probes stop as soon as the certificate arrives
+        handshake_only = False
+        if {'1', '2'} & set(mode):
+            handshake_only = console.input("Handshake-only probe with latency? (y/N): ").strip().lower() == 'y'
+
         # Concurrency
         try:
             concurrency = int(console.input("Threads/Concurrency (default 50): ").strip() or "50")
         except:
             concurrency = 50
+        adaptive = self.ask_adaptive()
+        prefilter = self.ask_prefilter()
+        # One bulk DNS pass instead of a thread-pool lookup per probe; nonexistent names are dropped
+        resolve = console.input("Pre-resolve domain targets in bulk? (y/N): ").strip().lower() == 'y'
+
+        workers = self.ask_workers()
+        randomize = self.ask_randomize()
 
         # Output file
         output_file = console.input("Output file for hits (optional, e.g. hits.txt): ").strip()
+        output_format = self.ask_format() if output_file else 'plain'
+
+        resume = self.ask_resume(output_file, workers)
+        verbose = self.ask_verbose() if workers == 1 else False
 
         # Run Async Bulk Scanner
-        scanner = AsyncNetworkScanner(mode, port, concurrency, output_file)
-        scanner.run_bulk(targets_input)
+        if workers > 1:
+            from .shard import ShardedScan
+            kwargs = dict(mode=mode, port=port, concurrency=concurrency, output_file=output_file,
+                          randomize=randomize, resume=resume, output_format=output_format,
+                          handshake_only=handshake_only, adaptive=adaptive, prefilter=prefilter, resolve=resolve)
+            ShardedScan(AsyncNetworkScanner, kwargs, workers).run(targets_input)
+        else:
+            scanner = AsyncNetworkScanner(mode, port, concurrency, output_file, randomize, resume, output_format,
+                                          verbose, handshake_only, adaptive, prefilter=prefilter, resolve=resolve)
+            scanner.run_bulk(targets_input)
 
         console.input("\nPress Enter...")
 
@@ -96,11 +160,28 @@ class DarkDragonCore:
             threads = int(console.input("Concurrency (default 100): ").strip() or "100")
         except:
             threads = 100
+        adaptive = self.ask_adaptive()
+        prefilter = self.ask_prefilter()
+
+        workers = self.ask_workers()
+        randomize = self.ask_randomize()
 
         output = console.input("Output file (results.txt): ").strip() or "results.txt"
+        output_format = self.ask_format()
+
+        resume = self.ask_resume(output, workers)
+        verbose = self.ask_verbose() if workers == 1 else False
 
-        scanner = CIDRScanner(port, threads, output)
-        scanner.run(ranges)
+        from .cidr import CIDRScanner
+        if workers > 1:
+            from .shard import ShardedScan
+            kwargs = dict(port=port, concurrency=threads, output_file=output, randomize=randomize,
+                          resume=resume, output_format=output_format, adaptive=adaptive, prefilter=prefilter)
+            ShardedScan(CIDRScanner, kwargs, workers).run(ranges)
+        else:
+            scanner = CIDRScanner(port, threads, output, randomize, resume, output_format, verbose, adaptive,
+                                  prefilter=prefilter)
+            scanner.run(ranges)
         console.input("\nPress Enter...")
 
     def recon_menu(self):
@@ -110,6 +191,28 @@ class DarkDragonCore:
         api_key = console.input("VirusTotal API Key (optional): ").strip()
 
         # Run async recon
+        import asyncio
+        from .recon import SubdomainRecon
+
+        # Probing while recon runs: names are resolved and checked as soon as any source has them
+        ports = console.input("Probe names as they are found? Port(s), blank to skip: ").strip()
+        if ports:
+            from .network import AsyncNetworkScanner
+            try:
+                port = AsyncNetworkScanner.parse_ports(ports)
+                mode = AsyncNetworkScanner.parse_modes(
+                    console.input("Mode(s): [1] SNI [2] SSL [3] Proxy [4] HTTP [5] HTTPS (default 1): ").strip() or '1')
+            except ValueError as e:
+                console.print(f"[red]{e}[/red]")
+                console.input("Press Enter...")
+                return
+            output_file = console.input("Output file for hits (optional, e.g. hits.txt): ").strip()
+            save_to = console.input("Also save the subdomains to (optional): ").strip() or None
+            scanner = AsyncNetworkScanner(mode, port, 50, output_file, resolve=True)
+            asyncio.run(SubdomainRecon.probe_subdomains([domain], scanner, api_key, save_to=save_to))
+            console.input("\nPress Enter...")
+            return
+
         subs = asyncio.run(SubdomainRecon.extract_subdomains(domain, api_key))
 
         save = console.input("Save to file? (y/N): ").strip().lower()
@@ -121,6 +224,7 @@ class DarkDragonCore:
 
     def apk_menu(self):
         # ApkAnalyzer has its own internal interaction logic in the original code
+        from .apk import ApkAnalyzer
         ApkAnalyzer.run()
 
     def dns_menu(self):
@@ -129,13 +233,22 @@ class DarkDragonCore:
         targets_input = console.input("Target IP/CIDR/File: ").strip()
 
         try:
-            concurrency = int(console.input("Concurrency (default 50): ").strip() or "50")
+            concurrency = int(console.input("Queries in flight (default 1000): ").strip() or "1000")
         except:
-            concurrency = 50
+            concurrency = 1000
+        adaptive = self.ask_adaptive()
+
+        randomize = self.ask_randomize()
 
         output_file = console.input("Output file (valid_dns.txt): ").strip() or "valid_dns.txt"
+        output_format = self.ask_format()
+
+        resume = self.ask_resume(output_file)
+        verbose = self.ask_verbose()
 
-        scanner = DNSScanner(concurrency, output_file)
+        from .dns import DNSScanner
+        scanner = DNSScanner(concurrency, output_file, randomize=randomize, resume=resume,
+                             output_format=output_format, verbose=verbose, adaptive=adaptive)
         scanner.run(targets_input)
 
         console.input("\nPress Enter...")
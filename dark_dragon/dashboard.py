@@ -0,0 +1,159 @@
+import ssl
+import time
+import asyncio
+from rich.live import Live
+from rich.table import Table
+from .utils import console
+
+
+class ScanDashboard:
+    """Live, rate-limited status panel for a running scan.
+
+    Workers only bump plain counters; Rich's `Live` redraws the panel at a
+    fixed `refresh_per_second`, so screen cost does not grow with the probe
+    rate. Per-target lines are opt-in (`verbose`) and sampled down to at
+    most `max_lines_per_sec`.
+    """
+    ERROR_CLASSES = ('timeout', 'refused', 'tls', 'network', 'other')
+    # Order of the counters in `export()`, used to share stats across processes
+    STAT_FIELDS = ('done', 'hits') + ERROR_CLASSES
+
+    def __init__(self, title, total=0, verbose=False, max_lines_per_sec=20, refresh_per_second=4,
+                 headless=False, in_flight=None, poll=None):
+        self.title = title
+        self.total = total
+        self.verbose = verbose
+        self.max_lines_per_sec = max_lines_per_sec
+        self.refresh_per_second = refresh_per_second
+        self.headless = headless
+        self.in_flight = in_flight
+        self.poll = poll
+        # Optional AdaptiveLimiter whose limit is shown and summarized
+        self.limiter = None
+        self.done = 0
+        self.hits = 0
+        # Seconds from start to the first hit (time to first live host for streamed targets)
+        self.first_hit = None
+        self.errors = dict.fromkeys(self.ERROR_CLASSES, 0)
+        self.suppressed = 0
+        self.live = None
+        self._start_time = time.time()
+        self._start_done = 0
+        self._rate = 0.0
+        self._last_sample = (self._start_time, 0)
+        self._line_window = 0
+        self._line_count = 0
+
+    @staticmethod
+    def classify(exc):
+        """Buckets an exception into one of `ERROR_CLASSES`."""
+        exc = getattr(exc, 'os_error', None) or exc
+        if isinstance(exc, (asyncio.TimeoutError, TimeoutError)):
+            return 'timeout'
+        if isinstance(exc, ConnectionRefusedError):
+            return 'refused'
+        if isinstance(exc, ssl.SSLError):
+            return 'tls'
+        if isinstance(exc, OSError):
+            return 'network'
+        return 'other'
+
+    def start(self, done=0):
+        """Starts the clock (and the live panel) with `done` targets already finished."""
+        self.done = done
+        self._start_done = done
+        self._start_time = time.time()
+        self._last_sample = (self._start_time, done)
+        if not self.headless:
+            self.live = Live(self, console=console, refresh_per_second=self.refresh_per_second)
+            self.live.start()
+
+    def stop(self):
+        if self.live:
+            self.live.stop()
+            self.live = None
+            if not console.is_terminal:
+                console.line()
+
+    def record(self, hit=False):
+        self.done += 1
+        if hit:
+            self.hits += 1
+            if self.first_hit is None:
+                self.first_hit = time.time() - self._start_time
+
+    def error(self, exc):
+        self.errors[self.classify(exc)] += 1
+
+    def log(self, text):
+        """Prints one per-target line if verbose, dropping lines past the per-second cap."""
+        if not self.verbose or self.headless:
+            return
+        window = int(time.time())
+        if window != self._line_window:
+            self._line_window, self._line_count = window, 0
+        if self._line_count >= self.max_lines_per_sec:
+            self.suppressed += 1
+            return
+        self._line_count += 1
+        console.print(text)
+
+    def export(self):
+        return [self.done, self.hits] + [self.errors[c] for c in self.ERROR_CLASSES]
+
+    def load(self, values):
+        self.done, self.hits = values[0], values[1]
+        for name, value in zip(self.ERROR_CLASSES, values[2:]):
+            self.errors[name] = value
+
+    def rate(self):
+        """Targets/sec, smoothed over successive redraws."""
+        now = time.time()
+        last_time, last_done = self._last_sample
+        if now - last_time >= 0.5:
+            sample = (self.done - last_done) / (now - last_time)
+            self._rate = sample if not self._rate else 0.7 * self._rate + 0.3 * sample
+            self._last_sample = (now, self.done)
+        return self._rate
+
+    def summary(self):
+        elapsed = max(time.time() - self._start_time, 1e-6)
+        average = (self.done - self._start_done) / elapsed
+        errors = ', '.join(f"{k}: {v}" for k, v in self.errors.items() if v) or 'none'
+        done = f"{self.done}/{self.total}" if self.total else f"{self.done}"
+        text = f"{done} targets | {self.hits} hits | {average:.0f}/s avg | errors: {errors}"
+        if self.first_hit is not None:
+            text += f" | first hit after {self.first_hit:.1f}s"
+        if self.limiter and self.limiter.adaptive:
+            text += f" | {self.limiter.summary()}"
+        return text
+
+    def __rich__(self):
+        if self.poll:
+            self.poll()
+        rate = self.rate()
+        remaining = max(self.total - self.done, 0)
+        if rate > 0 and self.total:
+            minutes, seconds = divmod(int(remaining / rate), 60)
+            eta = f"{minutes // 60:02d}:{minutes % 60:02d}:{seconds:02d}"
+        else:
+            eta = '--:--:--'
+        percent = 100.0 * self.done / self.total if self.total else 0.0
+
+        table = Table(title=f"[cyan]{self.title}[/cyan]", show_header=False, box=None)
+        table.add_column(style="bold")
+        table.add_column()
+        # Streamed targets have no total
+        table.add_row("Progress", f"{self.done}/{self.total} ({percent:.1f}%)" if self.total else str(self.done))
+        table.add_row("Rate", f"{rate:.0f} targets/s")
+        table.add_row("Hits", f"[green]{self.hits}[/green]")
+        if self.in_flight:
+            table.add_row("In flight", str(self.in_flight()))
+        if self.limiter and self.limiter.adaptive:
+            cut = f" (cut: {', '.join(self.limiter.reasons)})" if self.limiter.reasons else ""
+            table.add_row("Concurrency", f"{int(self.limiter.limit)}/{self.limiter.maximum}{cut}")
+        table.add_row("Errors", ' | '.join(f"{k}: {v}" for k, v in self.errors.items()))
+        if self.suppressed:
+            table.add_row("Lines dropped", str(self.suppressed))
+        table.add_row("ETA", eta)
+        return table
@@ -1,74 +1,245 @@
+import socket
+import random
+import struct
 import asyncio
-import aiodns
 import time
 from .utils import console, TargetUtils
+from .checkpoint import ScanCheckpoint
+from .sink import ResultSink
+from .dashboard import ScanDashboard
+from .limiter import AdaptiveLimiter
 
-class DNSScanner:
-    def __init__(self, concurrency=50, output_file='valid_dns.txt', timeout=3.0):
-        self.concurrency = concurrency
-        self.output_file = output_file
-        self.timeout = timeout
-        self.total = 0
-        self.progress = 0
-        self.start_time = time.time()
-        with open(self.output_file, 'w') as f:
-            pass
 
-    async def check_ip(self, ip):
-        try:
-            resolver = aiodns.DNSResolver(timeout=self.timeout, tries=1)
-            resolver.nameservers = [ip]
-            await resolver.query('google.com', 'A')
+class _EngineProtocol(asyncio.DatagramProtocol):
+    def __init__(self, engine):
+        self.engine = engine
 
-            with open(self.output_file, 'a') as f:
-                f.write(f"{ip}\n")
+    def datagram_received(self, data, addr):
+        self.engine.datagram_received(data, addr)
 
-            console.print(f"[green][+] {ip} is a valid DNS resolver[/green]")
-            return True
-        except Exception:
-            pass
-        finally:
-            self.progress += 1
+    def error_received(self, exc):
+        pass
 
-    async def worker(self, queue):
-        while True:
-            ip = await queue.get()
-            try:
-                await self.check_ip(ip)
-            finally:
-                queue.task_done()
+    def pause_writing(self):
+        self.engine._writable.clear()
 
-    async def producer(self, queue, ranges_input):
-        """Produces IPs into the queue."""
-        for ip in TargetUtils.generate_targets(ranges_input):
-            await queue.put(ip)
+    def resume_writing(self):
+        self.engine._writable.set()
 
-    async def start_scan(self, ranges_input):
-        console.print(f"[yellow]→ Preparing DNS scan with limit {self.concurrency}...[/yellow]")
 
-        self.total = TargetUtils.count_targets(ranges_input)
-        console.print(f"[cyan]Total targets: {self.total}[/cyan]")
+class UdpDnsEngine:
+    """Probes many DNS servers from a handful of shared UDP sockets.
 
-        # Bounded queue to prevent memory issues
-        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+    The query packet is built once; each probe only prepends a transaction
+    ID and calls `sendto`. Replies are matched by (source address, txid) and
+    timeouts are enforced by a timer wheel that advances every `resolution`
+    seconds, so there is no task, timer or resolver object per probe.
+    `on_result(ip, token, ok, error)` is called exactly once per `send`.
+    """
 
-        # Start workers
-        workers = [asyncio.create_task(self.worker(queue)) for _ in range(self.concurrency)]
+    def __init__(self, on_result, qname='google.com', timeout=3.0, sockets=1, resolution=0.1):
+        self.on_result = on_result
+        self.timeout = timeout
+        self.sockets = sockets
+        self.resolution = resolution
+        self._query_tail = self.build_query(qname)[2:]
+        self._endpoints = {}
+        self._next_endpoint = 0
+        self._pending = {}
+        self._txid = random.randrange(1 << 16)
+        self._tick = 0
+        self._wheel = [[] for _ in range(int(timeout / resolution) + 2)]
+        self._ticker = None
+        self._writable = asyncio.Event()
+        self._writable.set()
+
+    @staticmethod
+    def build_query(qname, qtype=1):
+        """Standard recursive query for `qname` (A record by default) with txid 0."""
+        header = struct.pack('!HHHHHH', 0, 0x0100, 1, 0, 0, 0)
+        labels = b''.join(bytes([len(l)]) + l.encode() for l in qname.strip('.').split('.'))
+        return header + labels + b'\x00' + struct.pack('!HH', qtype, 1)
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        for family, host in ((socket.AF_INET, '0.0.0.0'), (socket.AF_INET6, '::')):
+            transports = []
+            for _ in range(self.sockets):
+                try:
+                    transport, _ = await loop.create_datagram_endpoint(
+                        lambda: _EngineProtocol(self), local_addr=(host, 0), family=family
+                    )
+                except OSError:
+                    # No IPv6 on this host; IPv4 probes still work
+                    break
+                transports.append(transport)
+            self._endpoints[family] = transports
+        self._ticker = asyncio.create_task(self._run_wheel())
+
+    @property
+    def in_flight(self):
+        return len(self._pending)
+
+    async def writable(self):
+        """Waits while the kernel send buffer is full."""
+        await self._writable.wait()
+
+    def send(self, ip, token):
+        family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+        transports = self._endpoints.get(family)
+        if not transports:
+            self.on_result(ip, token, False, OSError(f"No socket for address family of {ip}"))
+            return
+        self._txid = (self._txid + 1) & 0xFFFF
+        key = (ip, self._txid)
+        self._pending[key] = token
+        self._wheel[(self._tick + len(self._wheel) - 1) % len(self._wheel)].append(key)
+        self._next_endpoint = (self._next_endpoint + 1) % len(transports)
+        try:
+            transports[self._next_endpoint].sendto(self._txid.to_bytes(2, 'big') + self._query_tail, (ip, 53))
+        except OSError as e:
+            self._pending.pop(key, None)
+            self.on_result(ip, token, False, e)
+
+    def datagram_received(self, data, addr):
+        if len(data) < 12:
+            return
+        txid, flags, _, ancount = struct.unpack_from('!HHHH', data)
+        token = self._pending.pop((addr[0], txid), None)
+        if token is None:
+            # Late, duplicate or spoofed reply
+            return
+        ok = bool(flags & 0x8000) and (flags & 0x000F) == 0 and ancount > 0
+        self.on_result(addr[0], token, ok, None)
+
+    async def _run_wheel(self):
+        while True:
+            await asyncio.sleep(self.resolution)
+            self._tick += 1
+            slot = self._tick % len(self._wheel)
+            expired, self._wheel[slot] = self._wheel[slot], []
+            for key in expired:
+                token = self._pending.pop(key, None)
+                if token is not None:
+                    self.on_result(key[0], token, False, asyncio.TimeoutError())
+
+    def close(self):
+        if self._ticker:
+            self._ticker.cancel()
+        for transports in self._endpoints.values():
+            for transport in transports:
+                transport.close()
 
-        # Start producer
-        producer_task = asyncio.create_task(self.producer(queue, ranges_input))
 
-        # Wait for producer to finish
-        await producer_task
+class DNSScanner:
+    def __init__(self, concurrency=1000, output_file='valid_dns.txt', timeout=3.0, randomize=False, resume=False,
+                 output_format='plain', verbose=False, sockets=2, adaptive=False, max_concurrency=None):
+        # With the UDP engine, concurrency is the number of queries in flight (the starting
+        # limit with `adaptive`, which moves it up to `max_concurrency`)
+        self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.max_concurrency = max_concurrency
+        self.limiter = None
+        self.sockets = sockets
+        self.randomize = randomize
+        self.dashboard = ScanDashboard("DNS resolver scan", verbose=verbose)
+        self.resume = resume
+        self.checkpoint = None
+        self.output_file = output_file
+        self.sink = ResultSink(output_file, ['ip'], output_format, template="{ip}")
+        self.timeout = timeout
+        self.total = 0
+        self.progress = 0
+        self.start_time = time.time()
+        self._sent = {}
+        self._idle = None
+        # A resumed scan keeps the hits found before the interruption
+        if not resume and output_file != '-':
+            with open(self.output_file, 'w') as f:
+                pass
+
+    def on_result(self, ip, serial, ok, error):
+        """Engine callback, once per probe."""
+        self.progress += 1
+        self.dashboard.record(ok)
+        if ok:
+            self.sink.emit({'ip': ip})
+            if self.dashboard.verbose:
+                self.dashboard.log(f"[green][+] {ip} is a valid DNS resolver[/green]")
+        elif error is not None:
+            self.dashboard.error(error)
+        sent = self._sent.pop(serial, None)
+        if sent is not None:
+            self.limiter.observe(time.monotonic() - sent)
+        self.checkpoint.complete(serial)
+        self.limiter.release()
+        if not self.checkpoint.in_flight:
+            self._idle.set()
+
+    async def producer(self, engine, ranges_input):
+        """Sends one query per IP, starting at the checkpoint cursor, as the limiter lets queries in flight."""
+        async for position, ip in TargetUtils.agenerate_indexed(ranges_input, permute=self.randomize,
+                                                               seed=self.checkpoint.seed, start=self.checkpoint.cursor):
+            await self.limiter.acquire()
+            await engine.writable()
+            serial = self.checkpoint.dispatch(position)
+            self._idle.clear()
+            if TargetUtils.parse_block(ip) is None:
+                # Only literal IPs can be queried directly
+                self.on_result(ip, serial, False, ValueError(f"Not an IP address: {ip}"))
+                continue
+            self._sent[serial] = time.monotonic()
+            engine.send(ip, serial)
+
+    async def start_scan(self, ranges_input):
+        console.print(f"[yellow]→ Preparing DNS scan with limit {self.concurrency}...[/yellow]")
 
-        # Wait for queue to be fully processed
-        await queue.join()
+        targets = TargetUtils.load_manifest(ranges_input)
+        self.total = TargetUtils.count_targets(targets)
+        if not TargetUtils.is_stream(targets):
+            console.print(f"[cyan]Total targets: {self.total}[/cyan]")
+
+        params = {'scanner': 'dns', 'targets': targets.fingerprint(), 'randomize': self.randomize}
+        # Streamed targets cannot be replayed, so there is nothing to checkpoint
+        checkpoint_file = None if TargetUtils.is_stream(targets) else self.output_file
+        self.checkpoint = ScanCheckpoint.for_scan(checkpoint_file, params, self.resume)
+        self.progress = self.checkpoint.completed
+        await self.sink.start()
+        autosave = asyncio.create_task(self.checkpoint.autosave(self.sink.flush))
+        self.dashboard.total = self.total
+        self.limiter = AdaptiveLimiter(self.concurrency, self.max_concurrency, adaptive=self.adaptive,
+                                       hold=self.timeout + 1.0,
+                                       counters=lambda: (self.dashboard.done, self.dashboard.errors['timeout']))
+        self.dashboard.in_flight = lambda: self.checkpoint.in_flight
+        self.dashboard.limiter = self.limiter
+        self.dashboard.start(self.progress)
+        self.limiter.start()
+
+        self._idle = asyncio.Event()
+        self._idle.set()
+        engine = UdpDnsEngine(self.on_result, timeout=self.timeout, sockets=self.sockets)
+
+        finished = False
+        try:
+            await engine.open()
 
-        # Cancel workers
-        for w in workers:
-            w.cancel()
+            # Feed every target, then wait for the last replies or timeouts
+            await self.producer(engine, targets)
+            await self._idle.wait()
+            finished = True
+        finally:
+            self.limiter.stop()
+            engine.close()
+            self.dashboard.stop()
+            autosave.cancel()
+            await self.sink.close()
+            if finished:
+                self.checkpoint.clear()
+            else:
+                self.checkpoint.save()
 
         duration = int(time.time() - self.start_time)
+        console.print(f"[cyan]{self.dashboard.summary()}[/cyan]")
         console.print(f"\n[magenta][✓] Scan finished in {duration}s. Valid IPs saved to {self.output_file}[/magenta]")
 
     def run(self, ranges_input):
@@ -0,0 +1,286 @@
+import os
+import gzip
+import asyncio
+import time
+import contextlib
+import hashlib
+import sqlite3
+import threading
+
+
+class ResponseCache:
+    """On-disk cache of recon source responses.
+
+    An SQLite index keyed by source name and URL keeps each response's
+    `ETag` / `Last-Modified` validators, so an expired entry can be
+    revalidated with a conditional request instead of refetched. Bodies are
+    gzip files in `<path>.d/`, written and read back in chunks so that a
+    response of hundreds of megabytes never has to fit in memory. Only
+    successful responses are stored.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.body_dir = path + '.d'
+        os.makedirs(self.body_dir, exist_ok=True)
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "source TEXT NOT NULL, url TEXT NOT NULL, fetched REAL NOT NULL, etag TEXT, last_modified TEXT, "
+            "PRIMARY KEY (source, url))"
+        )
+
+    def body_path(self, source, url):
+        return os.path.join(self.body_dir, hashlib.sha1(f"{source}\n{url}".encode()).hexdigest() + '.gz')
+
+    def get(self, source, url):
+        """`(fetched, etag, last_modified)` or None."""
+        row = self._db.execute(
+            "SELECT fetched, etag, last_modified FROM entries WHERE source = ? AND url = ?", (source, url)
+        ).fetchone()
+        if row is None or not os.path.exists(self.body_path(source, url)):
+            return None
+        return row
+
+    def read(self, source, url, chunk_size=65536):
+        """Yields the stored body in chunks."""
+        with gzip.open(self.body_path(source, url), 'rb') as f:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    return
+                yield chunk
+
+    def writer(self, source, url):
+        """A `BodyWriter` for a new body; it replaces the entry only once committed."""
+        return BodyWriter(self, source, url)
+
+    def put(self, source, url, etag=None, last_modified=None):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO entries (source, url, fetched, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (source, url, time.time(), etag, last_modified),
+            )
+
+    def touch(self, source, url):
+        """Marks an entry as fresh again after a 304."""
+        with self._db:
+            self._db.execute("UPDATE entries SET fetched = ? WHERE source = ? AND url = ?",
+                             (time.time(), source, url))
+
+    def close(self):
+        self._db.close()
+
+
+class BodyWriter:
+    """Streams one response body into a temporary gzip file next to its final place."""
+
+    def __init__(self, cache, source, url):
+        self.cache = cache
+        self.source = source
+        self.url = url
+        self.path = cache.body_path(source, url)
+        # Unique per writer: two downloads of one URL may overlap, the last to commit wins
+        self._tmp = f"{self.path}.{os.getpid()}.{id(self):x}.tmp"
+        self._file = gzip.open(self._tmp, 'wb', compresslevel=1)
+
+    def write(self, chunk):
+        self._file.write(chunk)
+
+    def commit(self, etag=None, last_modified=None):
+        self._file.close()
+        os.replace(self._tmp, self.path)
+        self.cache.put(self.source, self.url, etag, last_modified)
+
+    def discard(self):
+        self._file.close()
+        try:
+            os.remove(self._tmp)
+        except OSError:
+            pass
+
+
+class SourceError(ConnectionError):
+    """A recon source failed; `status` is the HTTP status if it answered, `retry_after` its Retry-After."""
+
+    def __init__(self, source, message, status=None, retry_after=None):
+        super().__init__(f"{source}: {message}")
+        self.source = source
+        self.status = status
+        self.retry_after = retry_after
+
+    @staticmethod
+    def parse_retry_after(value):
+        """Seconds from a Retry-After header in its delta form; HTTP dates are ignored."""
+        try:
+            return max(0.0, float(value))
+        except (TypeError, ValueError):
+            return None
+
+
+class ReconClient:
+    """One pooled aiohttp session shared by the recon sources, with the response cache in front.
+
+    Use as `async with ReconClient(...) as client`. `stream(source, url)`
+    yields the body in chunks: from the cache while the entry is younger
+    than the source's TTL (`ttls`, seconds, falling back to `default_ttl`),
+    otherwise from the source, revalidating older entries with
+    `If-None-Match` / `If-Modified-Since` and serving a stale entry when the
+    source fails before sending anything. `get()` returns the whole body.
+    `cache_path=None` disables the cache.
+
+    `throttles` maps source names to `SourceThrottle`s: requests that reach
+    the network (cache hits do not) take a token and a slot, the slot given
+    back once the headers are in rather than after the body, and a
+    throttling failure is retried up to `retries` times once the source's
+    backoff has passed.
+    `tools` is the `ToolRunner` the run's external tools share.
+    """
+
+    def __init__(self, cache_path='recon_cache.sqlite', ttls=None, default_ttl=86400, timeout=20, limit=20,
+                 chunk_size=65536, throttles=None, retries=2, tools=None):
+        self.cache_path = cache_path
+        self.throttles = throttles or {}
+        self.tools = tools
+        self.retries = retries
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.cache = None
+        self.session = None
+        self.stats = {'fresh': 0, 'revalidated': 0, 'fetched': 0, 'stale': 0, 'failed': 0}
+
+    async def __aenter__(self):
+        import aiohttp
+        if self.cache_path:
+            self.cache = ResponseCache(self.cache_path)
+        connector = aiohttp.TCPConnector(limit=self.limit, ttl_dns_cache=300)
+        # Big responses stream for a long time: only connecting and silences are bounded
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.session.close()
+        if self.cache:
+            self.cache.close()
+
+    async def get(self, source, url, headers=None):
+        """Response body for `url` as bytes; raises ConnectionError if neither the source nor the cache has one."""
+        return b''.join([chunk async for chunk in self.stream(source, url, headers)])
+
+    async def stream(self, source, url, headers=None):
+        """Yields the response body for `url` in chunks, as it arrives.
+
+        Raises SourceError if neither the source nor the cache has it; a
+        download failing halfway raises after the chunks already yielded.
+        """
+        import aiohttp
+        entry = self.cache.get(source, url) if self.cache else None
+        if entry and time.time() - entry[0] < self.ttls.get(source, self.default_ttl):
+            self.stats['fresh'] += 1
+            async for chunk in self.read_cached(source, url):
+                yield chunk
+            return
+
+        headers = dict(headers or {})
+        if entry:
+            if entry[1]:
+                headers['If-None-Match'] = entry[1]
+            if entry[2]:
+                headers['If-Modified-Since'] = entry[2]
+        throttle = self.throttles.get(source)
+        error = None
+        resp = None
+        for attempt in range(self.retries + 1):
+            try:
+                # The throttle covers the request and its headers; the body streams after its slot is freed
+                async with (throttle.request() if throttle else contextlib.nullcontext()):
+                    resp = await self.session.get(url, headers=headers)
+                    if not (resp.status == 200 or resp.status == 304 and entry):
+                        resp.release()
+                        raise SourceError(source, f"HTTP {resp.status}", resp.status,
+                                          SourceError.parse_retry_after(resp.headers.get('Retry-After')))
+                break
+            except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+                resp = None
+                error = e
+            # Only throttling is worth another try, after the backoff the throttle now imposes
+            if not (throttle and throttle.is_throttling(error)):
+                break
+
+        if resp is not None:
+            sent = False
+            try:
+                if resp.status == 304:
+                    self.cache.touch(source, url)
+                    self.stats['revalidated'] += 1
+                    body = self.read_cached(source, url)
+                else:
+                    self.stats['fetched'] += 1
+                    body = self.download(source, url, resp)
+                async for chunk in body:
+                    sent = True
+                    yield chunk
+                return
+            except (aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+                if throttle:
+                    throttle.failed(e)
+                if sent:
+                    # Part of the body is out already; a stale copy cannot be spliced in
+                    raise SourceError(source, f"download interrupted: {e}") from e
+                error = e
+            finally:
+                resp.release()
+        if entry:
+            self.stats['stale'] += 1
+            async for chunk in self.read_cached(source, url):
+                yield chunk
+            return
+        self.stats['failed'] += 1
+        if isinstance(error, SourceError):
+            raise error
+        raise SourceError(source, str(error) or error.__class__.__name__) from error
+
+    async def read_cached(self, source, url):
+        """Yields a cached body in chunks, decompressed on the default executor rather than the event loop."""
+        loop = asyncio.get_running_loop()
+        chunks = self.cache.read(source, url, self.chunk_size)
+        # A read still running on its thread when the consumer stops must finish before the file is closed
+        lock = threading.Lock()
+
+        def step():
+            with lock:
+                return next(chunks, None)
+
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, step)
+                if chunk is None:
+                    return
+                yield chunk
+        finally:
+            with lock:
+                chunks.close()
+
+    async def download(self, source, url, resp):
+        """Yields `resp`'s body while writing it to the cache; the entry is only replaced once complete."""
+        writer = self.cache.writer(source, url) if self.cache else None
+        try:
+            async for chunk in resp.content.iter_chunked(self.chunk_size):
+                if writer:
+                    writer.write(chunk)
+                yield chunk
+        except BaseException:
+            if writer:
+                writer.discard()
+            raise
+        if writer:
+            writer.commit(resp.headers.get('ETag'), resp.headers.get('Last-Modified'))
+
+    def summary(self):
+        s = self.stats
+        return (f"Recon sources: {s['fetched']} fetched, {s['fresh']} from cache, {s['revalidated']} revalidated, "
+                f"{s['stale']} stale fallbacks, {s['failed']} failed")
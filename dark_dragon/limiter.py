@@ -0,0 +1,178 @@
+import os
+import time
+import asyncio
+from collections import deque
+
+try:
+    import resource
+except ImportError:
+    # Windows: no RLIMIT_NOFILE, the fd signal is skipped
+    resource = None
+
+
+class AdaptiveLimiter:
+    """AIMD controller for the number of probes in flight.
+
+    Probes take a slot with `acquire()` and give it back with `release()`.
+    Every `interval` seconds the controller looks at what happened since the
+    last adjustment:
+
+    - timeout rate: share of finished probes that timed out, compared with the
+      lowest rate seen so far (dead hosts time out at any concurrency, so only
+      the excess counts);
+    - latency: median probe duration against the best median seen;
+    - event-loop lag: how late the controller itself woke up;
+    - file descriptors: headroom below RLIMIT_NOFILE.
+
+    Any sign of congestion cuts the limit by `decrease`, then holds off
+    further cuts for `hold` seconds (probes started under the old limit are
+    still finishing). Otherwise, while the limit is actually used, it grows
+    by `increase`. With `adaptive=False` the limit stays at `initial`.
+    `counters()` must return the running `(done, timeouts)` totals.
+    """
+    # Default ceiling, as a multiple of the starting limit
+    GROWTH = 8
+
+    def __init__(self, initial, maximum=None, counters=None, adaptive=True, minimum=1, interval=1.0,
+                 increase=None, decrease=0.7, hold=2.0, timeout_margin=0.1, latency_factor=2.5,
+                 max_loop_lag=0.05, fd_reserve=64, min_samples=20):
+        self.adaptive = adaptive
+        self.initial = initial
+        self.maximum = max(maximum or initial * self.GROWTH, initial) if adaptive else initial
+        self.minimum = min(minimum, initial)
+        self.limit = float(initial)
+        self.counters = counters or (lambda: (0, 0))
+        self.interval = interval
+        self.increase = increase or max(1.0, initial / 10)
+        self.decrease = decrease
+        self.hold = hold
+        self.timeout_margin = timeout_margin
+        self.latency_factor = latency_factor
+        self.max_loop_lag = max_loop_lag
+        self.fd_reserve = fd_reserve
+        self.min_samples = min_samples
+        self.in_flight = 0
+        self.reasons = []
+        self.history = deque(maxlen=10)
+        self._waiters = deque()
+        self._peak = 0
+        self._latencies = []
+        self._base_timeout_rate = None
+        self._base_latency = None
+        self._hold_until = 0.0
+        self._last = (time.monotonic(), 0, 0)
+        self._task = None
+
+    async def acquire(self):
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self._take()
+            return
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def _take(self):
+        self.in_flight += 1
+        self._peak = max(self._peak, self.in_flight)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            future = self._waiters.popleft()
+            if not future.done():
+                self._take()
+                future.set_result(None)
+
+    def observe(self, latency):
+        """Records how long one probe took, in seconds."""
+        if len(self._latencies) < 1000:
+            self._latencies.append(latency)
+
+    def start(self):
+        if self.adaptive:
+            self._last = (time.monotonic(),) + tuple(self.counters())
+            self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            self.adjust(time.monotonic() - started - self.interval)
+
+    @staticmethod
+    def fd_headroom():
+        """File descriptors left before RLIMIT_NOFILE, or None where that cannot be read."""
+        if resource is None:
+            return None
+        try:
+            soft, _ = resource.getrlimit(resource.RLIMIT_NOFILE)
+            return soft - len(os.listdir('/proc/self/fd'))
+        except (OSError, ValueError):
+            return None
+
+    def adjust(self, loop_lag=0.0):
+        """One control step; normally run by the background task."""
+        now = time.monotonic()
+        done, timeouts = self.counters()
+        last_time, last_done, last_timeouts = self._last
+        self._last = (now, done, timeouts)
+        finished = done - last_done
+        samples, self._latencies = sorted(self._latencies), []
+        peak, self._peak = self._peak, self.in_flight
+
+        reasons = []
+        if finished >= self.min_samples:
+            rate = (timeouts - last_timeouts) / finished
+            if self._base_timeout_rate is None or rate < self._base_timeout_rate:
+                self._base_timeout_rate = rate
+            elif rate > self._base_timeout_rate + self.timeout_margin:
+                reasons.append('timeouts')
+        if len(samples) >= self.min_samples:
+            latency = samples[len(samples) // 2]
+            if self._base_latency is None or latency < self._base_latency:
+                self._base_latency = latency
+            elif latency > self._base_latency * self.latency_factor:
+                reasons.append('latency')
+        if loop_lag > self.max_loop_lag:
+            reasons.append('loop lag')
+        headroom = self.fd_headroom()
+        if headroom is not None and headroom < self.fd_reserve:
+            reasons.append('file descriptors')
+
+        if reasons and now >= self._hold_until:
+            self.limit = max(self.minimum, self.limit * self.decrease)
+            self._hold_until = now + self.hold
+        elif not reasons and peak >= int(self.limit):
+            self.limit = min(self.maximum, self.limit + self.increase)
+        if headroom is not None:
+            # Never plan for more sockets than the process may open
+            self.limit = max(self.minimum, min(self.limit, self.in_flight + headroom - self.fd_reserve))
+        self.reasons = reasons
+        self.history.append((self.limit, finished / max(now - last_time, 1e-6)))
+        self._wake()
+
+    def settled(self):
+        """`(limit, targets_per_sec)`: medians over the last adjustments."""
+        if not self.history:
+            return (self.limit, 0.0)
+        limits = sorted(h[0] for h in self.history)
+        rates = sorted(h[1] for h in self.history)
+        return (limits[len(limits) // 2], rates[len(rates) // 2])
+
+    def summary(self):
+        limit, rate = self.settled()
+        return f"concurrency settled at {limit:.0f} in flight, {rate:.0f}/s"
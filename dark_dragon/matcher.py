@@ -0,0 +1,105 @@
+import re
+import json
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+
+class KeywordMatcher:
+    """Matches several labelled keyword sets against a text in a single pass.
+
+    `keyword_sets` maps a label (e.g. 'cdn', 'payment') to its keywords.
+    Matching is case-insensitive and reports every occurrence, including
+    overlapping ones ('pay' inside 'payment'). With pyahocorasick installed
+    the scan runs on its automaton; otherwise the keywords are compiled into
+    one regex shaped like their prefix trie, which probes every position for
+    the longest keyword starting there, and the keywords that are prefixes of
+    it are added from a precomputed table. Either way the text is walked
+    once, and the per-position cost follows the trie depth, not the number
+    of keywords.
+    """
+
+    def __init__(self, keyword_sets):
+        self.keyword_sets = {label: sorted({kw.lower() for kw in kws if kw}) for label, kws in keyword_sets.items()}
+        # keyword -> labels it belongs to
+        self.labels_for = {}
+        for label, kws in self.keyword_sets.items():
+            for kw in kws:
+                self.labels_for.setdefault(kw, set()).add(label)
+        keywords = sorted(self.labels_for, key=len, reverse=True)
+        self._automaton = None
+        self._pattern = None
+        if not keywords:
+            return
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for kw in keywords:
+                self._automaton.add_word(kw, kw)
+            self._automaton.make_automaton()
+        else:
+            # Zero-width lookahead: every position is tried, longest keyword first
+            self._pattern = re.compile('(?=(%s))' % self.trie_regex(keywords))
+            # keyword -> every keyword that is a prefix of it (itself included)
+            self._prefixes = {kw: [kw[:i] for i in range(1, len(kw) + 1) if kw[:i] in self.labels_for]
+                              for kw in keywords}
+
+    @staticmethod
+    def trie_regex(keywords):
+        """Regex source matching the longest of `keywords`, with alternatives factored by shared prefix."""
+        trie = {}
+        for kw in keywords:
+            node = trie
+            for ch in kw:
+                node = node.setdefault(ch, {})
+            node[''] = True
+
+        def build(node):
+            branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+            if not branches:
+                return ''
+            body = branches[0] if len(branches) == 1 else '(?:%s)' % '|'.join(branches)
+            # A keyword ending here is still matched if no longer one continues it
+            return '(?:%s)?' % body if '' in node else body
+
+        return build(trie)
+
+    @classmethod
+    def load(cls, path, defaults=None):
+        """Builds a matcher from a JSON file of `{label: [keywords]}`; labels it omits keep `defaults`."""
+        with open(path, 'r') as f:
+            keyword_sets = json.load(f)
+        if not isinstance(keyword_sets, dict):
+            raise ValueError(f"{path}: expected an object mapping labels to keyword lists")
+        for label, keywords in keyword_sets.items():
+            # A bare string would otherwise be taken as a list of one-letter keywords
+            if not isinstance(keywords, list) or not all(isinstance(kw, str) for kw in keywords):
+                raise ValueError(f"{path}: '{label}' must be a list of strings")
+        return cls({**(defaults or {}), **keyword_sets})
+
+    def finditer(self, text):
+        """Yields `(start, keyword)` for every keyword occurrence in `text`."""
+        text = text.lower()
+        if self._automaton is not None:
+            for end, kw in self._automaton.iter(text):
+                yield end - len(kw) + 1, kw
+        elif self._pattern is not None:
+            for m in self._pattern.finditer(text):
+                start = m.start()
+                for kw in self._prefixes[m.group(1)]:
+                    yield start, kw
+
+    def matches(self, text, start=0, limit=None):
+        """Returns `{label: set(keywords)}` for occurrences starting in `[start, limit)`."""
+        found = {label: set() for label in self.keyword_sets}
+        for pos, kw in self.finditer(text):
+            if pos < start or (limit is not None and pos >= limit):
+                continue
+            for label in self.labels_for[kw]:
+                found[label].add(kw)
+        return found
+
+    def labels(self, text):
+        """Labels with at least one keyword in `text`."""
+        return {label for _, kw in self.finditer(text) for label in self.labels_for[kw]}
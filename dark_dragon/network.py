@@ -1,10 +1,27 @@
 import ssl
 import socket
 import asyncio
-import aiohttp
-import requests
 import time
+import aiohttp
 from .utils import console, TargetUtils
+from .checkpoint import ScanCheckpoint
+from .sink import ResultSink
+from .dashboard import ScanDashboard
+from .limiter import AdaptiveLimiter
+from .prefilter import ConnectPrefilter
+from .resolver import HostResolver
+
+
+class ConnectFailed(ConnectionError):
+    """The TCP connect of a probe failed: nothing answers on the port.
+
+    `os_error` is the original error (refused, unreachable, timed out), so
+    `ScanDashboard.classify` still buckets it by what actually happened.
+    """
+
+    def __init__(self, os_error):
+        super().__init__(str(os_error) or os_error.__class__.__name__)
+        self.os_error = os_error
 
 class NetworkScanner:
     # Legacy synchronous methods (kept for backward compatibility or single target use)
@@ -53,6 +70,7 @@ class NetworkScanner:
     @staticmethod
     def scan_http(domain, port, timeout=3):
         try:
+            import requests
             url = f"http://{domain}:{port}"
             resp = requests.get(url, timeout=timeout, allow_redirects=False)
             server = resp.headers.get('Server', 'Unknown')
@@ -65,6 +83,7 @@ class NetworkScanner:
     @staticmethod
     def scan_https(domain, port, timeout=3):
         try:
+            import requests
             url = f"https://{domain}:{port}"
             resp = requests.get(url, timeout=timeout, verify=False, allow_redirects=False)
             server = resp.headers.get('Server', 'Unknown')
@@ -76,159 +95,402 @@ class NetworkScanner:
 
 
 class AsyncNetworkScanner:
-    def __init__(self, mode, port, concurrency, output_file):
-        self.mode = mode
-        self.port = port
+    """Bulk SNI / SSL / proxy / HTTP(S) prober.
+
+    `mode` and `port` each take one value or several (a list or a comma
+    separated string); with several, every target is probed on every
+    (port, mode) pair and each result is tagged with its port and mode.
+    """
+    MODE_NAMES = {'1': 'sni', '2': 'ssl', '3': 'proxy', '4': 'http', '5': 'https'}
+
+    def __init__(self, mode, port, concurrency, output_file, randomize=False, resume=False, output_format='plain',
+                 verbose=False, handshake_only=False, adaptive=False, max_concurrency=None, prefilter=False,
+                 connect_timeout=0.5, prefilter_concurrency=2000, resolve=False, resolve_concurrency=1000,
+                 nameservers=None):
+        self.modes = self.parse_modes(mode)
+        self.ports = self.parse_ports(port)
+        self.matrix = len(self.modes) * len(self.ports) > 1
+        self.probe_counts = {'run': 0, 'shared': 0, 'skipped': 0}
+        # Starting limit; with `adaptive` the limiter moves it up to `max_concurrency`
         self.concurrency = concurrency
+        self.adaptive = adaptive
+        self.max_concurrency = max_concurrency
+        self.limiter = None
+        # Optional TCP connect stage in front of the probes
+        self.prefilter = prefilter
+        self.connect_timeout = connect_timeout
+        self.prefilter_concurrency = prefilter_concurrency
+        # Optional bulk DNS stage for domain targets; the probes then connect to the cached address
+        self.resolver = HostResolver(self.skip, resolve_concurrency, nameservers) if resolve else None
         self.output_file = output_file
+        self.handshake_only = handshake_only
+        self.sink = ResultSink(output_file, ['target', 'port', 'mode', 'detail', 'latency_ms'], output_format,
+                               template="{target}:{port}\t{mode}" if len(self.modes) > 1 else "{target}:{port}")
+        # Built once per scan: loading the CA store per target dominates TLS sweeps
+        self.sni_context = ssl.create_default_context()
+        self.ssl_context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
+        self.ssl_context.check_hostname = False
+        self.ssl_context.verify_mode = ssl.CERT_NONE
+        self.randomize = randomize
+        names = '/'.join(self.MODE_NAMES[m] for m in self.modes).upper()
+        ports = ','.join(map(str, self.ports))
+        self.dashboard = ScanDashboard(f"{names} scan on port{'s' if len(self.ports) > 1 else ''} {ports}",
+                                       verbose=verbose)
+        self.resume = resume
+        self.checkpoint = None
         self.total = 0
         self.progress = 0
         self.start_time = time.time()
 
-    def _append_to_file(self, content):
-        with open(self.output_file, 'a') as f:
-            f.write(content)
+    @classmethod
+    def parse_modes(cls, mode):
+        """Mode keys or names, one or several, as sorted unique keys; TLS probes come first so they can be shared."""
+        items = mode.split(',') if isinstance(mode, str) else list(mode)
+        names = {name: key for key, name in cls.MODE_NAMES.items()}
+        modes = set()
+        for item in items:
+            item = str(item).strip().lower()
+            if item not in cls.MODE_NAMES and item not in names:
+                raise ValueError(f"unknown mode: {item}")
+            modes.add(names.get(item, item))
+        return sorted(modes)
 
-    async def check_sni(self, domain, port, timeout=3):
+    @staticmethod
+    def parse_ports(port):
+        """One port or several (list or comma separated), de-duplicated in the given order."""
+        if isinstance(port, int):
+            return [port]
+        items = port.split(',') if isinstance(port, str) else port
+        ports = []
+        for item in items:
+            value = int(item)
+            if not 0 < value < 65536:
+                raise ValueError(f"port out of range: {value}")
+            if value not in ports:
+                ports.append(value)
+        return ports
+
+    def connect_host(self, target):
+        """Where to connect for `target`: its pre-resolved address, or the target itself."""
+        return (self.resolver and self.resolver.address(target)) or target
+
+    @staticmethod
+    def port_closed(exc, mode=None):
+        """True if `exc`, from a probe in `mode`, shows that nothing listens on the port: the TCP connect failed.
+
+        Timeouts and resets after the connect (TLS handshake, reading the
+        reply) come from a live port and do not count. aiohttp times the
+        HTTPS handshake as part of the connect, so there a connect timeout
+        is not proof either.
+        """
+        if isinstance(exc, ConnectFailed):
+            return True
+        if isinstance(exc, getattr(aiohttp, 'ConnectionTimeoutError', ())):
+            return mode != '5'
+        return isinstance(exc, aiohttp.ClientConnectorError) and not isinstance(exc, aiohttp.ClientSSLError)
+
+    async def connect(self, domain, port, timeout):
+        """TCP connection to `domain` as `(transport, protocol)`; raises ConnectFailed if the connect fails."""
+        loop = asyncio.get_running_loop()
         try:
-            # Equivalent to ssl.create_default_context()
-            context = ssl.create_default_context()
-            # In asyncio, we use open_connection with ssl argument
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(domain, port, ssl=context, server_hostname=domain),
-                timeout=timeout
-            )
-            # Get certificate
-            sock = writer.get_extra_info('ssl_object')
-            if sock:
-                cert = sock.getpeercert()
-                issuer = cert.get('issuer')
-                issuer_str = str(issuer)
-                writer.close()
-                await writer.wait_closed()
-                return (True, f"Handshake success | Issuer: {issuer_str}")
-
-            writer.close()
-            await writer.wait_closed()
-            return (False, "No SSL object")
-        except Exception as e:
-            return (False, str(e))
+            return await asyncio.wait_for(loop.create_connection(asyncio.Protocol, self.connect_host(domain), port),
+                                          timeout=timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectFailed(e) from e
 
-    async def check_ssl(self, domain, port, timeout=3):
+    async def open_tls(self, domain, port, context, timeout):
+        """TLS connection as `(transport, latency_ms)`, the latency covering connect + handshake.
+
+        The connect and the handshake get `timeout` each; only a failed
+        connect raises ConnectFailed.
+        """
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        transport, protocol = await self.connect(domain, port, timeout)
         try:
-            context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
-            context.check_hostname = False
-            context.verify_mode = ssl.CERT_NONE
-            reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(domain, port, ssl=context, server_hostname=domain),
-                timeout=timeout
-            )
-            writer.close()
-            await writer.wait_closed()
-            return (True, "SSL connection success")
-        except Exception as e:
-            return (False, str(e))
+            transport = await asyncio.wait_for(
+                loop.start_tls(transport, protocol, context, server_hostname=domain), timeout=timeout)
+        except BaseException:
+            transport.abort()
+            raise
+        return transport, (time.perf_counter() - started) * 1000
+
+    async def handshake(self, domain, port, context, timeout=3):
+        """Handshake-only TLS probe.
+
+        Uses a bare protocol instead of a stream, aborts the connection as soon
+        as the handshake (and with it the certificate) is done and returns
+        `(certificate, latency_ms)`, the latency covering connect + handshake.
+        """
+        transport, latency = await self.open_tls(domain, port, context, timeout)
+        ssl_object = transport.get_extra_info('ssl_object')
+        cert = ssl_object.getpeercert() if ssl_object else None
+        transport.abort()
+        return cert, latency
+
+    async def check_sni(self, domain, port, timeout=3):
+        if self.handshake_only:
+            cert, latency = await self.handshake(domain, port, self.sni_context, timeout)
+            issuer_str = str(cert.get('issuer')) if cert else None
+            return (True, f"Handshake success | Issuer: {issuer_str} | {latency:.1f} ms", round(latency, 1))
+
+        transport, _ = await self.open_tls(domain, port, self.sni_context, timeout)
+        # Get certificate
+        sock = transport.get_extra_info('ssl_object')
+        transport.close()
+        if sock:
+            cert = sock.getpeercert()
+            issuer = cert.get('issuer')
+            issuer_str = str(issuer)
+            return (True, f"Handshake success | Issuer: {issuer_str}")
+        return (False, "No SSL object")
+
+    async def check_ssl(self, domain, port, timeout=3):
+        if self.handshake_only:
+            _, latency = await self.handshake(domain, port, self.ssl_context, timeout)
+            return (True, f"SSL connection success | {latency:.1f} ms", round(latency, 1))
+
+        transport, _ = await self.open_tls(domain, port, self.ssl_context, timeout)
+        transport.close()
+        return (True, "SSL connection success")
 
     async def check_proxy(self, domain, port, timeout=3):
         try:
             reader, writer = await asyncio.wait_for(
-                asyncio.open_connection(domain, port),
+                asyncio.open_connection(self.connect_host(domain), port),
                 timeout=timeout
             )
-            connect_req = f"CONNECT google.com:443 HTTP/1.1\r\nHost: google.com\r\n\r\n"
-            writer.write(connect_req.encode())
-            await writer.drain()
+        except (OSError, asyncio.TimeoutError) as e:
+            raise ConnectFailed(e) from e
+        connect_req = f"CONNECT google.com:443 HTTP/1.1\r\nHost: google.com\r\n\r\n"
+        writer.write(connect_req.encode())
+        await writer.drain()
 
-            data = await asyncio.wait_for(reader.read(1024), timeout=timeout)
-            resp = data.decode(errors='ignore')
+        data = await asyncio.wait_for(reader.read(1024), timeout=timeout)
+        resp = data.decode(errors='ignore')
 
-            writer.close()
-            await writer.wait_closed()
+        writer.close()
+        await writer.wait_closed()
 
-            if '200 Connection established' in resp or 'HTTP/1.1 200' in resp:
-                return (True, 'Proxy OK')
-            return (False, 'Proxy connection failed')
-        except Exception as e:
-            return (False, str(e))
+        if '200 Connection established' in resp or 'HTTP/1.1 200' in resp:
+            return (True, 'Proxy OK')
+        return (False, 'Proxy connection failed')
+
+    @staticmethod
+    def request_timeout(timeout):
+        """aiohttp timeouts for one HTTP(S) probe: `timeout` for the TCP connect, twice that for the whole request.
+
+        With its own connect budget a dead port fails as a connect timeout,
+        telling it apart from a live one that is slow to answer.
+        """
+        return aiohttp.ClientTimeout(total=timeout * 2, sock_connect=timeout)
 
     async def check_http(self, session, domain, port, timeout=3):
-        try:
-            url = f"http://{domain}:{port}"
-            async with session.get(url, timeout=timeout, allow_redirects=False) as r:
-                server = r.headers.get('Server', 'Unknown')
-                if r.status == 302:
-                    return (False, f"Redirect 302 ignored | Server: {server}")
-                return (True, f"{r.status} OK | Server: {server}")
-        except Exception as e:
-            return (False, str(e))
+        url = f"http://{TargetUtils.url_host(domain)}:{port}"
+        async with session.get(url, timeout=self.request_timeout(timeout), allow_redirects=False) as r:
+            server = r.headers.get('Server', 'Unknown')
+            if r.status == 302:
+                return (False, f"Redirect 302 ignored | Server: {server}")
+            return (True, f"{r.status} OK | Server: {server}")
 
     async def check_https(self, session, domain, port, timeout=3):
+        url = f"https://{TargetUtils.url_host(domain)}:{port}"
+        async with session.get(url, timeout=self.request_timeout(timeout), ssl=False, allow_redirects=False) as r:
+            server = r.headers.get('Server', 'Unknown')
+            if r.status == 302:
+                return (False, f"Redirect 302 ignored | Server: {server}")
+            return (True, f"{r.status} OK | Server: {server}")
+
+    async def probe(self, session, mode, target, port):
+        """Runs one check; returns `(result, exc)`, `exc` being what made it fail, if anything."""
         try:
-            url = f"https://{domain}:{port}"
-            async with session.get(url, timeout=timeout, ssl=False, allow_redirects=False) as r:
-                server = r.headers.get('Server', 'Unknown')
-                if r.status == 302:
-                    return (False, f"Redirect 302 ignored | Server: {server}")
-                return (True, f"{r.status} OK | Server: {server}")
+            if mode == '1': # SNI
+                return await self.check_sni(target, port), None
+            if mode == '2': # SSL
+                return await self.check_ssl(target, port), None
+            if mode == '3': # Proxy
+                return await self.check_proxy(target, port), None
+            if mode == '4': # HTTP
+                return await self.check_http(session, target, port), None
+            return await self.check_https(session, target, port), None
         except Exception as e:
-            return (False, str(e))
+            self.dashboard.error(e)
+            return (False, str(e)), e
+
+    async def probe_port(self, session, target, port):
+        """Every mode on one port, in order, as `[(port, mode, result)]`.
+
+        The SNI handshake also answers the SSL probe: if it completes, or only
+        the certificate check fails, the port speaks TLS; any other TLS error
+        would fail the unverified handshake the same way. Once a probe's TCP
+        connect fails (nothing listening), the remaining modes on the port are
+        skipped; a timeout after the connect does not count.
+        """
+        results = []
+        shared = {}
+        dead = None
+        for mode in self.modes:
+            if dead:
+                self.probe_counts['skipped'] += 1
+                results.append((port, mode, (False, f"skipped, port closed ({dead})")))
+                continue
+            if mode in shared:
+                self.probe_counts['shared'] += 1
+                results.append((port, mode, shared[mode]))
+                continue
+            result, exc = await self.probe(session, mode, target, port)
+            self.probe_counts['run'] += 1
+            results.append((port, mode, result))
+            if exc is not None and self.port_closed(exc, mode):
+                dead = (getattr(exc, 'os_error', None) or exc).__class__.__name__
+            elif mode == '1' and (result[0] or isinstance(exc, ssl.SSLCertVerificationError)):
+                shared['2'] = (True, "SSL connection success (SNI handshake)", *result[2:])
+            elif mode == '1' and isinstance(exc, ssl.SSLError):
+                shared['2'] = result
+        return results
+
+    async def probe_target(self, session, target, open_ports=None):
+        """All (port, mode) probes for one target; the ports run concurrently.
+
+        Ports the pre-filter found closed (not in `open_ports`) are skipped outright.
+        """
+        ports = [p for p in self.ports if open_ports is None or p in open_ports]
+        results = []
+        for found in await asyncio.gather(*(self.probe_port(session, target, port) for port in ports)):
+            results.extend(found)
+        for port in self.ports:
+            if port not in ports:
+                self.probe_counts['skipped'] += len(self.modes)
+                results.extend((port, mode, (False, "skipped, port closed (pre-filter)")) for mode in self.modes)
+        return results
+
+    def skip(self, serial, target, exc):
+        """Pre-filter / resolver callback for a closed port or missing name: counted as a failed probe."""
+        self.progress += 1
+        self.dashboard.record(False)
+        self.dashboard.error(exc)
+        if self.matrix:
+            self.probe_counts['skipped'] += len(self.modes) * len(self.ports)
+        if self.dashboard.verbose:
+            state = 'no such host' if isinstance(exc, socket.gaierror) else 'closed'
+            self.dashboard.log(f"[red][{self.progress}/{self.total}] {target} | {state} ({exc.__class__.__name__})[/red]")
+        self.checkpoint.complete(serial)
 
     async def worker(self, session, queue):
         while True:
-            target = await queue.get()
+            serial, target, open_ports = await queue.get()
+            await self.limiter.acquire()
+            started = time.monotonic()
             try:
-                result = (False, "")
-
-                # Check mode and call appropriate async function
-                if self.mode == '1': # SNI
-                    result = await self.check_sni(target, self.port)
-                elif self.mode == '2': # SSL
-                    result = await self.check_ssl(target, self.port)
-                elif self.mode == '3': # Proxy
-                    result = await self.check_proxy(target, self.port)
-                elif self.mode == '4': # HTTP
-                    result = await self.check_http(session, target, self.port)
-                elif self.mode == '5': # HTTPS
-                    result = await self.check_https(session, target, self.port)
+                results = await self.probe_target(session, target, open_ports)
 
                 # Progress Update
                 self.progress += 1
 
-                if result[0]:
-                    # Positive result
-                    console.print(f"[green][{self.progress}/{self.total}] {target} | {result[1]}[/green]")
-                    if self.output_file:
-                        loop = asyncio.get_event_loop()
-                        await loop.run_in_executor(None, self._append_to_file, f"{target}:{self.port}\n")
-                else:
-                    # Negative result
-                     console.print(f"[red][{self.progress}/{self.total}] {target} | {result[1]}[/red]")
+                # A target counts as a hit when any of its probes succeeded
+                self.dashboard.record(any(result[0] for _, _, result in results))
+
+                for port, mode, result in results:
+                    if result[0]:
+                        # Positive result
+                        self.sink.emit({'target': target, 'port': port, 'mode': self.MODE_NAMES[mode],
+                                        'detail': result[1], 'latency_ms': result[2] if len(result) > 2 else ''})
+                    if self.dashboard.verbose:
+                        color = 'green' if result[0] else 'red'
+                        tag = f"{port}/{self.MODE_NAMES[mode]} " if self.matrix else ""
+                        self.dashboard.log(f"[{color}][{self.progress}/{self.total}] {target} | {tag}{result[1]}[/{color}]")
 
             except Exception as main_e:
-                console.print(f"[red][!] Error scanning {target}: {main_e}[/red]")
+                self.dashboard.error(main_e)
+                self.dashboard.log(f"[red][!] Error scanning {target}: {main_e}[/red]")
             finally:
+                self.limiter.observe(time.monotonic() - started)
+                self.limiter.release()
+                self.checkpoint.complete(serial)
                 queue.task_done()
 
-    async def start_scan(self, targets_input):
-        console.print(f"[yellow]→ Preparing bulk scan ({self.mode}) with limit {self.concurrency}...[/yellow]")
+    async def start_scan(self, targets_input, shard=None):
+        modes = ','.join(self.MODE_NAMES[m] for m in self.modes)
+        console.print(f"[yellow]→ Preparing bulk scan ({modes}) with limit {self.concurrency}...[/yellow]")
+
+        targets = TargetUtils.load_manifest(targets_input)
+        self.total = TargetUtils.count_targets(targets, shard)
+        self.limiter = AdaptiveLimiter(self.concurrency, self.max_concurrency, adaptive=self.adaptive, hold=4.0,
+                                       counters=lambda: (self.dashboard.done, self.dashboard.errors['timeout']))
+        queue = asyncio.Queue(maxsize=self.limiter.maximum * 2)
+        stage1 = None
+        if self.prefilter:
+            address = self.resolver.address if self.resolver else None
+            stage1 = ConnectPrefilter(self.ports, self.skip, self.connect_timeout, self.prefilter_concurrency, address)
+        # Stages in front of the probes, in order
+        stages = [stage for stage in (self.resolver, stage1) if stage]
 
-        self.total = TargetUtils.count_targets(targets_input)
-        queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        # A single mode and port keep the parameters (and checkpoints) of the one-probe scanner
+        params = {'scanner': 'network', 'mode': ','.join(self.modes),
+                  'port': self.ports[0] if len(self.ports) == 1 else self.ports, 'targets': targets.fingerprint(),
+                  'shard': list(shard) if shard else None, 'randomize': self.randomize}
+        # Streamed targets cannot be replayed, so there is nothing to checkpoint
+        checkpoint_file = None if TargetUtils.is_stream(targets) else self.output_file
+        self.checkpoint = ScanCheckpoint.for_scan(checkpoint_file, params, self.resume)
+        self.progress = self.checkpoint.completed
+        await self.sink.start()
+        autosave = asyncio.create_task(self.checkpoint.autosave(self.sink.flush))
+        self.dashboard.total = self.total
+        self.dashboard.in_flight = lambda: self.checkpoint.in_flight
+        self.dashboard.limiter = self.limiter
+        self.dashboard.start(self.progress)
+        self.limiter.start()
+
+        finished = False
+        try:
+            # Each target may hold one connection per port
+            connector = aiohttp.TCPConnector(ssl=False, limit=self.limiter.maximum * len(self.ports),
+                                             resolver=self.resolver.connector_resolver() if self.resolver else None)
+            async with aiohttp.ClientSession(connector=connector) as session:
+                # The limiter decides how many of the workers probe at once
+                workers = [asyncio.create_task(self.worker(session, queue)) for _ in range(self.limiter.maximum)]
 
-        connector = aiohttp.TCPConnector(ssl=False, limit=self.concurrency)
-        async with aiohttp.ClientSession(connector=connector) as session:
-            workers = [asyncio.create_task(self.worker(session, queue)) for _ in range(self.concurrency)]
+                # Targets pass the resolver (missing names drop out) and the pre-filter (closed ports
+                # drop out) before reaching `queue`; each stage feeds the next through its own queue
+                queues = [queue]
+                for stage in reversed(stages):
+                    inbox = asyncio.Queue(maxsize=stage.concurrency * 2)
+                    workers += stage.start(inbox, queues[0], reserved=self.limiter.maximum)
+                    queues.insert(0, inbox)
+                inbox = queues[0]
 
-            for target in TargetUtils.generate_targets(targets_input):
-                await queue.put(target)
+                async for position, target in TargetUtils.agenerate_indexed(targets, shard, self.randomize,
+                                                                           self.checkpoint.seed, self.checkpoint.cursor):
+                    await inbox.put((self.checkpoint.dispatch(position), target, None))
 
-            await queue.join()
+                # Wait for every stage to drain, front to back
+                for stage_queue in queues:
+                    await stage_queue.join()
 
-            for w in workers:
-                w.cancel()
+                for w in workers:
+                    w.cancel()
+            finished = True
+        finally:
+            self.limiter.stop()
+            if self.resolver:
+                await self.resolver.close()
+            self.dashboard.stop()
+            autosave.cancel()
+            await self.sink.close()
+            if finished:
+                self.checkpoint.clear()
+            else:
+                self.checkpoint.save()
 
         duration = int(time.time() - self.start_time)
-        console.print(f"\n[magenta][✓] Scan finished in {duration}s. Total Targets: {self.total}[/magenta]")
+        console.print(f"[cyan]{self.dashboard.summary()}[/cyan]")
+        for stage in stages:
+            console.print(f"[cyan]{stage.summary()}[/cyan]")
+        if self.matrix:
+            counts = self.probe_counts
+            console.print(f"[cyan]Probes: {counts['run']} run, {counts['shared']} answered by a shared handshake, "
+                          f"{counts['skipped']} skipped on closed ports[/cyan]")
+        console.print(f"\n[magenta][✓] Scan finished in {duration}s. Total Targets: {self.total or self.progress}[/magenta]")
 
     def run_bulk(self, targets_input):
         asyncio.run(self.start_scan(targets_input))
@@ -0,0 +1,81 @@
+import errno
+import asyncio
+from .limiter import AdaptiveLimiter
+
+
+class ConnectPrefilter:
+    """First stage of a two-stage scan: one bare TCP connect per target.
+
+    Workers take `(serial, target, _)` items from an inbox, try a connect to
+    each of `ports` with a tight `timeout` and abort it as soon as it
+    succeeds. Targets with an open port go on to the outbox as
+    `(serial, target, open_ports)` for the expensive HTTP/TLS stage; targets
+    with every port closed, filtered or unreachable are handed to
+    `on_closed(serial, target, exc)` and never cost a full probe. Running out
+    of file descriptors is not a closed port: the connect is retried once
+    sockets free up. `address(target)`, if given, maps a target to the host
+    to connect to (e.g. a pre-resolved IP); it may return None.
+    """
+    # Sockets kept free for the second stage, the sink and the event loop
+    FD_RESERVE = 128
+
+    def __init__(self, ports, on_closed, timeout=0.5, concurrency=2000, address=None):
+        self.ports = [ports] if isinstance(ports, int) else list(ports)
+        self.on_closed = on_closed
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.address = address
+        self.open = 0
+        self.closed = 0
+
+    def worker_count(self, reserved=0):
+        """`concurrency`, capped by the file descriptors left after `reserved` for the next stage.
+
+        Each worker holds one socket per port.
+        """
+        headroom = AdaptiveLimiter.fd_headroom()
+        if headroom is None:
+            return self.concurrency
+        return max(1, min(self.concurrency, (headroom - reserved - self.FD_RESERVE) // len(self.ports)))
+
+    async def connect(self, host, port):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                transport, _ = await asyncio.wait_for(
+                    loop.create_connection(asyncio.Protocol, host, port), self.timeout
+                )
+            except OSError as e:
+                if e.errno in (errno.EMFILE, errno.ENFILE):
+                    await asyncio.sleep(0.05)
+                    continue
+                raise
+            transport.abort()
+            return
+
+    async def worker(self, inbox, outbox):
+        while True:
+            serial, target, _ = await inbox.get()
+            try:
+                host = (self.address and self.address(target)) or target
+                outcomes = await asyncio.gather(*(self.connect(host, port) for port in self.ports),
+                                                return_exceptions=True)
+                open_ports = tuple(port for port, exc in zip(self.ports, outcomes) if exc is None)
+                if open_ports:
+                    self.open += 1
+                    await outbox.put((serial, target, open_ports))
+                else:
+                    self.closed += 1
+                    self.on_closed(serial, target, outcomes[0])
+            finally:
+                inbox.task_done()
+
+    def start(self, inbox, outbox, reserved=0):
+        return [asyncio.create_task(self.worker(inbox, outbox)) for _ in range(self.worker_count(reserved))]
+
+    def summary(self):
+        if len(self.ports) == 1:
+            return f"TCP pre-filter on port {self.ports[0]}: {self.open} open, {self.closed} closed or filtered"
+        ports = ','.join(map(str, self.ports))
+        return (f"TCP pre-filter on ports {ports}: {self.open} targets with an open port, "
+                f"{self.closed} with all closed or filtered")
@@ -0,0 +1,98 @@
+import time
+import asyncio
+import contextlib
+
+
+class SourceThrottle:
+    """Token bucket, concurrency cap and backoff for one recon source.
+
+    One throttle per source is shared by every domain of a run. Calls take
+    a token (`rate` per second, up to `burst` saved) and one of
+    `concurrency` slots. A call failing in a way that means "slow down"
+    (HTTP 429/503, timeouts) blocks new calls for the server's Retry-After
+    or an exponential delay starting at `backoff` and doubling up to
+    `max_backoff`; the next success resets it. Sources never wait on each
+    other: a throttled source only delays its own calls.
+    """
+
+    def __init__(self, name, rate=1.0, burst=1, concurrency=4, backoff=5.0, max_backoff=300.0):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.tokens = float(burst)
+        self.blocked_until = 0.0
+        self._delay = backoff
+        self._updated = time.monotonic()
+        self._slots = asyncio.Semaphore(concurrency)
+        # Per-domain calls, names they produced and calls that failed
+        self.calls = 0
+        self.names = 0
+        self.failures = 0
+        # Individual requests, backoffs and the time spent waiting for a token
+        self.requests = 0
+        self.backoffs = 0
+        self.waited = 0.0
+
+    async def acquire(self):
+        await self._slots.acquire()
+        started = time.monotonic()
+        try:
+            while True:
+                now = time.monotonic()
+                if now < self.blocked_until:
+                    await asyncio.sleep(self.blocked_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    break
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+        except BaseException:
+            # Cancelled while waiting for a token: the slot must not stay taken
+            self._slots.release()
+            raise
+        self.waited += time.monotonic() - started
+        self.requests += 1
+
+    def release(self):
+        self._slots.release()
+
+    @staticmethod
+    def is_throttling(exc):
+        """True for failures that ask the client to slow down."""
+        if getattr(exc, 'status', None) in (429, 503):
+            return True
+        return isinstance(exc, (asyncio.TimeoutError, TimeoutError))
+
+    def failed(self, exc):
+        if not self.is_throttling(exc):
+            return
+        self.backoffs += 1
+        delay = getattr(exc, 'retry_after', None) or self._delay
+        self._delay = min(self._delay * 2, self.max_backoff)
+        self.blocked_until = max(self.blocked_until, time.monotonic() + min(delay, self.max_backoff))
+
+    def succeeded(self):
+        self._delay = self.backoff
+
+    @contextlib.asynccontextmanager
+    async def request(self):
+        """One rate-limited request; a throttling exception out of the block triggers the backoff."""
+        await self.acquire()
+        try:
+            yield
+        except Exception as e:
+            self.failed(e)
+            raise
+        else:
+            self.succeeded()
+        finally:
+            self.release()
+
+    def summary(self, elapsed):
+        rate = self.names / max(elapsed, 1e-6)
+        return (f"{self.name}: {self.calls} calls, {self.names} names ({rate:.1f}/s), {self.failures} failed, "
+                f"{self.requests} requests, {self.backoffs} backoffs, {self.waited:.0f}s waiting")
@@ -1,109 +1,432 @@
+import json
+import codecs
 import asyncio
-import aiohttp
-import subprocess
 import shutil
-import requests
-from bs4 import BeautifulSoup
-from .utils import console
+import importlib.util
+from .utils import console, AsyncTargetStream, TargetStream
+from .httpcache import ReconClient, SourceError
+from .ratelimit import SourceThrottle
+from .tools import ToolRunner
+from .subdomains import SubdomainStore
 
 class SubdomainRecon:
+    # API source endpoints, `{domain}` filled in; point them at a local stand-in to test
+    SOURCE_URLS = {
+        'crtsh': "https://crt.sh/?q=%25.{domain}&output=json",
+        'alienvault': "https://otx.alienvault.com/api/v1/indicators/domain/{domain}/passive_dns",
+        'virustotal': "https://www.virustotal.com/api/v3/domains/{domain}/subdomains",
+    }
+    # Seconds a cached source response counts as fresh; older ones are revalidated
+    CACHE_TTLS = {'crtsh': 6 * 3600, 'alienvault': 12 * 3600, 'virustotal': 24 * 3600}
+    CACHE_PATH = 'recon_cache.sqlite'
+    # External tools run when installed: argv ({domain} filled in) and seconds before the run is cut short
+    TOOLS = {
+        'subfinder': (['subfinder', '-d', '{domain}', '-silent'], 60),
+    }
+    # Tool processes running at once over a whole run
+    MAX_TOOL_PROCESSES = 4
+    # Budget per source, shared by every domain of a run: calls per second, burst, calls at once
+    THROTTLES = {
+        'crtsh': dict(rate=0.5, burst=2, concurrency=2),
+        'alienvault': dict(rate=2.0, burst=5, concurrency=5),
+        'virustotal': dict(rate=4 / 60, burst=1, concurrency=1),  # public API: 4 requests a minute
+        'dnsdumpster': dict(rate=0.2, burst=1, concurrency=1),
+        'subfinder': dict(rate=5.0, burst=5, concurrency=4),
+        'sublist3r': dict(rate=1.0, burst=2, concurrency=2),
+    }
+
     @staticmethod
-    async def extract_subdomains(domain, virustotal_api_key=None):
-        console.print(f"[cyan]Extracting subdomains for {domain} from multiple sources...[/cyan]")
+    def client(cache_path=CACHE_PATH):
+        """Shared session, response cache and source throttles for a recon run; `cache_path=None` disables the cache."""
+        throttles = {name: SourceThrottle(name, **limits) for name, limits in SubdomainRecon.THROTTLES.items()}
+        return ReconClient(cache_path, SubdomainRecon.CACHE_TTLS, throttles=throttles,
+                           tools=ToolRunner(SubdomainRecon.MAX_TOOL_PROCESSES))
 
-        tasks = []
+    @staticmethod
+    async def fetch_source(client, source, domain, headers=None):
+        """Response body from `source` for `domain`, through `client` or a one-off one."""
+        url = SubdomainRecon.SOURCE_URLS[source].format(domain=domain)
+        if client is None:
+            async with SubdomainRecon.client() as client:
+                return await client.get(source, url, headers)
+        return await client.get(source, url, headers)
+
+    @staticmethod
+    async def stream_source(client, source, domain, headers=None):
+        """Yields the response body from `source` for `domain` in chunks, as it arrives."""
+        url = SubdomainRecon.SOURCE_URLS[source].format(domain=domain)
+        if client is None:
+            async with SubdomainRecon.client() as client:
+                async for chunk in client.stream(source, url, headers):
+                    yield chunk
+            return
+        async for chunk in client.stream(source, url, headers):
+            yield chunk
+
+    @staticmethod
+    async def iter_json_array(chunks, max_item=1 << 20):
+        """Yields the items of a JSON array arriving as byte `chunks`, each as soon as it is complete.
 
-        # Async tasks for API-based sources
-        tasks.append(SubdomainRecon.get_crtsh_subdomains(domain))
-        tasks.append(SubdomainRecon.get_alienvault_subdomains(domain))
-        tasks.append(SubdomainRecon.get_dnsdumpster_subdomains(domain)) # This involves scraping, might be tricky async but we wrap it
+        Only the unparsed tail is buffered. Objects, arrays and strings are
+        complete once they parse; a bare number or literal only once the
+        `,` or `]` after it has arrived, since a chunk may end in the middle
+        of it. Raises ValueError if the body is not an array, ends before
+        the array does, or an item grows past `max_item` characters.
+        """
+        decoder = json.JSONDecoder()
+        text = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        buf, pos, opened = '', 0, False
+        async for chunk in chunks:
+            buf = buf[pos:] + text.decode(chunk)
+            pos = 0
+            while True:
+                while pos < len(buf) and buf[pos] in ' \t\r\n,':
+                    pos += 1
+                if pos == len(buf):
+                    break
+                if not opened:
+                    if buf[pos] != '[':
+                        raise ValueError("not a JSON array")
+                    opened = True
+                    pos += 1
+                    continue
+                if buf[pos] == ']':
+                    # Read the source to its end so that it completes (and gets cached)
+                    async for _ in chunks:
+                        pass
+                    return
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except ValueError:
+                    # Incomplete item: wait for the next chunk
+                    if len(buf) - pos > max_item:
+                        raise
+                    break
+                if buf[pos] not in '{["':
+                    rest = end
+                    while rest < len(buf) and buf[rest] in ' \t\r\n':
+                        rest += 1
+                    if rest == len(buf) or buf[rest] not in ',]':
+                        # `12` may be the start of `123`, `1.5` of `1.5e3`: wait for what follows
+                        if len(buf) - pos > max_item:
+                            raise ValueError("JSON array item too long")
+                        break
+                pos = end
+                yield item
+        if opened or buf[pos:].strip():
+            raise ValueError("JSON array ends early")
+
+    @staticmethod
+    async def iter_crtsh_names(domain, client=None):
+        """Yields each new name in crt.sh's certificates for `domain`, while the response streams in."""
+        # The same names repeat across thousands of certificates: only new ones go on
+        seen = SubdomainStore(domain)
+        entries = SubdomainRecon.iter_json_array(SubdomainRecon.stream_source(client, 'crtsh', domain))
+        async for entry in entries:
+            if not isinstance(entry, dict):
+                continue
+            for name in entry.get('name_value', '').split('\n'):
+                name = seen.add(name)
+                if name:
+                    yield name
 
+    @staticmethod
+    async def _listed(awaitable):
+        """Turns a source that returns a list into an async iterator."""
+        for name in await awaitable:
+            yield name
+
+    @staticmethod
+    async def _throttled(client, source, names):
+        """Runs a non-HTTP source under its throttle; HTTP sources are throttled per request by the client."""
+        throttle = client.throttles.get(source) if client else None
+        if throttle is None:
+            async for name in names:
+                yield name
+            return
+        async with throttle.request():
+            async for name in names:
+                yield name
+
+    @staticmethod
+    def sources(domain, virustotal_api_key=None, client=None):
+        """`(source, async iterator of names)` for every source; the iterators raise on failure."""
+        listed = SubdomainRecon._listed
+        throttled = SubdomainRecon._throttled
+        sources = [
+            ('crtsh', SubdomainRecon.iter_crtsh_names(domain, client)),
+            ('alienvault', SubdomainRecon.iter_alienvault_names(domain, client)),
+            # Scraping with a CSRF token: kept synchronous, on a thread
+            ('dnsdumpster', throttled(client, 'dnsdumpster', listed(
+                asyncio.to_thread(SubdomainRecon._get_dnsdumpster_sync, domain)))),
+        ]
         if virustotal_api_key:
-            tasks.append(SubdomainRecon.get_virustotal_subdomains(domain, virustotal_api_key))
+            sources.append(('virustotal', SubdomainRecon.iter_virustotal_names(domain, virustotal_api_key, client)))
+        # External tools stream their output line by line as subprocesses
+        for tool in SubdomainRecon.TOOLS:
+            if shutil.which(SubdomainRecon.TOOLS[tool][0][0]):
+                sources.append((tool, throttled(client, tool, SubdomainRecon.iter_tool_names(tool, domain, client))))
+        # sublist3r is a library, used when installed: it runs on a thread to avoid blocking the loop
+        if importlib.util.find_spec('sublist3r'):
+            sources.append(('sublist3r', throttled(client, 'sublist3r', listed(
+                asyncio.to_thread(SubdomainRecon.run_sublist3r, domain)))))
+        return sources
 
-        # Run external tools in threads to avoid blocking loop
-        tasks.append(asyncio.to_thread(SubdomainRecon.run_subfinder, domain))
-        tasks.append(asyncio.to_thread(SubdomainRecon.run_sublist3r, domain))
+    @staticmethod
+    async def _counted(client, source, names, quiet=False):
+        """Yields a source's names, counting calls, names and failures in its throttle stats on `client`.
 
-        results = await asyncio.gather(*tasks)
+        A failure ends the names, with a warning unless `quiet`.
+        """
+        throttle = client.throttles.get(source) if client else None
+        if throttle:
+            throttle.calls += 1
+        try:
+            async for name in names:
+                if throttle:
+                    throttle.names += 1
+                yield name
+        except Exception as e:
+            if throttle:
+                throttle.failures += 1
+            if not quiet:
+                console.print(f"[yellow]{source} warning: {e}[/yellow]")
 
-        all_subs = []
-        for res in results:
-            all_subs.extend(res)
+    @staticmethod
+    async def iter_subdomains(domain, virustotal_api_key=None, client=None, quiet=False, store=None):
+        """Yields each new subdomain as soon as any source has it; all sources run at once.
 
-        unique_subs = list(set(all_subs))
-        console.print(f"[green]Found {len(unique_subs)} unique subdomains for {domain}[/green]")
-        return unique_subs
+        Names are normalized and deduplicated through `store` (a fresh
+        `SubdomainStore` by default); names not under `domain` are dropped.
+        Source failures are printed as warnings unless `quiet`; either way
+        they are counted in the source's throttle stats on `client`.
+        """
+        store = SubdomainStore(domain) if store is None else store
+        queue = asyncio.Queue(maxsize=1000)
+        done = object()
+
+        async def pump(source, names):
+            async for name in SubdomainRecon._counted(client, source, names, quiet):
+                await queue.put(name)
+            # Not on cancellation: the consumer is gone and a full queue would never drain
+            await queue.put(done)
+
+        tasks = [asyncio.create_task(pump(source, names))
+                 for source, names in SubdomainRecon.sources(domain, virustotal_api_key, client)]
+        running = len(tasks)
+        try:
+            while running:
+                name = await queue.get()
+                if name is done:
+                    running -= 1
+                    continue
+                name = SubdomainStore.normalize(name, domain)
+                if name and store.add(name):
+                    yield name
+        finally:
+            for task in tasks:
+                task.cancel()
 
     @staticmethod
-    def run_subfinder(domain):
-        """Run subfinder as external tool (sync wrapper)"""
-        if not shutil.which('subfinder'):
-             return []
+    async def _domains(domains):
+        """Yields the names of an iterable, or of a `TargetStream` line by line as it arrives (without blocking the loop)."""
+        if isinstance(domains, TargetStream):
+            async for lines in domains.batches():
+                for domain in lines:
+                    yield domain
+        else:
+            for domain in domains:
+                yield domain
+
+    @staticmethod
+    async def batch(domains, virustotal_api_key=None, client=None, concurrency=10, backlog=None, on_name=None):
+        """Yields `(domain, SubdomainStore)` for many apex domains, each as soon as all its sources are done.
+
+        Every source has its own queue of domains and works on up to
+        `concurrency` of them at once, within its throttle on `client`, so
+        a slow or rate-limited source only holds back its own queue: the
+        fast ones move on to the next domains meanwhile. At most `backlog`
+        domains (ten times `concurrency` by default) are in flight, waiting
+        on their slowest source. `domains` is any iterable of names or a
+        `TargetStream`. Failures are counted in the throttle stats rather
+        than printed. `on_name(domain, name)` is called for each new name as
+        soon as a source has it, before its domain is yielded.
+        """
+        if client is None:
+            async with SubdomainRecon.client() as client:
+                async for item in SubdomainRecon.batch(domains, virustotal_api_key, client, concurrency, backlog,
+                                                       on_name):
+                    yield item
+            return
+
+        in_flight = asyncio.Semaphore(backlog or concurrency * 10)
+        results = asyncio.Queue()
+        queues = {}
+        tasks = []
+        counts = {'fed': 0}
+        fed = object()
+
+        async def work(source, queue):
+            while True:
+                domain, names, state = await queue.get()
+                async for name in SubdomainRecon._counted(client, source, names, quiet=True):
+                    name = state['subs'].add(name)
+                    if name and on_name:
+                        on_name(domain, name)
+                state['sources'] -= 1
+                if not state['sources']:
+                    in_flight.release()
+                    results.put_nowait((domain, state['subs']))
+
+        async def feed():
+            try:
+                async for domain in SubdomainRecon._domains(domains):
+                    await in_flight.acquire()
+                    listed = SubdomainRecon.sources(domain, virustotal_api_key, client)
+                    state = {'subs': SubdomainStore(domain), 'sources': len(listed)}
+                    counts['fed'] += 1
+                    for source, names in listed:
+                        if source not in queues:
+                            queues[source] = asyncio.Queue()
+                            tasks.extend(asyncio.create_task(work(source, queues[source])) for _ in range(concurrency))
+                        queues[source].put_nowait((domain, names, state))
+            finally:
+                results.put_nowait(fed)
+
+        tasks.append(asyncio.create_task(feed()))
+        feeding = True
+        yielded = 0
         try:
-            result = subprocess.run(['subfinder', '-d', domain, '-silent'], capture_output=True, text=True, timeout=60)
-            if result.returncode == 0:
-                subs = result.stdout.splitlines()
-                return list(set(subs))
+            while feeding or yielded < counts['fed']:
+                item = await results.get()
+                if item is fed:
+                    feeding = False
+                    continue
+                yielded += 1
+                yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    @staticmethod
+    def source_report(client, elapsed):
+        """One stats line per source that was called, then the external tool runs."""
+        lines = [throttle.summary(elapsed) for throttle in client.throttles.values() if throttle.calls]
+        if client.tools and client.tools.counts['started']:
+            lines.append(client.tools.summary())
+        return lines
+
+    @staticmethod
+    async def extract_subdomains(domain, virustotal_api_key=None, client=None):
+        """All subdomains of `domain` from every source, as a `SubdomainStore`."""
+        if client is None:
+            async with SubdomainRecon.client() as client:
+                subs = await SubdomainRecon.extract_subdomains(domain, virustotal_api_key, client)
+            console.print(f"[cyan]{client.summary()}[/cyan]")
+            return subs
+
+        console.print(f"[cyan]Extracting subdomains for {domain} from multiple sources...[/cyan]")
+        subs = SubdomainStore(domain)
+        async for _ in SubdomainRecon.iter_subdomains(domain, virustotal_api_key, client, store=subs):
+            pass
+        console.print(f"[green]Found {len(subs)} unique subdomains for {domain}[/green]")
+        return subs
+
+    @staticmethod
+    async def probe_subdomains(domains, scanner, virustotal_api_key=None, client=None, save_to=None):
+        """Recon feeding `scanner`, an `AsyncNetworkScanner`, on the same event loop.
+
+        The deduplicated names of every source become the scanner's target
+        stream as they arrive, so hosts are resolved (with the scanner's
+        `resolve` stage) and probed while slower sources are still running.
+        `domains` may be a `TargetStream`: each domain is enumerated as soon
+        as its line arrives. Wildcard names are probed as their base name.
+        With `save_to`, every name is also written to that file, sorted, once
+        recon is done. Returns the number of names.
+        """
+        if client is None:
+            async with SubdomainRecon.client() as client:
+                return await SubdomainRecon.probe_subdomains(domains, scanner, virustotal_api_key, client, save_to)
+
+        # One store across all domains: overlapping ones are not probed twice
+        store = SubdomainStore()
+
+        async def names():
+            async for domain in SubdomainRecon._domains(domains):
+                console.print(f"[cyan]Extracting subdomains for {domain}, probing as they arrive...[/cyan]")
+                async for name in SubdomainRecon.iter_subdomains(domain, virustotal_api_key, client, store=store):
+                    yield name
+
+        try:
+            await scanner.start_scan(AsyncTargetStream(names()))
+        finally:
+            if save_to:
+                store.write(save_to)
+        return len(store)
+
+    @staticmethod
+    async def iter_tool_names(tool, domain, client=None):
+        """Yields the names an external tool from `TOOLS` prints, while it runs.
+
+        Raises TimeoutError after the names printed before the timeout, or
+        SourceError if the tool fails.
+        """
+        argv, timeout = SubdomainRecon.TOOLS[tool]
+        argv = [arg.format(domain=domain) for arg in argv]
+        runner = client.tools if client else ToolRunner(1)
+        async for line in runner.lines(argv, timeout, tool):
+            yield line
+
+    @staticmethod
+    async def get_subfinder_subdomains(domain, client=None):
+        """Names from subfinder, [] when it is not installed; a timeout keeps what it found."""
+        if not shutil.which('subfinder'):
             return []
+        subs = []
+        try:
+            async for name in SubdomainRecon.iter_tool_names('subfinder', domain, client):
+                subs.append(name)
         except Exception as e:
-            console.print(f"[red]subfinder error: {e}[/red]")
-            return []
+            console.print(f"[yellow]subfinder warning: {e}[/yellow]")
+        return list(set(subs))
 
     @staticmethod
     def run_sublist3r(domain):
-        """Run sublist3r if available (sync wrapper)"""
+        """Run sublist3r if available (sync wrapper); raises on failure, [] when not installed"""
         try:
             import sublist3r
-            # Suppress stdout from sublist3r if possible, or just let it run
-            subs = sublist3r.main(domain, 40, savefile=None, ports=None, silent=True, verbose=False, enable_bruteforce=False, engines=None)
-            return subs if subs else []
         except ImportError:
             return []
-        except Exception as e:
-            console.print(f"[red]Error extracting subdomains with sublist3r: {e}[/red]")
-            return []
+        # Suppress stdout from sublist3r if possible, or just let it run
+        subs = sublist3r.main(domain, 40, savefile=None, ports=None, silent=True, verbose=False, enable_bruteforce=False, engines=None)
+        return subs if subs else []
 
     @staticmethod
-    async def get_crtsh_subdomains(domain):
-        url = f"https://crt.sh/?q=%25.{domain}&output=json"
+    async def get_crtsh_subdomains(domain, client=None):
+        # Responses for big domains run to hundreds of megabytes: parse them as they stream in
+        subs = []
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=20) as response:
-                    if response.status != 200:
-                        return []
-                    try:
-                        data = await response.json()
-                    except:
-                        # crt.sh sometimes returns invalid json or html on error
-                        return []
-
-                    subs = set()
-                    if data and isinstance(data, list):
-                        for entry in data:
-                            name_value = entry.get('name_value', '')
-                            for name in name_value.split('\n'):
-                                if domain in name:
-                                    subs.add(name.strip())
-                    return list(subs)
+            async for name in SubdomainRecon.iter_crtsh_names(domain, client):
+                subs.append(name)
+            return subs
+        except ValueError:
+            # crt.sh sometimes returns invalid json or html on error; keep what parsed
+            return subs
         except Exception as e:
             console.print(f"[yellow]crt.sh warning: {e}[/yellow]")
-            return []
+            return subs
 
     @staticmethod
-    async def get_alienvault_subdomains(domain):
-        url = f"https://otx.alienvault.com/api/v1/indicators/domain/{domain}/passive_dns"
-        subs = []
+    async def iter_alienvault_names(domain, client=None):
+        data = json.loads(await SubdomainRecon.fetch_source(client, 'alienvault', domain))
+        for name in {record.get('hostname') for record in data.get('passive_dns', [])}:
+            if name and domain in name:
+                yield name
+
+    @staticmethod
+    async def get_alienvault_subdomains(domain, client=None):
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=20) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        for record in data.get('passive_dns', []):
-                            name = record.get('hostname')
-                            if name and domain in name:
-                                subs.append(name)
-            return list(set(subs))
+            return [name async for name in SubdomainRecon.iter_alienvault_names(domain, client)]
         except Exception as e:
             console.print(f"[yellow]AlienVault warning: {e}[/yellow]")
             return []
@@ -112,58 +435,67 @@ class SubdomainRecon:
     async def get_dnsdumpster_subdomains(domain):
         # DNSDumpster requires CSRF token handling, easier to keep synchronous or wrap in thread.
         # But let's try to do it in thread since it uses requests session logic which is sync.
-        return await asyncio.to_thread(SubdomainRecon._get_dnsdumpster_sync, domain)
+        try:
+            return await asyncio.to_thread(SubdomainRecon._get_dnsdumpster_sync, domain)
+        except Exception as e:
+            console.print(f"[yellow]DNSDumpster warning: {e}[/yellow]")
+            return []
 
     @staticmethod
     def _get_dnsdumpster_sync(domain):
+        # Only this source scrapes HTML, so requests and bs4 load on its first use
+        import requests
+        from bs4 import BeautifulSoup
         url = 'https://dnsdumpster.com/'
         session = requests.Session()
         subs = []
-        try:
-            resp = session.get(url, timeout=10)
-            soup = BeautifulSoup(resp.text, 'html.parser')
-            csrf = soup.find('input', {'name': 'csrfmiddlewaretoken'})
-            token = csrf['value'] if csrf else ''
-            headers = {'Referer': url, 'User-Agent': 'Mozilla/5.0', 'X-CSRFToken': token}
-            data = {'csrfmiddlewaretoken': token, 'targetip': domain}
-            post_resp = session.post(url, headers=headers, data=data, timeout=20)
-            post_soup = BeautifulSoup(post_resp.text, 'html.parser')
-            tables = post_soup.find_all('table')
-            for table in tables:
-                for row in table.find_all('tr'):
-                    cols = row.find_all('td')
-                    if len(cols) > 0:
-                        sub = cols[0].text.strip()
-                        if domain in sub:
-                             subs.append(sub)
-            return list(set(subs))
-        except Exception as e:
-            console.print(f"[yellow]DNSDumpster warning: {e}[/yellow]")
-            return []
+        # Raises on failure; a refusal to serve (429/503) carries its Retry-After for the throttle
+        resp = session.get(url, timeout=10)
+        SubdomainRecon._check_dnsdumpster(resp)
+        soup = BeautifulSoup(resp.text, 'html.parser')
+        csrf = soup.find('input', {'name': 'csrfmiddlewaretoken'})
+        token = csrf['value'] if csrf else ''
+        headers = {'Referer': url, 'User-Agent': 'Mozilla/5.0', 'X-CSRFToken': token}
+        data = {'csrfmiddlewaretoken': token, 'targetip': domain}
+        post_resp = session.post(url, headers=headers, data=data, timeout=20)
+        SubdomainRecon._check_dnsdumpster(post_resp)
+        post_soup = BeautifulSoup(post_resp.text, 'html.parser')
+        tables = post_soup.find_all('table')
+        for table in tables:
+            for row in table.find_all('tr'):
+                cols = row.find_all('td')
+                if len(cols) > 0:
+                    sub = cols[0].text.strip()
+                    if domain in sub:
+                         subs.append(sub)
+        return list(set(subs))
 
     @staticmethod
-    async def get_virustotal_subdomains(domain, api_key):
+    def _check_dnsdumpster(resp):
+        if resp.status_code != 200:
+            raise SourceError('dnsdumpster', f"HTTP {resp.status_code}", resp.status_code,
+                              SourceError.parse_retry_after(resp.headers.get('Retry-After')))
+
+    @staticmethod
+    async def iter_virustotal_names(domain, api_key, client=None):
+        data = json.loads(await SubdomainRecon.fetch_source(client, 'virustotal', domain, {'x-apikey': api_key}))
+        for name in {item['id'] for item in data.get('data', [])}:
+            yield name
+
+    @staticmethod
+    async def get_virustotal_subdomains(domain, api_key, client=None):
         if not api_key:
             return []
-        url = f"https://www.virustotal.com/api/v3/domains/{domain}/subdomains"
-        headers = {'x-apikey': api_key}
-        subs = []
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=20) as resp:
-                    if resp.status == 200:
-                        data = await resp.json()
-                        for item in data.get('data', []):
-                            subs.append(item['id'])
-            return list(set(subs))
+            return [name async for name in SubdomainRecon.iter_virustotal_names(domain, api_key, client)]
         except Exception as e:
             console.print(f"[yellow]VirusTotal warning: {e}[/yellow]")
             return []
 
     @staticmethod
     def save_domains_to_file(domains, filename):
-        unique = sorted(set(domains))
-        with open(filename, 'w') as f:
-            for d in unique:
-                f.write(d + '\n')
-        console.print(f"[green]Saved {len(unique)} unique domains to '{filename}'[/green]")
+        """Writes `domains` (a `SubdomainStore` or any iterable of names) normalized, unique and sorted."""
+        if not isinstance(domains, SubdomainStore):
+            domains = SubdomainStore(names=domains)
+        count = domains.write(filename)
+        console.print(f"[green]Saved {count} unique domains to '{filename}'[/green]")
@@ -0,0 +1,192 @@
+import socket
+import asyncio
+import ipaddress
+import time
+
+
+class HostResolver:
+    """Bulk hostname resolution with a TTL cache, run as a scan stage.
+
+    Workers take `(serial, target, ports)` items from an inbox and resolve
+    the hostnames through aiodns (c-ares: no thread per lookup, /etc/hosts
+    honoured). Resolved targets go on to the outbox unchanged and the probes
+    fetch the address with `address()`, keeping the hostname for SNI and the
+    Host header. Names that do not exist are cached as such and handed to
+    `on_missing(serial, target, exc)` instead of being probed. Lookups that
+    fail for other reasons (timeouts, SERVFAIL) pass through unresolved and
+    are left to the system resolver. IP literals skip the stage.
+
+    Answers are cached for their TTL clamped to `[min_ttl, max_ttl]`,
+    missing names for `negative_ttl`; concurrent lookups of one name share
+    a single query.
+    """
+    # c-ares reports no TTL for /etc/hosts entries, the system resolver none at all
+    DEFAULT_TTL = 300
+    # Past this many entries, expired ones are dropped on the next insert
+    PRUNE_SIZE = 100000
+
+    def __init__(self, on_missing=None, concurrency=1000, nameservers=None, timeout=2.0, tries=2,
+                 min_ttl=30, max_ttl=3600, negative_ttl=300):
+        self.on_missing = on_missing
+        self.concurrency = concurrency
+        self.nameservers = nameservers
+        self.timeout = timeout
+        self.tries = tries
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.negative_ttl = negative_ttl
+        self.cache = {}
+        self.counts = {'resolved': 0, 'missing': 0, 'failed': 0, 'cached': 0}
+        self._pending = {}
+        self._client = None
+        # Imported here, not with the module: only scans run with --resolve load c-ares
+        try:
+            import aiodns
+        except ImportError:
+            # Falls back to the loop's getaddrinfo (thread pool)
+            aiodns = None
+        self._aiodns = aiodns
+
+    @staticmethod
+    def is_address(host):
+        try:
+            ipaddress.ip_address(host)
+            return True
+        except ValueError:
+            return False
+
+    def address(self, host):
+        """The cached address for `host` (expired or not), or None."""
+        entry = self.cache.get(host)
+        return entry[1][0] if entry and entry[1] else None
+
+    def cached(self, host):
+        """Unexpired cached addresses for `host` (empty if it does not exist), or None."""
+        entry = self.cache.get(host)
+        if entry and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def store(self, host, addresses, ttl):
+        now = time.monotonic()
+        if len(self.cache) >= self.PRUNE_SIZE:
+            self.cache = {h: e for h, e in self.cache.items() if e[0] > now}
+        self.cache[host] = (now + ttl, addresses)
+
+    async def resolve(self, host):
+        """Addresses for `host`, IPv4 first; empty if the name does not exist.
+
+        Raises on lookups that failed for any other reason.
+        """
+        addresses = self.cached(host)
+        if addresses is not None:
+            self.counts['cached'] += 1
+            return addresses
+        pending = self._pending.get(host)
+        if pending is None:
+            pending = self._pending[host] = asyncio.ensure_future(self._lookup(host))
+            pending.add_done_callback(lambda _: self._pending.pop(host, None))
+        # Shielded: one cancelled waiter must not cancel the others' query
+        return await asyncio.shield(pending)
+
+    async def _lookup(self, host):
+        try:
+            addresses, ttl = await (self._query(host) if self._aiodns else self._system(host))
+        except LookupError:
+            self.counts['missing'] += 1
+            self.store(host, (), self.negative_ttl)
+            return ()
+        except Exception:
+            self.counts['failed'] += 1
+            raise
+        self.counts['resolved'] += 1
+        self.store(host, addresses, ttl)
+        return addresses
+
+    async def _query(self, host):
+        aiodns = self._aiodns
+        if self._client is None:
+            self._client = aiodns.DNSResolver(nameservers=self.nameservers, timeout=self.timeout, tries=self.tries)
+        try:
+            result = await self._client.getaddrinfo(host, family=socket.AF_UNSPEC)
+        except aiodns.error.DNSError as e:
+            if e.args and e.args[0] in (aiodns.error.ARES_ENOTFOUND, aiodns.error.ARES_ENODATA):
+                raise LookupError(host) from e
+            raise
+        nodes = sorted(result.nodes, key=lambda n: n.family != socket.AF_INET)
+        addresses = tuple(dict.fromkeys(n.addr[0].decode() for n in nodes))
+        if not addresses:
+            raise LookupError(host)
+        ttls = [n.ttl for n in nodes if n.ttl > 0]
+        ttl = min(ttls) if ttls else self.DEFAULT_TTL
+        return addresses, min(self.max_ttl, max(self.min_ttl, ttl))
+
+    async def _system(self, host):
+        loop = asyncio.get_running_loop()
+        try:
+            infos = await asyncio.wait_for(loop.getaddrinfo(host, None, type=socket.SOCK_STREAM),
+                                           self.timeout * self.tries)
+        except socket.gaierror as e:
+            if e.errno in (socket.EAI_NONAME, getattr(socket, 'EAI_NODATA', socket.EAI_NONAME)):
+                raise LookupError(host) from e
+            raise
+        infos.sort(key=lambda info: info[0] != socket.AF_INET)
+        return tuple(dict.fromkeys(info[4][0] for info in infos)), self.DEFAULT_TTL
+
+    async def worker(self, inbox, outbox):
+        while True:
+            serial, target, ports = await inbox.get()
+            try:
+                if not self.is_address(target):
+                    try:
+                        addresses = await self.resolve(target)
+                    except Exception:
+                        addresses = None
+                    if addresses == ():
+                        self.on_missing(serial, target, socket.gaierror(socket.EAI_NONAME, "Name does not exist"))
+                        continue
+                await outbox.put((serial, target, ports))
+            finally:
+                inbox.task_done()
+
+    def start(self, inbox, outbox, reserved=0):
+        return [asyncio.create_task(self.worker(inbox, outbox)) for _ in range(self.concurrency)]
+
+    def connector_resolver(self):
+        """An aiohttp resolver answering from the cache; misses resolve through it, failures through the system."""
+        from aiohttp.abc import AbstractResolver
+        owner = self
+
+        class CachedResolver(AbstractResolver):
+            async def resolve(self, host, port=0, family=socket.AF_INET):
+                try:
+                    addresses = await owner.resolve(host)
+                except Exception:
+                    loop = asyncio.get_running_loop()
+                    infos = await loop.getaddrinfo(host, port, type=socket.SOCK_STREAM, family=family)
+                    addresses = tuple(dict.fromkeys(info[4][0] for info in infos))
+                if not addresses:
+                    raise OSError(socket.EAI_NONAME, f"Name does not exist: {host}")
+                return [{'hostname': host, 'host': a, 'port': port,
+                         'family': socket.AF_INET6 if ':' in a else socket.AF_INET,
+                         'proto': 0, 'flags': socket.AI_NUMERICHOST} for a in addresses]
+
+            async def close(self):
+                pass
+
+        return CachedResolver()
+
+    async def close(self):
+        client, self._client = self._client, None
+        if client is None:
+            return
+        if hasattr(client, 'close'):
+            await client.close()
+        else:
+            # aiodns < 3.3 has no close()
+            client.cancel()
+
+    def summary(self):
+        c = self.counts
+        return (f"DNS pre-resolution: {c['resolved']} resolved, {c['missing']} nonexistent (not probed), "
+                f"{c['failed']} failed (left to the system resolver), {c['cached']} cache hits")
@@ -0,0 +1,137 @@
+import os
+import time
+import shutil
+import signal
+import asyncio
+import multiprocessing
+from .utils import console, TargetUtils
+from .dashboard import ScanDashboard
+
+STAT_COUNT = len(ScanDashboard.STAT_FIELDS)
+
+
+async def _scan_shard(scanner, ranges_input, shard, stats):
+    """Runs one shard and mirrors its dashboard counters into shared memory."""
+    base = shard[0] * STAT_COUNT
+
+    def publish():
+        stats[base:base + STAT_COUNT] = scanner.dashboard.export()
+
+    async def report():
+        while True:
+            publish()
+            await asyncio.sleep(0.25)
+
+    reporter = asyncio.create_task(report())
+    try:
+        await scanner.start_scan(ranges_input, shard=shard)
+    finally:
+        reporter.cancel()
+        publish()
+
+
+def _run_shard(scanner_cls, scanner_kwargs, ranges_input, shard, stats):
+    """Process entry point: each shard gets its own scanner, event loop and connector."""
+    # Only the parent draws to the terminal
+    console.quiet = True
+    scanner = scanner_cls(**scanner_kwargs)
+    scanner.dashboard.headless = True
+    try:
+        asyncio.run(_scan_shard(scanner, ranges_input, shard, stats))
+    except KeyboardInterrupt:
+        pass
+
+
+class ShardedScan:
+    """Splits one scan across worker processes, each sweeping a disjoint shard.
+
+    Every worker writes hits to its own part file; the parts are merged into
+    the requested output file once all workers are done.
+    """
+
+    def __init__(self, scanner_cls, scanner_kwargs, workers):
+        self.scanner_cls = scanner_cls
+        self.scanner_kwargs = scanner_kwargs
+        self.workers = max(1, workers)
+        self.output_file = scanner_kwargs.get('output_file')
+
+    @staticmethod
+    def part_path(output_file, index):
+        return f"{output_file}.part{index}" if output_file else ''
+
+    def part_file(self, index):
+        return self.part_path(self.output_file, index)
+
+    def merge(self):
+        if not self.output_file:
+            return
+        # Every CSV part starts with its own header; keep only the first one
+        has_header = self.scanner_kwargs.get('output_format') == 'csv'
+        with open(self.output_file, 'ab') as out:
+            for i in range(self.workers):
+                part = self.part_file(i)
+                if not os.path.exists(part):
+                    continue
+                with open(part, 'rb') as f:
+                    if has_header and out.tell() > 0:
+                        f.readline()
+                    shutil.copyfileobj(f, out)
+                os.remove(part)
+
+    def run(self, ranges_input):
+        console.print(f"[yellow]→ Splitting scan across {self.workers} worker processes...[/yellow]")
+        start_time = time.time()
+        # Building the manifest here caches it, so file-based workers start instantly
+        total = TargetUtils.count_targets(TargetUtils.load_manifest(ranges_input))
+
+        # One block of counters per worker: each has a single writer, so no lock is needed
+        ctx = multiprocessing.get_context('spawn')
+        stats = ctx.Array('q', self.workers * STAT_COUNT, lock=False)
+
+        dashboard = ScanDashboard(f"Sharded scan ({self.workers} workers)", total)
+        dashboard.poll = lambda: dashboard.load(
+            [sum(stats[j::STAT_COUNT]) for j in range(STAT_COUNT)]
+        )
+
+        procs = []
+        for i in range(self.workers):
+            kwargs = dict(self.scanner_kwargs, output_file=self.part_file(i))
+            proc = ctx.Process(
+                target=_run_shard,
+                args=(self.scanner_cls, kwargs, ranges_input, (i, self.workers), stats),
+                daemon=True
+            )
+            proc.start()
+            procs.append(proc)
+
+        dashboard.start()
+        try:
+            for p in procs:
+                p.join()
+        except KeyboardInterrupt:
+            # A terminal Ctrl-C reaches the workers too, but `kill -INT` on this process alone does
+            # not: pass it on, then give them a moment to write their checkpoints
+            for p in procs:
+                if p.is_alive():
+                    try:
+                        os.kill(p.pid, signal.SIGINT)
+                    except ProcessLookupError:
+                        pass
+            for p in procs:
+                p.join(timeout=10)
+                if p.is_alive():
+                    p.terminate()
+                    p.join()
+            raise
+        finally:
+            dashboard.stop()
+            self.merge()
+
+        failed = [i for i, p in enumerate(procs) if p.exitcode != 0]
+        if failed:
+            console.print(f"[red][!] Workers {failed} exited with errors[/red]")
+
+        dashboard.poll()
+        duration = int(time.time() - start_time)
+        console.print(f"[cyan]{dashboard.summary()}[/cyan]")
+        console.print(f"\n[magenta][✓] Sharded scan finished in {duration}s. Total Targets: {total}[/magenta]")
@@ -0,0 +1,108 @@
+import io
+import os
+import sys
+import csv
+import json
+import asyncio
+
+
+class ResultSink:
+    """Collects result records and writes them in batches from a single writer task.
+
+    Scanners call `emit()` with a dict per hit; records are queued in memory
+    and flushed when `flush_size` of them are waiting or every
+    `flush_interval` seconds, with one write per batch instead of one per hit.
+    Formats: `plain` (the scanner's legacy line template), `tsv`, `jsonl`, `csv`.
+    A `path` of '-' writes to stdout, flushed often enough to feed a pipeline.
+    """
+    FORMATS = ('plain', 'tsv', 'jsonl', 'csv')
+
+    def __init__(self, path, fields, fmt='plain', template=None, flush_size=256, flush_interval=1.0):
+        if fmt not in self.FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}")
+        self.path = path
+        self.fields = fields
+        self.fmt = fmt
+        self.template = template or '\t'.join('{%s}' % f for f in fields)
+        self.flush_size = flush_size
+        self.flush_interval = min(flush_interval, 0.1) if path == '-' else flush_interval
+        self.written = 0
+        self._pending = []
+        self._file = None
+        self._task = None
+        self._wakeup = asyncio.Event()
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    async def start(self):
+        if not self.enabled:
+            return
+        if self.path == '-':
+            new_file, self._file = True, sys.stdout
+        else:
+            new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+            self._file = open(self.path, 'a', newline='')
+        if self.fmt == 'csv' and new_file:
+            self._file.write(self._format_csv([dict(zip(self.fields, self.fields))]))
+        self._task = asyncio.create_task(self._writer())
+
+    def emit(self, record):
+        """Queues one record; never blocks and never touches the file."""
+        if not self.enabled:
+            return
+        self._pending.append(record)
+        if len(self._pending) >= self.flush_size:
+            self._wakeup.set()
+
+    def _format_csv(self, records):
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        for r in records:
+            writer.writerow([r.get(f, '') for f in self.fields])
+        return buf.getvalue()
+
+    def format(self, records):
+        if self.fmt == 'plain':
+            return ''.join(self.template.format(**r) + '\n' for r in records)
+        if self.fmt == 'jsonl':
+            return ''.join(json.dumps(r) + '\n' for r in records)
+        if self.fmt == 'csv':
+            return self._format_csv(records)
+        return ''.join(
+            '\t'.join(str(r.get(f, '')).replace('\t', ' ').replace('\n', ' ') for f in self.fields) + '\n'
+            for r in records
+        )
+
+    def flush(self):
+        """Writes everything queued so far in one call.
+
+        Runs on the event loop without awaiting, so a batch can never be
+        interleaved with or lost to a concurrent flush or a cancellation.
+        """
+        if not self._pending or self._file is None:
+            return
+        records, self._pending = self._pending, []
+        self._file.write(self.format(records))
+        self._file.flush()
+        self.written += len(records)
+
+    async def _writer(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            self.flush()
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._file:
+            self.flush()
+            if self._file is not sys.stdout:
+                self._file.close()
+            self._file = None
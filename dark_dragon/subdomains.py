@@ -0,0 +1,139 @@
+import re
+from bisect import bisect_left, bisect_right
+
+HOSTNAME = re.compile(r'(?:[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?\.)+[a-z0-9_](?:[a-z0-9_-]{0,61}[a-z0-9_])?')
+
+
+class SubdomainStore:
+    """Deduplicated, normalized set of host names, compact enough for millions of them.
+
+    Names are normalized on the way in (`normalize`): lowercased, trailing
+    dot and wildcard labels dropped, IDNs turned to punycode, and anything
+    that is not a valid host name under `domain` (when one is given)
+    rejected. They are kept as their labels in reverse order
+    (`a.example.com` -> `com example a`), sorted, packed newline-separated
+    into bytes blocks of about `BLOCK` names, with the first key of each
+    block in a list alongside. That is a couple of bytes per name over the
+    name itself, instead of a str object and a set slot each. New names wait
+    in a set until there are enough of them to merge into the blocks they
+    fall in.
+
+    A membership test is a bisect over the first keys and a search of one
+    block. Iterating yields the names sorted by their reversed labels, so
+    each name comes right after its parent domain (`example.com`,
+    `a.example.com`, `x.a.example.com`, `b.example.com`), streamed out of
+    the blocks.
+    """
+    BLOCK = 64
+    # Pending names merged once there are this many, or an eighth of the stored ones
+    MERGE_SIZE = 65536
+
+    def __init__(self, domain=None, names=()):
+        self.domain = self.normalize(domain) if domain else None
+        self.rejected = 0
+        self._stored = 0
+        self._blocks = []
+        self._fences = []
+        self._pending = set()
+        self.update(names)
+
+    @staticmethod
+    def normalize(name, domain=None):
+        """`name` as a lowercase ASCII host name, or None if it is not one (or not under `domain`)."""
+        name = name.strip().lower().rstrip('.')
+        while name.startswith('*.'):
+            name = name[2:]
+        if not name.isascii():
+            try:
+                name = name.encode('idna').decode('ascii')
+            except UnicodeError:
+                return None
+        if len(name) > 253 or not HOSTNAME.fullmatch(name):
+            return None
+        if domain and name != domain and not name.endswith('.' + domain):
+            return None
+        return name
+
+    @staticmethod
+    def _key(name):
+        return ' '.join(reversed(name.split('.'))).encode()
+
+    @staticmethod
+    def _name(key):
+        return '.'.join(reversed(key.decode().split(' ')))
+
+    def _has(self, key):
+        if key in self._pending:
+            return True
+        i = bisect_right(self._fences, key) - 1
+        return i >= 0 and b'\n' + key + b'\n' in self._blocks[i]
+
+    def add(self, name):
+        """Adds `name`; returns it normalized if it was new, else None."""
+        name = self.normalize(name, self.domain)
+        if name is None:
+            self.rejected += 1
+            return None
+        key = self._key(name)
+        if self._has(key):
+            return None
+        self._pending.add(key)
+        if len(self._pending) >= max(self.MERGE_SIZE, self._stored // 8):
+            self._merge()
+        return name
+
+    def update(self, names):
+        """Adds every name; returns how many were new."""
+        return sum(1 for name in names if self.add(name))
+
+    def _merge(self):
+        if not self._pending:
+            return
+        pending = sorted(self._pending)
+        blocks, fences = [], []
+        if not self._blocks:
+            self._pack(pending, blocks, fences)
+        start = 0
+        for i, block in enumerate(self._blocks):
+            # Keys before the next block's first key go in this one (those before the first key, in the first)
+            end = bisect_left(pending, self._fences[i + 1], start) if i + 1 < len(self._fences) else len(pending)
+            if end == start:
+                blocks.append(block)
+                fences.append(self._fences[i])
+                continue
+            self._pack(sorted(block[1:-1].split(b'\n') + pending[start:end]), blocks, fences)
+            start = end
+        self._blocks, self._fences = blocks, fences
+        self._stored += len(pending)
+        self._pending = set()
+
+    def _pack(self, keys, blocks, fences):
+        """Splits sorted `keys` into even blocks of at most `BLOCK`."""
+        count = -(-len(keys) // self.BLOCK)
+        size = -(-len(keys) // count)
+        for i in range(0, len(keys), size):
+            chunk = keys[i:i + size]
+            blocks.append(b'\n' + b'\n'.join(chunk) + b'\n')
+            fences.append(chunk[0])
+
+    def __contains__(self, name):
+        name = self.normalize(name, self.domain)
+        return name is not None and self._has(self._key(name))
+
+    def __len__(self):
+        return self._stored + len(self._pending)
+
+    def __iter__(self):
+        self._merge()
+        for block in self._blocks:
+            for key in block[1:-1].split(b'\n'):
+                yield self._name(key)
+
+    def write(self, filename):
+        """Writes the names to `filename`, one per line, in iteration order; returns how many."""
+        count = 0
+        with open(filename, 'w') as f:
+            for name in self:
+                f.write(name + '\n')
+                count += 1
+        return count
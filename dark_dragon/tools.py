@@ -0,0 +1,74 @@
+import asyncio
+import collections
+
+
+class ToolRunner:
+    """Runs external recon tools as subprocesses and streams their output.
+
+    `lines(argv, timeout)` starts the tool with `asyncio.create_subprocess_exec`
+    and yields each non-empty stdout line as soon as it is printed, so the
+    names reach the recon stream while the tool is still working. At most
+    `max_processes` tools run at once across everything sharing the runner.
+    A tool still running after `timeout` seconds is killed and `TimeoutError`
+    is raised after the lines it had already printed; a non-zero exit raises
+    `SourceError` with the end of its stderr.
+    """
+    # stderr lines kept for the error message
+    STDERR_TAIL = 20
+
+    def __init__(self, max_processes=4):
+        self.max_processes = max_processes
+        self._slots = asyncio.Semaphore(max_processes)
+        self.counts = {'started': 0, 'timed_out': 0, 'failed': 0, 'lines': 0}
+
+    async def lines(self, argv, timeout=60, source=None):
+        from .httpcache import SourceError
+        source = source or argv[0]
+        async with self._slots:
+            proc = await asyncio.create_subprocess_exec(
+                *argv, stdin=asyncio.subprocess.DEVNULL,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            self.counts['started'] += 1
+            # stderr is drained alongside stdout so a chatty tool cannot fill the pipe and stall
+            stderr = collections.deque(maxlen=self.STDERR_TAIL)
+            drain = asyncio.create_task(self._drain(proc.stderr, stderr))
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout
+            printed = 0
+            try:
+                while True:
+                    try:
+                        line = await asyncio.wait_for(proc.stdout.readline(), max(0.0, deadline - loop.time()))
+                    except asyncio.TimeoutError:
+                        self.counts['timed_out'] += 1
+                        raise TimeoutError(f"{source}: timed out after {timeout}s ({printed} lines kept)") from None
+                    if not line:
+                        break
+                    line = line.decode(errors='replace').strip()
+                    if line:
+                        printed += 1
+                        self.counts['lines'] += 1
+                        yield line
+                code = await proc.wait()
+                await drain
+                if code != 0:
+                    self.counts['failed'] += 1
+                    raise SourceError(source, f"exit status {code}: {' '.join(stderr)[-200:]}")
+            finally:
+                if proc.returncode is None:
+                    proc.kill()
+                    await proc.wait()
+                drain.cancel()
+
+    @staticmethod
+    async def _drain(stream, tail):
+        while True:
+            line = await stream.readline()
+            if not line:
+                return
+            tail.append(line.decode(errors='replace').strip())
+
+    def summary(self):
+        c = self.counts
+        return (f"External tools: {c['started']} runs, {c['lines']} lines, "
+                f"{c['timed_out']} timed out (partial output kept), {c['failed']} failed")
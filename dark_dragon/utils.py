@@ -1,6 +1,12 @@
 import os
 import sys
 import time
+import array
+import bisect
+import json
+import hashlib
+import random
+import socket
 import threading
 import ipaddress
 from rich.console import Console
@@ -20,6 +26,9 @@ _  /_/ // /_/ /_  /   _  ,<   _  /_/ /_  /   / /_/ /_  /_/ // /_/ /  / / /
 [bold magenta]        >>> Network Security Analysis Tool <<<[/bold magenta]
 """
 
+# Largest single range we will sweep (a /0 in IPv4, a /96 in IPv6)
+MAX_BLOCK_SIZE = 1 << 32
+
 # Global Lock for thread-safe printing (used by legacy threads, if any)
 print_lock = threading.Lock()
 
@@ -58,34 +67,465 @@ class TargetUtils:
                 # Treat as a single target or CIDR string if not a file
                 yield ranges_input.strip()
         else:
-            # Treat as list
+            # Treat as list (or a TargetStream, read as lines arrive)
             for item in ranges_input:
-                yield item.strip()
-
-    @staticmethod
-    def generate_targets(ranges_input):
-        """Generator that yields IPs one by one to save memory."""
-        for net in TargetUtils._iter_targets(ranges_input):
-            try:
-                network = ipaddress.IPv4Network(net, strict=False)
-                for ip in network:
-                    yield str(ip)
-            except ValueError:
-                # Assume it's a domain if not a valid IP/CIDR
-                yield net
-            except Exception as e:
-                console.print(f"[red][!] Invalid range: {net} ({e})[/red]")
-
-    @staticmethod
-    def count_targets(ranges_input):
-        count = 0
-        for net in TargetUtils._iter_targets(ranges_input):
-            try:
-                network = ipaddress.IPv4Network(net, strict=False)
-                count += network.num_addresses
-            except ValueError:
-                # Count as 1 for domain
-                count += 1
-            except:
-                pass
-        return count
+                item = item.strip()
+                if item:
+                    yield item
+
+    @staticmethod
+    def parse_block(item):
+        """Parses an IP or CIDR into `(version, first_address_int, size)`, or None for a domain."""
+        try:
+            # Fast path for the common single-IPv4 line
+            return (4, int.from_bytes(socket.inet_pton(socket.AF_INET, item), 'big'), 1)
+        except OSError:
+            pass
+        try:
+            network = ipaddress.ip_network(item, strict=False)
+        except ValueError:
+            return None
+        return (network.version, int(network.network_address), network.num_addresses)
+
+    @staticmethod
+    def _iter_blocks(ranges_input, start=0):
+        """Yields `(offset, version, value, size)` for every block that ends past global index `start`.
+
+        Domains come through as `(offset, 0, name, 1)`. A `TargetManifest` seeks
+        straight to the block holding `start`; raw input has to be parsed up to it.
+        """
+        if isinstance(ranges_input, TargetManifest):
+            yield from ranges_input.blocks(start)
+            return
+        offset = 0
+        for item in TargetUtils._iter_targets(ranges_input):
+            block = TargetUtils.parse_block(item)
+            if block is None:
+                block = (0, item, 1)
+            elif block[2] > MAX_BLOCK_SIZE:
+                console.print(f"[red][!] Range too large to sweep: {item} ({block[2]} addresses)[/red]")
+                continue
+            if offset + block[2] > start:
+                yield (offset,) + block
+            offset += block[2]
+
+    @staticmethod
+    def load_manifest(ranges_input):
+        """Returns a `TargetManifest`, reusing the cached one for unchanged target files."""
+        if isinstance(ranges_input, (TargetManifest, TargetStream)):
+            return ranges_input
+        return TargetManifest.load(ranges_input)
+
+    @staticmethod
+    def is_stream(ranges_input):
+        return isinstance(ranges_input, TargetStream)
+
+    @staticmethod
+    def format_ip(value, version=4):
+        """Formats an integer address; much cheaper than building an ipaddress object."""
+        if version == 4:
+            return socket.inet_ntoa(value.to_bytes(4, 'big'))
+        return socket.inet_ntop(socket.AF_INET6, value.to_bytes(16, 'big'))
+
+    @staticmethod
+    def url_host(target):
+        """Wraps IPv6 literals in brackets so they can be used in URLs."""
+        return f"[{target}]" if ':' in target else target
+
+    @staticmethod
+    def _shard_indexes(offset, size, shard):
+        """Local indexes of a block starting at global index `offset` that belong to `shard`.
+
+        A shard is an `(index, count)` pair; shard `i` owns every global index `g`
+        with `g % count == i`, so shards are disjoint and interleaved across ranges.
+        """
+        if shard is None:
+            return range(size)
+        index, count = shard
+        return range((index - offset) % count, size, count)
+
+    @staticmethod
+    def _lcg_jump(a, c, m, steps):
+        """Returns `(A, C)` such that `x -> A*x + C` equals `steps` applications of `x -> a*x + c`."""
+        acc_a, acc_c = 1, 0
+        while steps:
+            if steps & 1:
+                acc_a, acc_c = (acc_a * a) % m, (acc_c * a + c) % m
+            a, c = (a * a) % m, (c * a + c) % m
+            steps >>= 1
+        return acc_a, acc_c
+
+    @staticmethod
+    def _permuted_indexes(total, shard=None, seed=None, start=0):
+        """Full-cycle pseudo-random permutation of the global indexes owned by `shard`.
+
+        Uses a power-of-two LCG that satisfies Hull-Dobell (odd increment,
+        multiplier = 1 mod 4), so every value below the modulus is visited
+        exactly once; values past the shard size are skipped. Yields
+        `(step, index)` so a walk can later jump straight back to `start`.
+        """
+        index, count = shard if shard else (0, 1)
+        size = len(range(index, total, count))
+        m = 4
+        while m < size:
+            m <<= 1
+        rng = random.Random(seed)
+        a = (rng.randrange(m) & ~3) | 1
+        c = rng.randrange(m) | 1
+        x = rng.randrange(m)
+        if start:
+            jump_a, jump_c = TargetUtils._lcg_jump(a, c, m, start)
+            x = (jump_a * x + jump_c) % m
+        for step in range(start, m):
+            if x < size:
+                yield (step, index + x * count)
+            x = (a * x + c) % m
+
+    @staticmethod
+    def _walk(ranges_input, shard=None, permute=False, seed=None, start=0):
+        """Yields `(position, version, value)`: integer addresses, or `(position, 0, name)` for domains.
+
+        `position` is the global index in sequential order and the LCG step in
+        permuted order; either way it only grows, and `start` resumes the walk
+        at the first position not below it.
+        """
+        if not permute:
+            for offset, version, value, size in TargetUtils._iter_blocks(ranges_input, start):
+                indexes = TargetUtils._shard_indexes(offset, size, shard)
+                skip = start - offset - indexes.start
+                if skip > 0:
+                    indexes = indexes[-(-skip // indexes.step):]
+                if version == 0:
+                    if indexes:
+                        yield (offset, 0, value)
+                    continue
+                for i in indexes:
+                    yield (offset + i, version, value + i)
+            return
+
+        # Random order needs random access into the block list
+        manifest = TargetUtils.load_manifest(ranges_input)
+        if isinstance(manifest, TargetStream):
+            raise ValueError("Streamed targets cannot be randomized")
+        for step, index in TargetUtils._permuted_indexes(manifest.total, shard, seed, start):
+            offset, version, value, _ = manifest.block(manifest.locate(index))
+            yield (step, version, value if version == 0 else value + index - offset)
+
+    @staticmethod
+    def generate_indexed(ranges_input, shard=None, permute=False, seed=None, start=0):
+        """Like `generate_targets`, but yields `(position, target)` for checkpointing."""
+        format_ip = TargetUtils.format_ip
+        for position, version, value in TargetUtils._walk(ranges_input, shard, permute, seed, start):
+            yield (position, value if version == 0 else format_ip(value, version))
+
+    @staticmethod
+    async def agenerate_indexed(ranges_input, shard=None, permute=False, seed=None, start=0):
+        """`generate_indexed` for producers on the event loop.
+
+        A `TargetStream` is read off the loop, so a slow pipe never stalls
+        probes in flight; each line is expanded as soon as it arrives.
+        """
+        if not TargetUtils.is_stream(ranges_input):
+            for item in TargetUtils.generate_indexed(ranges_input, shard, permute, seed, start):
+                yield item
+            return
+        if permute:
+            raise ValueError("Streamed targets cannot be randomized")
+        position = 0
+        async for lines in ranges_input.batches():
+            for _, target in TargetUtils.generate_indexed(lines):
+                yield (position, target)
+                position += 1
+
+    @staticmethod
+    def generate_targets(ranges_input, shard=None, permute=False, seed=None, start=0):
+        """Generator that yields target strings one by one to save memory.
+
+        Addresses are walked as plain integers and only formatted on the way out.
+        With `permute`, targets come in a seeded pseudo-random order instead of
+        one /24 at a time.
+        """
+        format_ip = TargetUtils.format_ip
+        for _, version, value in TargetUtils._walk(ranges_input, shard, permute, seed, start):
+            yield value if version == 0 else format_ip(value, version)
+
+    @staticmethod
+    def generate_chunks(ranges_input, chunk_size=4096, shard=None, permute=False, seed=None):
+        """Yields `(version, chunk)` batches of unformatted targets.
+
+        IPv4 chunks are `array('L')` of integers, IPv6 chunks are lists of
+        integers (they exceed 64 bits) and domain chunks (version 0) are lists
+        of names. Each chunk holds a single version.
+        """
+        if not permute:
+            names = []
+            for offset, version, value, size in TargetUtils._iter_blocks(ranges_input):
+                indexes = TargetUtils._shard_indexes(offset, size, shard)
+                if version == 0:
+                    if indexes:
+                        names.append(value)
+                        if len(names) >= chunk_size:
+                            yield (0, names)
+                            names = []
+                    continue
+                if names:
+                    yield (0, names)
+                    names = []
+                step = indexes.step
+                for lo in range(value + indexes.start, value + size, step * chunk_size):
+                    hi = min(lo + step * chunk_size, value + size)
+                    values = range(lo, hi, step)
+                    yield (version, array.array('L', values) if version == 4 else list(values))
+            if names:
+                yield (0, names)
+            return
+
+        chunk_version, chunk = None, []
+        for _, version, value in TargetUtils._walk(ranges_input, shard, permute, seed):
+            if version != chunk_version or len(chunk) >= chunk_size:
+                if chunk:
+                    yield (chunk_version, array.array('L', chunk) if chunk_version == 4 else chunk)
+                chunk_version, chunk = version, []
+            chunk.append(value)
+        if chunk:
+            yield (chunk_version, array.array('L', chunk) if chunk_version == 4 else chunk)
+
+    @staticmethod
+    def count_targets(ranges_input, shard=None):
+        # A stream's total is unknown (0) until it ends
+        if isinstance(ranges_input, (TargetManifest, TargetStream)):
+            total = ranges_input.total
+        else:
+            total = sum(size for _, _, _, size in TargetUtils._iter_blocks(ranges_input))
+        if shard is None:
+            return total
+        return len(range(shard[0], total, shard[1]))
+
+
+class TargetStream:
+    """Targets read line by line from a pipe (e.g. stdin) as they arrive.
+
+    A stream is walked once, in order: it has no known total, cannot be
+    randomized and leaves nothing to resume from.
+    """
+    total = 0
+
+    def __init__(self, file):
+        self.file = file
+
+    def __iter__(self):
+        for line in self.file:
+            line = line.strip()
+            if line:
+                yield line
+
+    def _read_batch(self):
+        # One read returns whatever the pipe already holds, up to 64 KiB
+        buffer = getattr(self.file, 'buffer', None)
+        if buffer is not None and hasattr(buffer, 'read1'):
+            return buffer.read1(65536).decode(errors='ignore')
+        return self.file.readline()
+
+    async def batches(self):
+        """Yields lists of complete, non-empty lines, reading on a helper thread."""
+        import asyncio
+        loop = asyncio.get_running_loop()
+        carry = ''
+        while True:
+            data = await loop.run_in_executor(None, self._read_batch)
+            if not data:
+                break
+            lines = (carry + data).split('\n')
+            carry = lines.pop()
+            lines = [line.strip() for line in lines if line.strip()]
+            if lines:
+                yield lines
+        if carry.strip():
+            yield [carry.strip()]
+
+    def fingerprint(self):
+        return None
+
+
+class AsyncTargetStream(TargetStream):
+    """Targets from an async iterator (e.g. recon results), consumed on the scan's own event loop."""
+
+    def __init__(self, items):
+        self.items = items
+
+    def __iter__(self):
+        raise TypeError("an AsyncTargetStream is read with batches() on the event loop")
+
+    async def batches(self):
+        async for item in self.items:
+            item = item.strip()
+            if item:
+                yield [item]
+
+
+class TargetManifest:
+    """One-pass index of a target list.
+
+    Holds every normalized block (version, start, size), the running global
+    index at which each block begins and, for file inputs, the byte offset of
+    the line it came from. Manifests for files are cached next to the input as
+    `<file>.manifest` and reused while the file's mtime and size are unchanged.
+    """
+    FORMAT = 1
+
+    def __init__(self, source=None):
+        self.source = source
+        self.versions = array.array('B')
+        self.sizes = array.array('Q')
+        self.starts_hi = array.array('Q')
+        self.starts_lo = array.array('Q')
+        # Byte offset of the line for file inputs, index into `names` otherwise
+        self.positions = array.array('Q')
+        self.offsets = array.array('Q', [0])
+        self.names = []
+        self._file = None
+
+    def __len__(self):
+        return len(self.versions)
+
+    @property
+    def total(self):
+        return self.offsets[-1]
+
+    def add(self, version, value, size, position):
+        if version == 0:
+            if self.source is None:
+                position = len(self.names)
+                self.names.append(value)
+            value = 0
+        self.versions.append(version)
+        self.sizes.append(size)
+        self.starts_hi.append(value >> 64)
+        self.starts_lo.append(value & 0xFFFFFFFFFFFFFFFF)
+        self.positions.append(position)
+        self.offsets.append(self.offsets[-1] + size)
+
+    def locate(self, index):
+        """Index of the block that holds global target index `index`."""
+        return bisect.bisect_right(self.offsets, index) - 1
+
+    def _name(self, i):
+        if self.source is None:
+            return self.names[self.positions[i]]
+        if self._file is None:
+            self._file = open(self.source, 'rb')
+        self._file.seek(self.positions[i])
+        return self._file.readline().strip().decode('utf-8', errors='replace')
+
+    def block(self, i):
+        """Returns `(offset, version, value, size)` for block `i`."""
+        version = self.versions[i]
+        if version == 0:
+            value = self._name(i)
+        else:
+            value = (self.starts_hi[i] << 64) | self.starts_lo[i]
+        return (self.offsets[i], version, value, self.sizes[i])
+
+    def blocks(self, start=0):
+        """Yields blocks from the one holding global index `start` onwards."""
+        for i in range(max(self.locate(start), 0), len(self)):
+            yield self.block(i)
+
+    @classmethod
+    def build(cls, ranges_input):
+        """Parses the input once, recording blocks, offsets and line positions."""
+        if isinstance(ranges_input, str) and os.path.isfile(ranges_input):
+            manifest = cls(ranges_input)
+            position = 0
+            with open(ranges_input, 'rb') as f:
+                for raw in f:
+                    line_start = position
+                    position += len(raw)
+                    item = raw.strip().decode('utf-8', errors='replace')
+                    if item:
+                        manifest._add_item(item, line_start)
+            return manifest
+
+        manifest = cls()
+        for item in TargetUtils._iter_targets(ranges_input):
+            manifest._add_item(item, 0)
+        return manifest
+
+    def _add_item(self, item, position):
+        block = TargetUtils.parse_block(item)
+        if block is None:
+            self.add(0, item, 1, position)
+        elif block[2] > MAX_BLOCK_SIZE:
+            console.print(f"[red][!] Range too large to sweep: {item} ({block[2]} addresses)[/red]")
+        else:
+            self.add(*block, position)
+
+    @staticmethod
+    def cache_path(path):
+        return path + '.manifest'
+
+    @staticmethod
+    def _stamp(path):
+        st = os.stat(path)
+        return {'format': TargetManifest.FORMAT, 'mtime': st.st_mtime_ns, 'size': st.st_size, 'byteorder': sys.byteorder}
+
+    def fingerprint(self):
+        """Identifies the target list, so checkpoints are only resumed against the same input."""
+        digest = hashlib.sha1()
+        if self.source is not None:
+            digest.update(json.dumps(self._stamp(self.source)).encode())
+        for column in self._columns():
+            digest.update(column.tobytes())
+        for name in self.names:
+            digest.update(name.encode() + b'\n')
+        return digest.hexdigest()
+
+    def _columns(self):
+        return (self.versions, self.sizes, self.starts_hi, self.starts_lo, self.positions, self.offsets)
+
+    def save(self):
+        """Writes the manifest next to its source file; silently skipped if that is not possible."""
+        if self.source is None:
+            return
+        header = dict(self._stamp(self.source), blocks=len(self))
+        path = self.cache_path(self.source)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'wb') as f:
+                f.write(json.dumps(header).encode() + b'\n')
+                for column in self._columns():
+                    column.tofile(f)
+            os.replace(tmp, path)
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    @classmethod
+    def read_cached(cls, source):
+        """Loads the cached manifest for `source`, or returns None if it is missing or stale."""
+        path = cls.cache_path(source)
+        try:
+            with open(path, 'rb') as f:
+                header = json.loads(f.readline())
+                blocks = header.pop('blocks')
+                if header != cls._stamp(source):
+                    return None
+                manifest = cls(source)
+                for column in manifest._columns():
+                    del column[:]
+                    column.fromfile(f, blocks)
+                manifest.offsets.fromfile(f, 1)
+                return manifest
+        except (OSError, ValueError, KeyError, EOFError):
+            return None
+
+    @classmethod
+    def load(cls, ranges_input):
+        """Returns the cached manifest for an unchanged file, building (and caching) it otherwise."""
+        if isinstance(ranges_input, str) and os.path.isfile(ranges_input):
+            manifest = cls.read_cached(ranges_input)
+            if manifest is None:
+                manifest = cls.build(ranges_input)
+                manifest.save()
+            return manifest
+        return cls.build(ranges_input)
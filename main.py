@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
+import os
 import sys
 from dark_dragon.core import DarkDragonCore
+from dark_dragon.cli import build_parser, run_command
 
 def main():
+    parser = build_parser()
+    args = parser.parse_args()
+
     try:
-        app = DarkDragonCore()
+        if args.command:
+            sys.exit(run_command(parser, args))
+        app = DarkDragonCore(workers=args.workers or 1, resume=args.resume)
         app.main_menu()
     except KeyboardInterrupt:
-        print("\nExiting...")
+        print("\nExiting...", file=sys.stderr)
         sys.exit(0)
+    except BrokenPipeError:
+        # The reader of our stdout went away (e.g. `| head`); exit quietly
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
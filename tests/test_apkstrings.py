@@ -0,0 +1,116 @@
+"""ApkStrings: string tables of hand-built DEX, resources.arsc and binary XML blobs.
+
+    python -m pytest tests    (or: python -m unittest discover tests)
+"""
+import os
+import sys
+import struct
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dark_dragon.apkstrings import (ApkStrings, RES_STRING_POOL_TYPE, RES_TABLE_TYPE, RES_XML_TYPE,
+                                    RES_TABLE_PACKAGE_TYPE, UTF8_FLAG)
+
+
+def uleb128(value):
+    out = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+def dex(strings):
+    """A DEX file holding only a header and the string ID table with its string data."""
+    header = bytearray(0x70)
+    header[:8] = b'dex\n035\x00'
+    table = len(header)
+    data = table + 4 * len(strings)
+    offsets, blob = [], b''
+    for s in strings:
+        offsets.append(data + len(blob))
+        blob += uleb128(len(s)) + s.encode() + b'\x00'
+    struct.pack_into('<II', header, 0x38, len(strings), table)
+    return bytes(header) + struct.pack(f'<{len(strings)}I', *offsets) + blob
+
+
+def length_prefix(length, utf8):
+    if utf8:
+        return bytes([length]) if length < 0x80 else bytes([0x80 | length >> 8, length & 0xFF])
+    return struct.pack('<H', length) if length < 0x8000 else struct.pack('<HH', 0x8000 | length >> 16, length & 0xFFFF)
+
+
+def string_pool(strings, utf8=False):
+    """A ResStringPool chunk."""
+    offsets, blob = [], b''
+    for s in strings:
+        offsets.append(len(blob))
+        if utf8:
+            encoded = s.encode()
+            blob += length_prefix(len(s), True) + length_prefix(len(encoded), True) + encoded + b'\x00'
+        else:
+            blob += length_prefix(len(s), False) + s.encode('utf-16-le') + b'\x00\x00'
+    blob += b'\x00' * (-len(blob) % 4)
+    header_size = 28
+    strings_start = header_size + 4 * len(strings)
+    size = strings_start + len(blob)
+    header = struct.pack('<HHIIIIII', RES_STRING_POOL_TYPE, header_size, size, len(strings), 0,
+                         UTF8_FLAG if utf8 else 0, strings_start, 0)
+    return header + struct.pack(f'<{len(strings)}I', *offsets) + blob
+
+
+def container(chunk_type, children, header_size=8):
+    body = b''.join(children)
+    header = struct.pack('<HHI', chunk_type, header_size, header_size + len(body))
+    return header + b'\x00' * (header_size - 8) + body
+
+
+class ApkStringsTest(unittest.TestCase):
+
+    def test_dex_string_table(self):
+        strings = ['', 'Ljava/lang/String;', 'https://api.example.com/v1', 'x' * 200]
+        self.assertEqual(ApkStrings.extract(dex(strings)), strings)
+
+    def test_arsc_pools_utf8_and_utf16_including_nested_packages(self):
+        long = 'cdn.example.com/' + 'a' * 40000
+        arsc = container(RES_TABLE_TYPE, [
+            string_pool(['https://pay.example.com', 'ﬁ-ligature'], utf8=True),
+            container(RES_TABLE_PACKAGE_TYPE, [string_pool(['attr', 'app_name']), string_pool([long])], header_size=12),
+        ], header_size=12)
+        self.assertEqual(ApkStrings.extract(arsc),
+                         ['https://pay.example.com', 'ﬁ-ligature', 'attr', 'app_name', long])
+
+    def test_utf8_pool_with_two_byte_lengths(self):
+        text = 'é' * 150
+        self.assertEqual(ApkStrings.extract(container(RES_XML_TYPE, [string_pool([text], utf8=True)])), [text])
+
+    def test_binary_xml(self):
+        xml = container(RES_XML_TYPE, [string_pool(['manifest', 'package', 'com.example.app'])])
+        self.assertEqual(ApkStrings.extract(xml), ['manifest', 'package', 'com.example.app'])
+
+    def test_other_or_broken_data_falls_back(self):
+        self.assertIsNone(ApkStrings.extract(b'<?xml version="1.0"?><manifest/>'))
+        self.assertIsNone(ApkStrings.extract(b''))
+        # Truncated string ID table
+        self.assertIsNone(ApkStrings.extract(dex(['a', 'b'])[:0x72]))
+
+    def test_truncated_chunk_stops_the_walk(self):
+        arsc = container(RES_TABLE_TYPE, [string_pool(['kept']), string_pool(['cut'])], header_size=12)
+        # The second pool claims more bytes than are left: only the first one is read
+        self.assertEqual(ApkStrings.chunk_strings(arsc[:-4], 12), ['kept'])
+
+    def test_is_structured(self):
+        self.assertTrue(ApkStrings.is_structured('classes2.DEX'))
+        self.assertTrue(ApkStrings.is_structured('resources.arsc'))
+        self.assertTrue(ApkStrings.is_structured('res/layout/main.xml'))
+        self.assertFalse(ApkStrings.is_structured('assets/config.json'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+"""ScanCheckpoint: the resume cursor over a target stream, and saving/restoring it.
+
+    python -m pytest tests    (or: python -m unittest discover tests)
+"""
+import os
+import sys
+import json
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dark_dragon.checkpoint import ScanCheckpoint
+
+PARAMS = {'mode': '1', 'ports': [80, 443]}
+
+
+class ScanCheckpointTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.output = os.path.join(self.dir.name, 'results.txt')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_cursor_stops_at_the_oldest_unfinished_target(self):
+        checkpoint = ScanCheckpoint(None, PARAMS)
+        serials = [checkpoint.dispatch(position) for position in range(5)]
+        self.assertEqual(checkpoint.snapshot(), (0, 0))
+        checkpoint.complete(serials[0])
+        checkpoint.complete(serials[2])
+        # 2 finished out of order: the cursor waits for 1
+        self.assertEqual(checkpoint.snapshot(), (1, 1))
+        self.assertEqual(checkpoint.in_flight, 3)
+        for serial in serials[1:]:
+            checkpoint.complete(serial)
+        self.assertEqual(checkpoint.snapshot(), (5, 5))
+        self.assertEqual(checkpoint.in_flight, 0)
+
+    def test_skipped_positions_are_not_counted_as_pending(self):
+        # Blank or invalid lines take a stream position but are never dispatched
+        checkpoint = ScanCheckpoint(None, PARAMS)
+        first = checkpoint.dispatch(0)
+        checkpoint.dispatch(3)
+        checkpoint.complete(first)
+        self.assertEqual(checkpoint.snapshot(), (3, 1))
+
+    def test_resume_restores_cursor_completed_and_seed(self):
+        checkpoint = ScanCheckpoint.for_scan(self.output, PARAMS)
+        serials = [checkpoint.dispatch(position) for position in range(10)]
+        for serial in serials[:4] + serials[5:7]:
+            checkpoint.complete(serial)
+        checkpoint.save()
+        self.assertEqual(checkpoint.path, self.output + '.ckpt')
+
+        resumed = ScanCheckpoint.for_scan(self.output, PARAMS, resume=True)
+        self.assertEqual((resumed.cursor, resumed.completed, resumed.seed), (4, 4, checkpoint.seed))
+        # Counting carries on from the restored totals
+        serial = resumed.dispatch(4)
+        resumed.complete(serial)
+        self.assertEqual(resumed.snapshot(), (5, 5))
+
+    def test_checkpoint_for_other_parameters_is_ignored(self):
+        checkpoint = ScanCheckpoint.for_scan(self.output, PARAMS)
+        checkpoint.complete(checkpoint.dispatch(0))
+        checkpoint.save()
+        other = ScanCheckpoint.for_scan(self.output, {**PARAMS, 'ports': [8080]}, resume=True)
+        self.assertEqual((other.cursor, other.completed), (0, 0))
+        self.assertNotEqual(other.seed, None)
+
+    def test_save_replaces_the_file_and_clear_removes_it(self):
+        checkpoint = ScanCheckpoint.for_scan(self.output, PARAMS)
+        checkpoint.complete(checkpoint.dispatch(0))
+        checkpoint.save()
+        checkpoint.complete(checkpoint.dispatch(1))
+        checkpoint.save()
+        with open(checkpoint.path) as f:
+            state = json.load(f)
+        self.assertEqual((state['cursor'], state['completed'], state['params']), (2, 2, PARAMS))
+        self.assertEqual(os.listdir(self.dir.name), ['results.txt.ckpt'])
+        checkpoint.clear()
+        self.assertFalse(os.path.exists(checkpoint.path))
+
+    def test_no_checkpoint_next_to_stdout(self):
+        self.assertIsNone(ScanCheckpoint.path_for('-'))
+        self.assertIsNone(ScanCheckpoint.path_for(None))
+        checkpoint = ScanCheckpoint.for_scan('-', PARAMS, resume=True)
+        checkpoint.save()
+        self.assertFalse(checkpoint.load())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,186 @@
+"""ReconClient and ResponseCache against a local aiohttp stand-in for a recon source.
+
+    python -m pytest tests    (or: python -m unittest discover tests)
+"""
+import os
+import asyncio
+import sys
+import time
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from aiohttp import web
+
+from dark_dragon.httpcache import ReconClient, SourceError
+from dark_dragon.ratelimit import SourceThrottle
+
+BODY = b'[{"name_value": "a.example.com"}]' * 100
+
+
+class StandIn:
+    """One-route source; `replies` are served in order, the last one repeating. Requests are recorded."""
+
+    def __init__(self):
+        self.replies = []
+        self.requests = []
+        self.runner = None
+        self.url = None
+
+    async def handle(self, request):
+        self.requests.append(dict(request.headers))
+        reply = self.replies.pop(0) if len(self.replies) > 1 else self.replies[0]
+        return await reply(request)
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get('/source', self.handle)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/source"
+
+    async def stop(self):
+        await self.runner.cleanup()
+
+
+def ok(body=BODY, etag='"v1"', last_modified='Mon, 01 Jan 2024 00:00:00 GMT'):
+    async def reply(request):
+        return web.Response(body=body, headers={'ETag': etag, 'Last-Modified': last_modified})
+    return reply
+
+
+def status(code, headers=None):
+    async def reply(request):
+        return web.Response(status=code, headers=headers or {})
+    return reply
+
+
+def not_modified():
+    async def reply(request):
+        if request.headers.get('If-None-Match') != '"v1"':
+            return await ok()(request)
+        return web.Response(status=304)
+    return reply
+
+
+def cut_off(sent=b'[{"name_value": "partial'):
+    """Announces a long body, sends its start, then drops the connection."""
+    async def reply(request):
+        response = web.StreamResponse(headers={'Content-Length': '100000'})
+        await response.prepare(request)
+        await response.write(sent)
+        request.transport.close()
+        return response
+    return reply
+
+
+class ReconClientTest(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.source = StandIn()
+        await self.source.start()
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache_path = os.path.join(self.dir.name, 'cache.sqlite')
+
+    async def asyncTearDown(self):
+        await self.source.stop()
+        self.dir.cleanup()
+
+    def client(self, ttl=3600, **kwargs):
+        return ReconClient(self.cache_path, {'src': ttl}, **kwargs)
+
+    async def test_fresh_entry_is_served_without_a_request(self):
+        self.source.replies = [ok()]
+        async with self.client() as client:
+            self.assertEqual(await client.get('src', self.source.url), BODY)
+            self.assertEqual(await client.get('src', self.source.url), BODY)
+        self.assertEqual(len(self.source.requests), 1)
+        self.assertEqual(client.stats['fetched'], 1)
+        self.assertEqual(client.stats['fresh'], 1)
+
+    async def test_expired_entry_is_revalidated_with_a_conditional_request(self):
+        self.source.replies = [ok(), not_modified()]
+        async with self.client(ttl=0) as client:
+            await client.get('src', self.source.url)
+            fetched = client.cache.get('src', self.source.url)[0]
+            touched = []
+            touch = client.cache.touch
+            client.cache.touch = lambda source, url: (touched.append((source, url)), touch(source, url))
+            await asyncio.sleep(0.01)
+            self.assertEqual(await client.get('src', self.source.url), BODY)
+            self.assertGreater(client.cache.get('src', self.source.url)[0], fetched)
+        headers = self.source.requests[1]
+        self.assertEqual(headers.get('If-None-Match'), '"v1"')
+        self.assertEqual(headers.get('If-Modified-Since'), 'Mon, 01 Jan 2024 00:00:00 GMT')
+        self.assertEqual(touched, [('src', self.source.url)])
+        self.assertEqual(client.stats['revalidated'], 1)
+
+    async def test_stale_entry_is_served_when_the_source_fails(self):
+        self.source.replies = [ok(), status(500)]
+        async with self.client(ttl=0) as client:
+            await client.get('src', self.source.url)
+            self.assertEqual(await client.get('src', self.source.url), BODY)
+        self.assertEqual(client.stats['stale'], 1)
+        self.assertEqual(len(self.source.requests), 2)
+
+    async def test_failure_without_a_cached_entry_raises(self):
+        self.source.replies = [status(500)]
+        async with self.client() as client:
+            with self.assertRaises(SourceError) as caught:
+                await client.get('src', self.source.url)
+        self.assertEqual(caught.exception.status, 500)
+        self.assertEqual(client.stats['failed'], 1)
+
+    async def test_throttled_request_is_retried_after_retry_after(self):
+        self.source.replies = [status(429, {'Retry-After': '0.3'}), ok()]
+        throttle = SourceThrottle('src', rate=100, burst=10, backoff=5.0)
+        async with self.client(throttles={'src': throttle}, retries=2) as client:
+            started = time.monotonic()
+            self.assertEqual(await client.get('src', self.source.url), BODY)
+            waited = time.monotonic() - started
+        self.assertEqual(len(self.source.requests), 2)
+        self.assertEqual((throttle.requests, throttle.backoffs), (2, 1))
+        # The server's Retry-After, not the 5s default backoff, set the delay
+        self.assertGreaterEqual(waited, 0.3)
+        self.assertLess(waited, 5.0)
+
+    async def test_throttling_gives_up_after_the_retries(self):
+        self.source.replies = [status(503, {'Retry-After': '0'})]
+        throttle = SourceThrottle('src', rate=100, burst=10, backoff=0.01)
+        async with self.client(throttles={'src': throttle}, retries=2) as client:
+            with self.assertRaises(SourceError) as caught:
+                await client.get('src', self.source.url)
+        self.assertEqual(caught.exception.status, 503)
+        self.assertEqual(len(self.source.requests), 3)
+
+    async def test_throttle_slot_is_free_while_the_body_streams(self):
+        self.source.replies = [ok()]
+        throttle = SourceThrottle('src', rate=100, burst=10, concurrency=1)
+        async with self.client(throttles={'src': throttle}, chunk_size=64) as client:
+            slow = client.stream('src', self.source.url)
+            first = await slow.__anext__()
+            # The only slot went back once the headers were in, so a second request is not held up
+            self.assertEqual(await asyncio.wait_for(client.get('src', self.source.url), 5), BODY)
+            self.assertEqual(first + b''.join([chunk async for chunk in slow]), BODY)
+        self.assertEqual(throttle.requests, 2)
+
+    async def test_interrupted_download_keeps_the_old_entry(self):
+        self.source.replies = [ok(), cut_off()]
+        async with self.client(ttl=0) as client:
+            await client.get('src', self.source.url)
+            with self.assertRaises(SourceError) as caught:
+                await client.get('src', self.source.url)
+            self.assertIn('download interrupted', str(caught.exception))
+            # The partial body was discarded: the old entry is intact and no temporary file is left
+            self.assertEqual(b''.join(client.cache.read('src', self.source.url)), BODY)
+            leftovers = [name for name in os.listdir(client.cache.body_dir) if name.endswith('.tmp')]
+        self.assertEqual(leftovers, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""SourceThrottle: token bucket, concurrency cap, backoff, and cancellation while waiting.
+
+    python -m pytest tests    (or: python -m unittest discover tests)
+"""
+import os
+import sys
+import time
+import asyncio
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dark_dragon.httpcache import SourceError
+from dark_dragon.ratelimit import SourceThrottle
+
+
+class SourceThrottleTest(unittest.IsolatedAsyncioTestCase):
+
+    async def test_burst_then_rate(self):
+        throttle = SourceThrottle('src', rate=20, burst=3, concurrency=10)
+        started = time.monotonic()
+        for _ in range(3):
+            async with throttle.request():
+                pass
+        self.assertLess(time.monotonic() - started, 0.04)
+        for _ in range(2):
+            async with throttle.request():
+                pass
+        # Two more tokens at 20/s
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        self.assertEqual(throttle.requests, 5)
+
+    async def test_concurrency_cap(self):
+        throttle = SourceThrottle('src', rate=1000, burst=100, concurrency=2)
+        running = peak = 0
+
+        async def call():
+            nonlocal running, peak
+            async with throttle.request():
+                running += 1
+                peak = max(peak, running)
+                await asyncio.sleep(0.02)
+                running -= 1
+
+        await asyncio.gather(*(call() for _ in range(6)))
+        self.assertEqual(peak, 2)
+
+    async def test_throttling_failure_blocks_for_retry_after_then_success_resets(self):
+        throttle = SourceThrottle('src', rate=1000, burst=100, backoff=5.0)
+        with self.assertRaises(SourceError):
+            async with throttle.request():
+                raise SourceError('src', 'HTTP 429', 429, retry_after=0.1)
+        self.assertEqual(throttle.backoffs, 1)
+        started = time.monotonic()
+        async with throttle.request():
+            pass
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+        # The default delay doubled, and the success set it back
+        self.assertEqual(throttle._delay, 5.0)
+
+    async def test_backoff_doubles_up_to_the_maximum(self):
+        throttle = SourceThrottle('src', backoff=1.0, max_backoff=3.0)
+        for expected in (1.0, 2.0, 3.0, 3.0):
+            now = time.monotonic()
+            throttle.failed(asyncio.TimeoutError())
+            self.assertAlmostEqual(throttle.blocked_until - now, expected, delta=0.05)
+            throttle.blocked_until = 0.0
+
+    async def test_other_failures_do_not_back_off(self):
+        throttle = SourceThrottle('src', rate=1000, burst=100)
+        with self.assertRaises(SourceError):
+            async with throttle.request():
+                raise SourceError('src', 'HTTP 500', 500)
+        self.assertEqual((throttle.backoffs, throttle.blocked_until), (0, 0.0))
+        self.assertTrue(SourceThrottle.is_throttling(SourceError('src', 'HTTP 503', 503)))
+        self.assertFalse(SourceThrottle.is_throttling(ConnectionResetError()))
+
+    async def test_cancelled_wait_gives_the_slot_back(self):
+        throttle = SourceThrottle('src', rate=0.5, burst=1, concurrency=1)
+        async with throttle.request():
+            pass
+        waiting = asyncio.create_task(throttle.acquire())
+        await asyncio.sleep(0.05)
+        waiting.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertFalse(throttle._slots.locked())
+        self.assertEqual(throttle.requests, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""SubdomainRecon.iter_json_array: incremental parsing of a JSON array arriving in chunks.
+
+    python -m pytest tests    (or: python -m unittest discover tests)
+"""
+import os
+import sys
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dark_dragon.recon import SubdomainRecon
+
+
+async def chunked(body, *cuts):
+    """`body` split at the byte offsets `cuts`, as the chunks a response would arrive in."""
+    bounds = [0, *cuts, len(body)]
+    for start, end in zip(bounds, bounds[1:]):
+        yield body[start:end]
+
+
+async def items(chunks, **kwargs):
+    return [item async for item in SubdomainRecon.iter_json_array(chunks, **kwargs)]
+
+
+class IterJsonArrayTest(unittest.IsolatedAsyncioTestCase):
+
+    async def assertParsesAtEverySplit(self, body, expected):
+        for cut in range(len(body) + 1):
+            with self.subTest(cut=cut):
+                self.assertEqual(await items(chunked(body, cut)), expected)
+
+    async def test_objects_split_anywhere(self):
+        body = b'[{"name_value": "a.example.com"}, {"name_value": "b.example.com\\nc.example.com"}]'
+        await self.assertParsesAtEverySplit(body, [{'name_value': 'a.example.com'},
+                                                  {'name_value': 'b.example.com\nc.example.com'}])
+
+    async def test_bare_scalars_are_not_cut_short_at_a_chunk_end(self):
+        # `-1.5e3` cut after `-1.5` or `-1.5e` must not come out as -1.5
+        body = b'[12, -1.5e3, true, null, "x", 7]'
+        await self.assertParsesAtEverySplit(body, [12, -1500.0, True, None, 'x', 7])
+
+    async def test_one_byte_chunks(self):
+        body = b'[ {"a": [1, 2]} , 3 ,"\xc3\xa9"]'
+        self.assertEqual(await items(chunked(body, *range(1, len(body)))), [{'a': [1, 2]}, 3, 'é'])
+
+    async def test_empty_body_and_empty_array(self):
+        self.assertEqual(await items(chunked(b'')), [])
+        self.assertEqual(await items(chunked(b'[]')), [])
+
+    async def test_rest_of_the_body_is_read_after_the_array(self):
+        read = []
+
+        async def source():
+            for chunk in (b'[1]', b'  ', b'\n'):
+                read.append(chunk)
+                yield chunk
+
+        self.assertEqual(await items(source()), [1])
+        self.assertEqual(len(read), 3)
+
+    async def test_not_an_array(self):
+        with self.assertRaisesRegex(ValueError, 'not a JSON array'):
+            await items(chunked(b'{"a": 1}'))
+
+    async def test_truncated_array(self):
+        for body in (b'[1, 2', b'[{"a": 1}, {"b"'):
+            with self.subTest(body=body), self.assertRaisesRegex(ValueError, 'ends early'):
+                await items(chunked(body, 3))
+
+    async def test_item_too_long(self):
+        with self.assertRaises(ValueError):
+            await items(chunked(b'["' + b'x' * 100, 10, 50), max_item=64)
+        with self.assertRaisesRegex(ValueError, 'too long'):
+            await items(chunked(b'[' + b'1' * 100, 10, 50), max_item=64)
+
+
+if __name__ == '__main__':
+    unittest.main()
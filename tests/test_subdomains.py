@@ -0,0 +1,78 @@
+"""SubdomainStore: normalization, deduplication across merges, ordering and output.
+
+    python -m pytest tests    (or: python -m unittest discover tests)
+"""
+import os
+import sys
+import random
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from dark_dragon.subdomains import SubdomainStore
+
+
+class SubdomainStoreTest(unittest.TestCase):
+
+    def test_normalize(self):
+        normalize = SubdomainStore.normalize
+        self.assertEqual(normalize(' WWW.Example.COM. '), 'www.example.com')
+        self.assertEqual(normalize('*.*.api.example.com'), 'api.example.com')
+        self.assertEqual(normalize('bücher.example.com'), 'xn--bcher-kva.example.com')
+        self.assertEqual(normalize('_dmarc.example.com'), '_dmarc.example.com')
+        for bad in ('', 'a..example.com', '-a.example.com', 'a b.example.com', 'a.example.com/x', 'x' * 64 + '.com'):
+            with self.subTest(name=bad):
+                self.assertIsNone(normalize(bad))
+
+    def test_names_outside_the_domain_are_rejected(self):
+        store = SubdomainStore('Example.com')
+        self.assertEqual(store.add('example.com'), 'example.com')
+        self.assertEqual(store.add('a.EXAMPLE.com'), 'a.example.com')
+        self.assertIsNone(store.add('badexample.com'))
+        self.assertIsNone(store.add('example.org'))
+        self.assertIsNone(store.add('not a name'))
+        self.assertEqual(store.rejected, 3)
+        self.assertEqual(len(store), 2)
+
+    def test_add_returns_only_new_names(self):
+        store = SubdomainStore('example.com')
+        self.assertEqual(store.add('a.example.com'), 'a.example.com')
+        self.assertIsNone(store.add('A.example.com.'))
+        self.assertIsNone(store.add('*.a.example.com'))
+        self.assertEqual(store.update(['a.example.com', 'b.example.com', 'b.example.com']), 1)
+        self.assertEqual(len(store), 2)
+        self.assertIn('B.example.com', store)
+        self.assertNotIn('c.example.com', store)
+
+    def test_iterates_parents_before_their_subdomains(self):
+        store = SubdomainStore(names=['b.example.com', 'x.a.example.com', 'example.com', 'a.example.com', 'a.example.org'])
+        self.assertEqual(list(store), ['example.com', 'a.example.com', 'x.a.example.com', 'b.example.com',
+                                       'a.example.org'])
+
+    def test_deduplicates_across_merges(self):
+        store = SubdomainStore('example.com')
+        store.MERGE_SIZE = 50
+        names = [f"h{i}.s{i % 7}.example.com" for i in range(2000)]
+        random.Random(1).shuffle(names)
+        self.assertEqual(store.update(names), 2000)
+        # Every name is now in the packed blocks or pending, and none comes back as new
+        self.assertGreater(len(store._blocks), 1)
+        self.assertEqual(store.update(reversed(names)), 0)
+        self.assertTrue(all(name in store for name in names))
+        self.assertEqual(len(store), 2000)
+        self.assertEqual(sorted(store), sorted(names))
+        self.assertTrue(all(len(block[1:-1].split(b'\n')) <= store.BLOCK for block in store._blocks))
+
+    def test_write(self):
+        store = SubdomainStore('example.com', ['b.example.com', 'a.example.com'])
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'subs.txt')
+            self.assertEqual(store.write(path), 2)
+            with open(path) as f:
+                self.assertEqual(f.read(), 'a.example.com\nb.example.com\n')
+
+
+if __name__ == '__main__':
+    unittest.main()